@@ -48,6 +48,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "erp.middleware.MedicionConsultasMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -107,6 +108,27 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hilos para procesar importaciones masivas en segundo plano.
+# Con 0 los trabajos quedan pendientes para el comando procesar_importaciones.
+ERP_IMPORTACIONES_WORKERS = 1
+# Segundos sin avance tras los cuales un trabajo en proceso se da por interrumpido
+# (caída o reinicio del worker) y procesar_importaciones lo recupera.
+ERP_IMPORTACIONES_INACTIVIDAD = 600
+
+# Cabeceras X-DB-Queries y Server-Timing con las consultas SQL de cada request.
+# Sobre ERP_CONSULTAS_ADVERTENCIA consultas se registra una advertencia (None: nunca).
+ERP_MEDIR_CONSULTAS = DEBUG
+ERP_CONSULTAS_LENTAS = 3
+ERP_CONSULTAS_ADVERTENCIA = 50
+
+# Límites de la jornada laboral que verifica erp.cumplimiento: horas en cualquier
+# ventana de 7 días (Ley 21.561: 42 desde abril de 2026), horas de descanso
+# entre turnos y días seguidos de trabajo. En los turnos con rotación (4x4, 7x7)
+# las horas se promedian en el ciclo y los días seguidos admiten los de trabajo.
+ERP_MAX_HORAS_SEMANALES = 42
+ERP_DESCANSO_MINIMO_HORAS = 12
+ERP_MAX_DIAS_CONSECUTIVOS = 6
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
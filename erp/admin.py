@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Cliente, Instalacion, Cargo, Personal, TipoVehiculo, Vehiculo,
-    TipoIncidencia, Incidencia, Turno
+    TipoIncidencia, Incidencia, Turno, Feriado, TrabajoImportacion, RequerimientosCliente
 )
 
 @admin.register(Cliente)
@@ -23,6 +23,9 @@ class ClienteAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_gestor_principal()
+    
     def get_gestor_principal(self, obj):
         gestor = obj.gestor_principal
         return gestor.nombre if gestor else "Sin gestor principal"
@@ -34,6 +37,47 @@ class InstalacionAdmin(admin.ModelAdmin):
     search_fields = ('nombre', 'direccion')
     list_filter = ('cliente', 'activa')
 
+class CumpleRequerimientosFilter(admin.SimpleListFilter):
+    """Filtra por la anotación cumple de RequerimientosCliente.objects.with_compliance()"""
+    title = 'cumple requerimientos'
+    parameter_name = 'cumple'
+
+    def lookups(self, request, model_admin):
+        return (('1', 'Sí'), ('0', 'No'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.filter(cumple=self.value() == '1')
+        return queryset
+
+@admin.register(RequerimientosCliente)
+class RequerimientosClienteAdmin(admin.ModelAdmin):
+    list_display = ('instalacion', 'get_personal_asignado', 'personal_requerido',
+                    'get_vehiculos_asignados', 'cantidad_vehiculos', 'get_cumple')
+    search_fields = ('instalacion__nombre', 'instalacion__cliente__razon_social')
+    list_filter = (CumpleRequerimientosFilter, 'requiere_personal', 'requiere_vehiculos')
+    list_select_related = ('instalacion__cliente',)
+    autocomplete_fields = ('instalacion',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_compliance()
+
+    def get_personal_asignado(self, obj):
+        return obj.num_personal_asignado
+    get_personal_asignado.short_description = 'Personal asignado'
+    get_personal_asignado.admin_order_field = 'num_personal_asignado'
+
+    def get_vehiculos_asignados(self, obj):
+        return obj.num_vehiculos_asignados
+    get_vehiculos_asignados.short_description = 'Vehículos asignados'
+    get_vehiculos_asignados.admin_order_field = 'num_vehiculos_asignados'
+
+    def get_cumple(self, obj):
+        return obj.cumple
+    get_cumple.short_description = 'Cumple'
+    get_cumple.boolean = True
+    get_cumple.admin_order_field = 'cumple'
+
 @admin.register(Cargo)
 class CargoAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'descripcion')
@@ -44,6 +88,8 @@ class PersonalAdmin(admin.ModelAdmin):
     list_display = ('nombres', 'apellidos', 'rut', 'cargo', 'instalacion_asignada', 'activo')
     search_fields = ('nombres', 'apellidos', 'rut')
     list_filter = ('cargo', 'instalacion_asignada', 'activo')
+    autocomplete_fields = ('cliente', 'cargo', 'instalacion_asignada')
+    list_select_related = ('cargo', 'instalacion_asignada__cliente')
 
 @admin.register(TipoVehiculo)
 class TipoVehiculoAdmin(admin.ModelAdmin):
@@ -66,6 +112,8 @@ class IncidenciaAdmin(admin.ModelAdmin):
     list_display = ('titulo', 'instalacion', 'tipo_incidencia', 'fecha_hora_reporte', 'estado')
     search_fields = ('titulo', 'descripcion')
     list_filter = ('instalacion', 'tipo_incidencia', 'estado')
+    autocomplete_fields = ('instalacion', 'tipo_incidencia', 'personal_involucrado', 'reportado_por')
+    list_select_related = ('instalacion__cliente', 'tipo_incidencia')
 
 @admin.register(Turno)
 class TurnoAdmin(admin.ModelAdmin):
@@ -73,6 +121,8 @@ class TurnoAdmin(admin.ModelAdmin):
     search_fields = ('personal__nombres', 'personal__apellidos', 'instalacion__nombre')
     list_filter = ('instalacion', 'tipo_turno', 'estado', 'fecha')
     date_hierarchy = 'fecha'
+    autocomplete_fields = ('personal', 'instalacion')
+    list_select_related = ('personal', 'instalacion__cliente')
     
     def get_horario(self, obj):
         """Método personalizado para mostrar el horario del turno"""
@@ -81,3 +131,16 @@ class TurnoAdmin(admin.ModelAdmin):
         return "-"
     get_horario.short_description = 'Horario'
     get_horario.admin_order_field = 'fecha_inicio'
+
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'nombre', 'irrenunciable')
+    search_fields = ('nombre',)
+    list_filter = ('irrenunciable',)
+    date_hierarchy = 'fecha'
+
+@admin.register(TrabajoImportacion)
+class TrabajoImportacionAdmin(admin.ModelAdmin):
+    list_display = ('nombre_archivo', 'tipo', 'estado', 'filas_procesadas', 'filas_creadas', 'filas_actualizadas', 'filas_fallidas', 'fecha_creacion')
+    list_filter = ('tipo', 'estado')
+    readonly_fields = ('fecha_creacion', 'fecha_inicio', 'fecha_fin')
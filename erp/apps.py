@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ErpConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "erp"
+
+    def ready(self):
+        # Registrar los receptores de señales de la app
+        from . import signals  # noqa: F401
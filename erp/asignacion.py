@@ -0,0 +1,339 @@
+"""
+Asignación automática de personal a los tramos sin cubrir de una instalación.
+
+Los tramos faltantes salen del pronóstico de brechas y el personal elegible
+es el activo del cliente de la instalación. La disponibilidad de cada guardia
+se precalcula como una lista ordenada de sus turnos (una sola consulta), de
+modo que verificar superposición, descanso mínimo, horas en 7 días y días
+seguidos es una búsqueda binaria y no una consulta por candidato. Los
+límites de jornada son los de la rotación de la configuración
+(cumplimiento.limites_rotacion): las horas se controlan en ventanas del
+largo de su ciclo.
+
+La asignación es voraz con reparación: cada tramo, en orden cronológico, se
+entrega a los guardias factibles con menos horas en el rango (reparto
+equitativo) y, si quedan cupos sin cubrir, se intenta liberar a un guardia
+moviendo una asignación nueva que lo bloquea hacia otro guardia. Las
+asignaciones aceptadas se insertan con bulk_create.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import pronostico
+from .conflictos import validar_candidatos
+from .cumplimiento import ESTADOS_TRABAJADOS, dias_ventana, limites_rotacion
+from .models import Personal, Turno
+from .planificacion import BATCH_SIZE, horarios_por_dia
+from .reportes import invalidar_horas
+from .utils import rango_datetime
+
+DIA = timedelta(days=1)
+
+_inicio = itemgetter(0)
+
+
+class Hueco:
+    """Tramo de un día con cupos sin cubrir"""
+
+    def __init__(self, fecha, tramo, inicio, fin, horas, faltantes):
+        self.fecha = fecha
+        self.tramo = tramo
+        self.inicio = inicio
+        self.fin = fin
+        self.horas = horas
+        self.faltantes = faltantes
+        self.dia = timezone.localtime(inicio).date()
+        self.asignados = {}
+
+    @property
+    def pendientes(self):
+        return self.faltantes - len(self.asignados)
+
+
+class Agenda:
+    """
+    Turnos de un guardia como tuplas (inicio, fin, horas, hueco) ordenadas por
+    inicio; hueco es None en los turnos ya existentes. limites['horas_semanales']
+    es el máximo de horas en ventana.
+    """
+
+    def __init__(self, personal_id, limites, ventana, rango):
+        self.personal_id = personal_id
+        self.horas_semanales = limites['horas_semanales']
+        self.ventana = ventana
+        self.descanso = timedelta(hours=limites['descanso'])
+        self.max_dias = limites['dias_consecutivos']
+        self.rango = rango
+        self.turnos = []
+        self.dias = Counter()
+        # Horas de los turnos que empiezan dentro del rango, para el reparto equitativo
+        self.horas = 0.0
+
+    def agregar(self, inicio, fin, horas, dia, hueco=None):
+        entrada = (inicio, fin, horas, hueco)
+        insort(self.turnos, entrada, key=_inicio)
+        self.dias[dia] += 1
+        if self.rango[0] <= inicio < self.rango[1]:
+            self.horas += horas
+        return entrada
+
+    def quitar(self, entrada, dia):
+        self.turnos.remove(entrada)
+        self.dias[dia] -= 1
+        if not self.dias[dia]:
+            del self.dias[dia]
+        if self.rango[0] <= entrada[0] < self.rango[1]:
+            self.horas -= entrada[2]
+
+    def cercanos(self, inicio, fin):
+        """Turnos cuyo descanso se cruza con [inicio, fin)"""
+        # Un turno dura a lo más un día: los que empiezan antes de eso ya terminaron
+        desde = bisect_left(self.turnos, inicio - DIA - self.descanso, key=_inicio)
+        hasta = bisect_left(self.turnos, fin + self.descanso, key=_inicio)
+        return [t for t in self.turnos[desde:hasta] if t[1] + self.descanso > inicio]
+
+    def admite(self, inicio, fin, horas, dia):
+        """Si el turno cabe sin superposiciones ni infracciones de jornada"""
+        if self.cercanos(inicio, fin):
+            return False
+
+        # Horas en ventana: toda ventana que termine en el turno nuevo o en uno posterior cercano
+        desde = bisect_right(self.turnos, inicio - self.ventana, key=_inicio)
+        hasta = bisect_left(self.turnos, inicio + self.ventana, key=_inicio)
+        ventana = self.turnos[desde:hasta]
+        for cierre in [inicio] + [t[0] for t in ventana if t[0] > inicio]:
+            total = horas + sum(t[2] for t in ventana if cierre - self.ventana < t[0] <= cierre)
+            if total > self.horas_semanales:
+                return False
+
+        # Días seguidos: la racha que formaría el día nuevo con los trabajados antes y después
+        if dia not in self.dias:
+            racha = 1
+            anterior = dia - DIA
+            while anterior in self.dias:
+                racha += 1
+                anterior -= DIA
+            siguiente = dia + DIA
+            while siguiente in self.dias:
+                racha += 1
+                siguiente += DIA
+            if racha > self.max_dias:
+                return False
+        return True
+
+
+class ResultadoAsignacion:
+    """Asignaciones propuestas (o guardadas) y cupos que quedaron sin cubrir"""
+
+    def __init__(self, instalacion, fecha_desde, fecha_hasta, huecos, agendas):
+        self.instalacion = instalacion
+        self.fecha_desde = fecha_desde
+        self.fecha_hasta = fecha_hasta
+        self.huecos = huecos
+        self.agendas = agendas
+        self.creados = 0
+
+    @property
+    def asignaciones(self):
+        """(personal_id, hueco) de cada asignación, en orden cronológico"""
+        return [
+            (personal_id, hueco)
+            for hueco in self.huecos
+            for personal_id in sorted(hueco.asignados)
+        ]
+
+    @property
+    def requeridos(self):
+        return sum(h.faltantes for h in self.huecos)
+
+    @property
+    def sin_cubrir(self):
+        return [
+            {'fecha': h.fecha, 'tramo': h.tramo, 'faltantes': h.pendientes}
+            for h in self.huecos if h.pendientes
+        ]
+
+    @property
+    def horas_por_personal(self):
+        """Horas nuevas asignadas a cada guardia"""
+        horas = Counter()
+        for personal_id, hueco in self.asignaciones:
+            horas[personal_id] += float(hueco.horas)
+        return dict(horas)
+
+
+def huecos_instalacion(configuracion, fecha_desde, fecha_hasta):
+    """Tramos con cupos sin cubrir de la instalación de la configuración, por inicio"""
+    dias = (fecha_hasta - fecha_desde).days + 1
+    brechas = pronostico.calcular_pronostico(
+        fecha_desde, dias, configuracion.requerimientos.instalacion_id
+    ).brechas()
+    horarios = horarios_por_dia(configuracion, fecha_desde, dias)
+    huecos = [
+        Hueco(b['fecha'], b['tramo'], *horarios[b['tramo']][(b['fecha'] - fecha_desde).days][1:], b['faltantes'])
+        for b in brechas
+    ]
+    huecos.sort(key=lambda h: (h.inicio, h.tramo))
+    return huecos
+
+
+def agendas_personal(instalacion, fecha_desde, fecha_hasta, limites, ventana):
+    """
+    Agenda de cada guardia activo del cliente de la instalación con sus
+    turnos trabajados alrededor del rango (una consulta para todos).
+    """
+    rango = rango_datetime(fecha_desde, fecha_hasta)
+    agendas = {
+        pk: Agenda(pk, limites, ventana, rango)
+        for pk in Personal.objects.filter(
+            cliente_id=instalacion.cliente_id, activo=True
+        ).order_by('pk').values_list('pk', flat=True)
+    }
+    # Contexto a ambos lados: la ventana de horas o la racha máxima de días, lo que sea mayor
+    margen = max(ventana, timedelta(days=limites['dias_consecutivos'] + 1))
+    turnos = Turno.objects.filter(
+        personal__cliente_id=instalacion.cliente_id,
+        personal__activo=True,
+        estado__in=ESTADOS_TRABAJADOS,
+        fecha_inicio__gte=rango[0] - margen,
+        fecha_inicio__lt=rango[1] + margen,
+    ).order_by('personal_id', 'fecha_inicio').values_list('personal_id', 'fecha_inicio', 'fecha_fin')
+    for personal_id, inicio, fin in turnos.iterator(chunk_size=5000):
+        agendas[personal_id].agregar(
+            inicio, fin, round((fin - inicio).total_seconds() / 3600, 2), timezone.localtime(inicio).date()
+        )
+    return agendas
+
+
+def _asignar(agenda, hueco):
+    hueco.asignados[agenda.personal_id] = agenda.agregar(
+        hueco.inicio, hueco.fin, float(hueco.horas), hueco.dia, hueco
+    )
+
+
+def _desasignar(agenda, hueco):
+    agenda.quitar(hueco.asignados.pop(agenda.personal_id), hueco.dia)
+
+
+def _admite(agenda, hueco):
+    return agenda.admite(hueco.inicio, hueco.fin, float(hueco.horas), hueco.dia)
+
+
+def _por_horas(agendas):
+    return sorted(agendas.values(), key=lambda a: a.horas)
+
+
+def asignar_voraz(huecos, agendas):
+    """Cada tramo, en orden, a los guardias factibles con menos horas"""
+    for hueco in huecos:
+        for agenda in _por_horas(agendas):
+            if not hueco.pendientes:
+                break
+            if _admite(agenda, hueco):
+                _asignar(agenda, hueco)
+
+
+def reparar(huecos, agendas):
+    """
+    Para cada cupo pendiente busca un guardia bloqueado solo por una
+    asignación nueva que pueda pasar a otro guardia; así el guardia queda
+    libre para el cupo. Devuelve la cantidad de cupos recuperados.
+    """
+    recuperados = 0
+    # Tramos cuya asignación ya se intentó mover sin éxito (solo se vuelve más difícil)
+    inamovibles = set()
+    for hueco in huecos:
+        for agenda in _por_horas(agendas):
+            if not hueco.pendientes:
+                break
+            if agenda.personal_id in hueco.asignados:
+                continue
+            bloqueos = agenda.cercanos(hueco.inicio, hueco.fin)
+            if len(bloqueos) != 1 or bloqueos[0][3] is None or id(bloqueos[0][3]) in inamovibles:
+                continue
+            otro = bloqueos[0][3]
+            _desasignar(agenda, otro)
+            if _admite(agenda, hueco):
+                reemplazo = next((
+                    a for a in _por_horas(agendas)
+                    if a is not agenda and a.personal_id not in otro.asignados and _admite(a, otro)
+                ), None)
+                if reemplazo is not None:
+                    _asignar(reemplazo, otro)
+                    _asignar(agenda, hueco)
+                    recuperados += 1
+                    continue
+                inamovibles.add(id(otro))
+            _asignar(agenda, otro)
+    return recuperados
+
+
+def asignar_turnos(configuracion, fecha_desde, fecha_hasta, guardar=False,
+                   creado_por=None, batch_size=BATCH_SIZE):
+    """
+    Propone (y si guardar es True, inserta) turnos para los tramos sin cubrir
+    de la instalación de la configuración entre fecha_desde y fecha_hasta.
+    Devuelve un ResultadoAsignacion.
+    """
+    if fecha_hasta < fecha_desde:
+        raise ValueError('La fecha de término debe ser igual o posterior a la de inicio')
+    if configuracion.requerimientos is None:
+        raise ValueError('La configuración de turnos no está asociada a una instalación')
+    instalacion = configuracion.requerimientos.instalacion
+
+    rotacion = (configuracion.dias_trabajo, configuracion.dias_descanso)
+    limites = limites_rotacion(rotacion)
+    ventana = timedelta(days=dias_ventana(rotacion))
+    huecos = huecos_instalacion(configuracion, fecha_desde, fecha_hasta)
+    agendas = agendas_personal(instalacion, fecha_desde, fecha_hasta, limites, ventana) if huecos else {}
+    asignar_voraz(huecos, agendas)
+    if any(h.pendientes for h in huecos):
+        reparar(huecos, agendas)
+
+    resultado = ResultadoAsignacion(instalacion, fecha_desde, fecha_hasta, huecos, agendas)
+    if guardar and resultado.asignaciones:
+        resultado.creados = guardar_asignaciones(resultado, configuracion, creado_por, batch_size)
+    return resultado
+
+
+def guardar_asignaciones(resultado, configuracion, creado_por=None, batch_size=BATCH_SIZE):
+    """Inserta los turnos del resultado; ConflictoTurnosError si chocan con otros"""
+    creado_por_id = creado_por.pk if creado_por else None
+    asignaciones = resultado.asignaciones
+    turnos = (
+        # bulk_create no llama a Turno.save(): las horas se completan aquí
+        Turno(
+            personal_id=personal_id,
+            instalacion_id=resultado.instalacion.pk,
+            configuracion_id=configuracion.pk,
+            fecha=hueco.fecha,
+            fecha_inicio=hueco.inicio,
+            fecha_fin=hueco.fin,
+            tipo_turno=hueco.tramo,
+            estado='P',
+            horas_planificadas=hueco.horas,
+            horas_reales=hueco.horas,
+            creado_por_id=creado_por_id,
+        )
+        for personal_id, hueco in asignaciones
+    )
+    creados = 0
+    with transaction.atomic():
+        validar_candidatos(resultado.fecha_desde, resultado.fecha_hasta, (
+            (personal_id, hueco.inicio, hueco.fin, None) for personal_id, hueco in asignaciones
+        ))
+        while True:
+            lote = list(islice(turnos, batch_size))
+            if not lote:
+                break
+            Turno.objects.bulk_create(lote, batch_size=batch_size)
+            creados += len(lote)
+        invalidar_horas(resultado.fecha_desde, resultado.fecha_hasta)
+        pronostico.invalidar()
+    return creados
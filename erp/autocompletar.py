@@ -0,0 +1,74 @@
+"""
+Búsqueda paginada de opciones para los campos con autocompletado.
+
+Los formularios con muchas opciones (personal, instalaciones, clientes,
+cargos) no cargan el listado completo en el <select>: el widget muestra solo
+la opción elegida y pide las demás a /api/autocompletar/<tipo>/ a medida que
+se escribe. Cada palabra escrita debe aparecer en alguno de los campos de
+búsqueda (como en los search_fields del admin).
+"""
+from django.db.models import Q
+
+from .models import Cargo, Cliente, Instalacion, Personal
+from .rut import separar_rut
+
+# Opciones por página de resultados
+POR_PAGINA = 20
+
+
+class Autocompletar:
+    """
+    Definición de una búsqueda: campos en que se busca, orden, relaciones a
+    precargar para el texto de cada opción y filtros admitidos en la URL
+    (parámetro -> campo).
+    """
+
+    def __init__(self, modelo, campos, orden, relacionados=(), filtros=None, base=None, rut=False):
+        self.modelo = modelo
+        self.campos = campos
+        self.orden = orden
+        self.relacionados = relacionados
+        self.filtros = filtros or {}
+        self.base = base or {}
+        self.rut = rut
+
+    def queryset(self, texto='', filtros=None):
+        queryset = self.modelo.objects.filter(**self.base).select_related(*self.relacionados)
+        for parametro, valor in (filtros or {}).items():
+            if parametro in self.filtros and valor:
+                queryset = queryset.filter(**{self.filtros[parametro]: valor})
+        for palabra in texto.split():
+            condicion = Q()
+            for campo in self.campos:
+                condicion |= Q(**{f'{campo}__icontains': palabra})
+            if self.rut and separar_rut(palabra):
+                # RUT escrito completo en cualquier formato: igualdad sobre el índice
+                condicion |= Q(rut_numero=separar_rut(palabra)[0])
+            queryset = queryset.filter(condicion)
+        return queryset.order_by(*self.orden)
+
+    def pagina(self, texto='', numero=1, filtros=None):
+        """(opciones, hay_mas) de la página pedida; cada opción es {'id', 'texto'}"""
+        inicio = (numero - 1) * POR_PAGINA
+        objetos = list(self.queryset(texto, filtros)[inicio:inicio + POR_PAGINA + 1])
+        return (
+            [{'id': objeto.pk, 'texto': str(objeto)} for objeto in objetos[:POR_PAGINA]],
+            len(objetos) > POR_PAGINA,
+        )
+
+
+AUTOCOMPLETAR = {
+    'personal': Autocompletar(
+        Personal, ['nombres', 'apellidos', 'rut'], ['apellidos', 'nombres'],
+        # instalacion: todo el personal del cliente de la instalación, no solo el asignado a ella,
+        # para poder elegir relevos y reemplazos
+        filtros={'cliente': 'cliente_id', 'instalacion': 'cliente__instalaciones'},
+        base={'activo': True}, rut=True,
+    ),
+    'instalacion': Autocompletar(
+        Instalacion, ['nombre', 'cliente__razon_social'], ['nombre'],
+        relacionados=['cliente'], filtros={'cliente': 'cliente_id'}, base={'activa': True},
+    ),
+    'cliente': Autocompletar(Cliente, ['razon_social', 'rut'], ['razon_social'], rut=True),
+    'cargo': Autocompletar(Cargo, ['nombre'], ['nombre']),
+}
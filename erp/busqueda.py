@@ -0,0 +1,177 @@
+"""
+Búsqueda de texto completo de clientes e instalaciones.
+
+En SQLite se usa una tabla virtual FTS5 (erp_busqueda) con un documento por
+cliente (razón social, RUT, dirección, contacto y gestores) y por instalación
+(nombre, dirección, contacto, cliente y gestor). Los resultados se ordenan
+por relevancia (bm25) y la razón social o el nombre pesan más que el resto.
+Las señales de Cliente, GestorCliente e Instalacion mantienen el índice al
+día. En otros motores, o si FTS5 no está disponible, se usa icontains.
+"""
+import re
+
+from django.db import DatabaseError, connection
+from django.db.models import Q
+
+from .models import Cliente, GestorCliente, Instalacion
+
+TABLA = 'erp_busqueda'
+
+# Peso de cada columna en bm25 (tipo, objeto_id, titulo, contenido)
+PESOS = (0.0, 0.0, 10.0, 1.0)
+
+_fts_disponible = False
+
+
+def fts_disponible():
+    """Indica si el índice FTS5 existe en la base de datos actual"""
+    global _fts_disponible
+    if connection.vendor != 'sqlite':
+        return False
+    # Solo se recuerda el resultado positivo: la tabla puede crearse con migrate
+    if not _fts_disponible:
+        _fts_disponible = TABLA in connection.introspection.table_names()
+    return _fts_disponible
+
+
+def crear_indice(conexion):
+    """Crea la tabla FTS5; devuelve False si el motor no la soporta"""
+    if conexion.vendor != 'sqlite':
+        return False
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+                "tipo UNINDEXED, objeto_id UNINDEXED, titulo, contenido, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+    except DatabaseError:
+        # SQLite compilado sin FTS5
+        return False
+    return True
+
+
+def _sql_clientes(filtro=''):
+    # El RUT se indexa también sin puntos ni guion para encontrarlo escrito de corrido
+    return f"""
+        INSERT INTO {TABLA} (tipo, objeto_id, titulo, contenido)
+        SELECT 'cliente', c.id, c.razon_social,
+               c.rut || ' ' || REPLACE(REPLACE(c.rut, '.', ''), '-', '') || ' ' ||
+               c.direccion || ' ' || c.email_contacto || ' ' || c.telefono_contacto || ' ' ||
+               COALESCE((
+                   SELECT GROUP_CONCAT(g.nombre || ' ' || g.email || ' ' || g.cargo, ' ')
+                   FROM {GestorCliente._meta.db_table} g WHERE g.cliente_id = c.id
+               ), '')
+        FROM {Cliente._meta.db_table} c {filtro}
+    """
+
+
+def _sql_instalaciones(filtro=''):
+    return f"""
+        INSERT INTO {TABLA} (tipo, objeto_id, titulo, contenido)
+        SELECT 'instalacion', i.id, i.nombre,
+               i.direccion || ' ' || i.contacto_nombre || ' ' || i.contacto_email || ' ' ||
+               c.razon_social || ' ' || COALESCE(g.nombre, '')
+        FROM {Instalacion._meta.db_table} i
+        JOIN {Cliente._meta.db_table} c ON c.id = i.cliente_id
+        LEFT JOIN {GestorCliente._meta.db_table} g ON g.id = i.gestor_id
+        {filtro}
+    """
+
+
+def reconstruir_indice(conexion=connection):
+    """Vuelve a generar todos los documentos del índice"""
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+        cursor.execute(_sql_clientes())
+        cursor.execute(_sql_instalaciones())
+
+
+def _marcadores(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+def indexar_clientes(ids):
+    """Actualiza los documentos de los clientes indicados (y borra los que ya no existen)"""
+    ids = list(ids)
+    if not ids or not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLA} WHERE tipo = 'cliente' AND objeto_id IN ({_marcadores(ids)})", ids
+        )
+        cursor.execute(_sql_clientes(f'WHERE c.id IN ({_marcadores(ids)})'), ids)
+
+
+def indexar_instalaciones(ids=None, cliente_id=None):
+    """Actualiza los documentos de las instalaciones indicadas o de todas las de un cliente"""
+    if not fts_disponible():
+        return
+    if cliente_id is not None:
+        ids = list(Instalacion.objects.filter(cliente_id=cliente_id).values_list('id', flat=True))
+    ids = list(ids or [])
+    if not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLA} WHERE tipo = 'instalacion' AND objeto_id IN ({_marcadores(ids)})", ids
+        )
+        cursor.execute(_sql_instalaciones(f'WHERE i.id IN ({_marcadores(ids)})'), ids)
+
+
+def consulta_fts(texto):
+    """
+    Convierte el texto ingresado en una consulta FTS5 segura: cada palabra
+    se busca como prefijo y todas deben aparecer.
+    """
+    palabras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def _buscar_fts(tipo, texto, limite):
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return []
+    pesos = ', '.join(str(p) for p in PESOS)
+    sql = (
+        f"SELECT objeto_id FROM {TABLA} WHERE {TABLA} MATCH %s AND tipo = %s "
+        f"ORDER BY bm25({TABLA}, {pesos})"
+    )
+    parametros = [consulta, tipo]
+    if limite:
+        sql += ' LIMIT %s'
+        parametros.append(limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _buscar_icontains(tipo, texto, limite):
+    if tipo == 'cliente':
+        resultados = Cliente.objects.filter(
+            Q(razon_social__icontains=texto) |
+            Q(rut__icontains=texto) |
+            Q(gestores__nombre__icontains=texto)
+        ).order_by('razon_social')
+    else:
+        resultados = Instalacion.objects.filter(
+            Q(nombre__icontains=texto) |
+            Q(direccion__icontains=texto) |
+            Q(contacto_nombre__icontains=texto) |
+            Q(cliente__razon_social__icontains=texto)
+        ).order_by('nombre')
+    ids = resultados.values_list('id', flat=True).distinct()
+    return list(ids[:limite] if limite else ids)
+
+
+def buscar(tipo, texto, limite=None):
+    """IDs de clientes o instalaciones ('cliente' / 'instalacion') ordenados por relevancia"""
+    if fts_disponible():
+        return _buscar_fts(tipo, texto, limite)
+    return _buscar_icontains(tipo, texto, limite)
+
+
+def objetos_en_orden(queryset, ids):
+    """Carga los objetos de una lista de IDs respetando el orden de la lista"""
+    objetos = queryset.in_bulk(ids)
+    return [objetos[pk] for pk in ids if pk in objetos]
@@ -0,0 +1,71 @@
+"""
+Cobertura de personal y vehículos de todas las instalaciones.
+
+Compara la dotación asignada a cada instalación con la requerida en
+RequerimientosCliente. Todas las instalaciones se calculan en una sola
+consulta (Instalacion.objects.with_cobertura()), ordenable por déficit para
+ubicar de inmediato las que están por debajo de lo requerido.
+"""
+from .models import Instalacion
+
+# Criterio de orden -> campos de order_by
+ORDENES = {
+    'deficit': ['-deficit_total', '-deficit_personal', 'nombre'],
+    'deficit_personal': ['-deficit_personal', '-deficit_vehiculos', 'nombre'],
+    'deficit_vehiculos': ['-deficit_vehiculos', '-deficit_personal', 'nombre'],
+    'nombre': ['nombre'],
+    'cliente': ['cliente__razon_social', 'nombre'],
+}
+
+
+def porcentaje(asignado, requerido):
+    """Porcentaje cubierto (máximo 100) o None si no se requiere nada"""
+    if not requerido:
+        return None
+    return min(asignado / requerido * 100, 100)
+
+
+def instalaciones_cobertura(orden='deficit', cliente_id=None, solo_deficit=False, incluir_inactivas=False):
+    """Queryset de instalaciones anotado con su cobertura, en el orden pedido"""
+    queryset = Instalacion.objects.select_related('cliente').with_cobertura()
+    if not incluir_inactivas:
+        queryset = queryset.filter(activa=True)
+    if cliente_id:
+        queryset = queryset.filter(cliente_id=cliente_id)
+    if solo_deficit:
+        queryset = queryset.filter(deficit_total__gt=0)
+    return queryset.order_by(*ORDENES[orden])
+
+
+def resumen(queryset):
+    """Totales del queryset de instalaciones_cobertura (una consulta)"""
+    totales = {'instalaciones': 0, 'con_deficit': 0, 'deficit_personal': 0, 'deficit_vehiculos': 0}
+    # Se suman en Python: aggregate() sobre anotaciones con subconsultas no genera SQL válido en SQLite
+    for deficit_personal, deficit_vehiculos in queryset.order_by().values_list('deficit_personal', 'deficit_vehiculos'):
+        totales['instalaciones'] += 1
+        totales['con_deficit'] += bool(deficit_personal or deficit_vehiculos)
+        totales['deficit_personal'] += deficit_personal
+        totales['deficit_vehiculos'] += deficit_vehiculos
+    return totales
+
+
+def como_dict(instalacion):
+    """Fila de cobertura serializable a JSON"""
+    return {
+        'id': instalacion.pk,
+        'nombre': instalacion.nombre,
+        'cliente': instalacion.cliente.razon_social,
+        'personal_asignado': instalacion.cobertura_personal_asignado,
+        'personal_requerido': instalacion.cobertura_personal_requerido,
+        'deficit_personal': instalacion.deficit_personal,
+        'cobertura_personal': porcentaje(
+            instalacion.cobertura_personal_asignado, instalacion.cobertura_personal_requerido
+        ),
+        'vehiculos_asignados': instalacion.cobertura_vehiculos_asignados,
+        'vehiculos_requeridos': instalacion.cobertura_vehiculos_requeridos,
+        'deficit_vehiculos': instalacion.deficit_vehiculos,
+        'cobertura_vehiculos': porcentaje(
+            instalacion.cobertura_vehiculos_asignados, instalacion.cobertura_vehiculos_requeridos
+        ),
+        'deficit_total': instalacion.deficit_total,
+    }
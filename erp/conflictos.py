@@ -0,0 +1,136 @@
+"""
+Detección de turnos superpuestos en lote.
+
+En lugar de una consulta EXISTS por turno (Turno.esta_superpuesto), se cargan
+de una vez los turnos del personal involucrado, ordenados por persona e
+inicio, y se recorren con una línea de barrido que reporta cada par de turnos
+superpuestos.
+"""
+from heapq import merge
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import F
+
+from .models import Turno
+from .utils import rango_datetime
+
+# Estados que ocupan al personal (mismo criterio que Turno.esta_superpuesto)
+ESTADOS_ACTIVOS = ['P', 'E']
+
+
+class ConflictoTurnosError(ValueError):
+    """Se lanza cuando un conjunto de turnos nuevos choca con otros turnos"""
+
+    def __init__(self, conflictos):
+        self.conflictos = conflictos
+        super().__init__(f'Se encontraron {len(conflictos)} superposiciones de turnos')
+
+
+def _turnos_existentes(inicio, fin, personal_ids=None, instalacion=None):
+    """
+    Turnos activos que se superponen con [inicio, fin) como tuplas
+    (personal_id, fecha_inicio, fecha_fin, turno_id), ordenadas por persona e inicio.
+    """
+    turnos = Turno.objects.filter(
+        estado__in=ESTADOS_ACTIVOS,
+        fecha_inicio__lt=fin,
+        fecha_fin__gt=inicio
+    )
+    if personal_ids is not None:
+        turnos = turnos.filter(personal_id__in=personal_ids)
+    elif instalacion is not None:
+        # Todo el personal con turnos en la instalación, incluidos sus turnos en otras instalaciones
+        turnos = turnos.filter(personal_id__in=Turno.objects.filter(
+            instalacion=instalacion,
+            estado__in=ESTADOS_ACTIVOS,
+            fecha_inicio__lt=fin,
+            fecha_fin__gt=inicio
+        ).values('personal_id'))
+    return turnos.order_by('personal_id', 'fecha_inicio').values_list(
+        'personal_id', 'fecha_inicio', 'fecha_fin', 'id'
+    ).iterator(chunk_size=5000)
+
+
+def barrer_superposiciones(intervalos):
+    """
+    Recorre intervalos (personal_id, inicio, fin, referencia) ordenados por
+    persona e inicio y devuelve todos los pares que se superponen.
+    """
+    conflictos = []
+    for personal_id, turnos in groupby(intervalos, key=itemgetter(0)):
+        activos = []
+        for actual in turnos:
+            inicio = actual[1]
+            # Solo siguen activos los turnos que terminan después del inicio actual
+            activos = [previo for previo in activos if previo[2] > inicio]
+            for previo in activos:
+                conflictos.append({
+                    'personal_id': personal_id,
+                    'turno_a': previo[3],
+                    'inicio_a': previo[1],
+                    'fin_a': previo[2],
+                    'turno_b': actual[3],
+                    'inicio_b': actual[1],
+                    'fin_b': actual[2],
+                })
+            activos.append(actual)
+    return conflictos
+
+
+def detectar_superposiciones(fecha_desde, fecha_hasta, personal_ids=None,
+                             instalacion=None, candidatos=None):
+    """
+    Reporta todos los pares de turnos superpuestos entre fecha_desde y
+    fecha_hasta (inclusive).
+
+    candidatos permite validar turnos aún no guardados: tuplas
+    (personal_id, fecha_inicio, fecha_fin, referencia). En ese caso solo se
+    cargan los turnos existentes del personal de los candidatos.
+    """
+    inicio, fin = rango_datetime(fecha_desde, fecha_hasta)
+    if candidatos is not None:
+        candidatos = sorted(candidatos, key=itemgetter(0, 1))
+        if personal_ids is None:
+            personal_ids = {c[0] for c in candidatos}
+        if candidatos:
+            # Un turno nocturno del último día puede terminar fuera del rango
+            inicio = min(inicio, min(c[1] for c in candidatos))
+            fin = max(fin, max(c[2] for c in candidatos))
+    existentes = _turnos_existentes(inicio, fin, personal_ids, instalacion)
+    if candidatos:
+        intervalos = merge(existentes, candidatos, key=itemgetter(0, 1))
+    else:
+        intervalos = existentes
+    return barrer_superposiciones(intervalos)
+
+
+def validar_candidatos(fecha_desde, fecha_hasta, candidatos):
+    """
+    Lanza ConflictoTurnosError si algún turno candidato se superpone con otro
+    candidato o con un turno guardado. Los choques entre turnos ya guardados
+    no cuentan: las referencias de los candidatos deben distinguirse de los
+    id de turnos (None o números negativos).
+    """
+    candidatos = list(candidatos)
+    referencias = {c[3] for c in candidatos}
+    conflictos = [
+        conflicto
+        for conflicto in detectar_superposiciones(fecha_desde, fecha_hasta, candidatos=candidatos)
+        if conflicto['turno_a'] in referencias or conflicto['turno_b'] in referencias
+    ]
+    if conflictos:
+        raise ConflictoTurnosError(conflictos)
+
+
+def turnos_excedidos(fecha_desde, fecha_hasta):
+    """
+    Turnos guardados que duran más que Turno.DURACION_MAXIMA (anteriores a la
+    validación en save()); get_turns_at no los encuentra y deben corregirse.
+    """
+    inicio, fin = rango_datetime(fecha_desde, fecha_hasta)
+    return Turno.objects.filter(
+        fecha_inicio__gte=inicio,
+        fecha_inicio__lt=fin,
+        fecha_fin__gt=F('fecha_inicio') + Turno.DURACION_MAXIMA
+    ).order_by('fecha_inicio').values_list('id', 'personal_id', 'fecha_inicio', 'fecha_fin')
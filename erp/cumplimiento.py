@@ -0,0 +1,272 @@
+"""
+Control de la jornada laboral de los turnos.
+
+Verifica, para todo el personal de un rango de fechas, que los turnos
+respeten el máximo de horas semanales, el descanso mínimo entre turnos y el
+máximo de días seguidos de trabajo. Los turnos se cargan en una sola
+consulta ordenada por (personal, fecha_inicio) y cada regla se evalúa en la
+misma pasada por guardia, con sumas de ventana móvil en lugar de una
+consulta por regla y por persona.
+
+Los límites se configuran en settings (ERP_MAX_HORAS_SEMANALES,
+ERP_DESCANSO_MINIMO_HORAS y ERP_MAX_DIAS_CONSECUTIVOS) y valen tal cual para
+los turnos sin rotación. En los turnos de una ConfiguracionTurno (la del
+turno o, si no tiene, la de su instalación) rigen como jornada excepcional:
+las horas semanales se promedian en el ciclo de la rotación (un 4x4 de 12
+horas suma 48 horas en 8 días, 42 por semana) y los días seguidos pueden
+llegar a los días de trabajo de la rotación (7 en un 7x7).
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Personal, Turno
+from .utils import rango_datetime
+
+# Estados que cuentan como trabajo (los cancelados y las ausencias no)
+ESTADOS_TRABAJADOS = ['P', 'E', 'C']
+
+SEMANA = timedelta(days=7)
+
+# Ciclo de rotación más largo en que se promedian las horas (días)
+CICLO_MAXIMO = 28
+
+
+def _horas(delta):
+    return round(delta.total_seconds() / 3600, 2)
+
+
+def dias_ventana(rotacion):
+    """Días en que se promedian las horas: el ciclo de la rotación, entre 7 y CICLO_MAXIMO"""
+    if rotacion is None:
+        return 7
+    return min(max(7, sum(rotacion)), CICLO_MAXIMO)
+
+
+class Regla(ABC):
+    """
+    Regla evaluada turno a turno sobre los turnos de una persona, en orden de
+    inicio. procesar() recibe la rotación del turno, (dias_trabajo,
+    dias_descanso) o None, y devuelve la infracción nueva (un dict) o None.
+    Las reglas que agrupan varios turnos seguidos en una misma infracción la
+    mantienen en abierta y la actualizan mientras dure.
+    """
+    codigo = None
+    descripcion = None
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.abierta = None
+
+    def reiniciar(self):
+        """Descarta el estado acumulado de la persona anterior"""
+
+    def limite_para(self, rotacion):
+        """Límite aplicable a los turnos de la rotación"""
+        return self.limite
+
+    @abstractmethod
+    def procesar(self, turno_id, inicio, fin, dia, rotacion):
+        """Agrega el turno al estado de la persona y devuelve la infracción nueva o None"""
+
+    def infraccion(self, turno_id, dia, valor, limite, **extra):
+        return {'regla': self.codigo, 'turno_id': turno_id, 'fecha': dia,
+                'valor': valor, 'limite': limite, **extra}
+
+
+class HorasSemanales(Regla):
+    """
+    Horas de los turnos iniciados en cualquier ventana de 7 días o, con
+    rotación, del largo de su ciclo y con el máximo semanal proporcional.
+    """
+    codigo = 'horas_semanales'
+    descripcion = 'Horas semanales sobre el máximo'
+
+    def limite_para(self, rotacion):
+        return round(self.limite * dias_ventana(rotacion) / 7, 2)
+
+    def reiniciar(self):
+        self.turnos = deque()
+        self.abierta = None
+
+    def procesar(self, turno_id, inicio, fin, dia, rotacion):
+        # Se conservan los turnos del ciclo más largo; la ventana depende de la rotación del turno
+        self.turnos.append((inicio, _horas(fin - inicio)))
+        while self.turnos[0][0] <= inicio - timedelta(days=CICLO_MAXIMO):
+            self.turnos.popleft()
+        desde = inicio - timedelta(days=dias_ventana(rotacion))
+        ventana = [t for t in self.turnos if t[0] > desde]
+        total = round(sum(horas for _, horas in ventana), 2)
+        limite = self.limite_para(rotacion)
+        if total <= limite:
+            self.abierta = None
+            return None
+        if self.abierta is not None:
+            # Mientras siga excedida se actualiza la misma infracción
+            self.abierta['valor'] = max(self.abierta['valor'], total)
+            return None
+        self.abierta = self.infraccion(turno_id, dia, total, limite, desde=ventana[0][0])
+        return self.abierta
+
+
+class DescansoMinimo(Regla):
+    """Horas entre el término de un turno y el inicio del siguiente"""
+    codigo = 'descanso'
+    descripcion = 'Descanso entre turnos bajo el mínimo'
+
+    def reiniciar(self):
+        self.fin_anterior = None
+        self.turno_anterior = None
+
+    def procesar(self, turno_id, inicio, fin, dia, rotacion):
+        infraccion = None
+        if self.fin_anterior is not None:
+            descanso = _horas(inicio - self.fin_anterior)
+            if descanso < self.limite:
+                infraccion = self.infraccion(turno_id, dia, descanso, self.limite,
+                                             turno_anterior=self.turno_anterior)
+        if self.fin_anterior is None or fin > self.fin_anterior:
+            self.fin_anterior = fin
+            self.turno_anterior = turno_id
+        return infraccion
+
+
+class DiasConsecutivos(Regla):
+    """Días calendario seguidos con al menos un turno; una rotación admite sus días de trabajo"""
+    codigo = 'dias_consecutivos'
+    descripcion = 'Días seguidos de trabajo sobre el máximo'
+
+    def limite_para(self, rotacion):
+        return max(self.limite, rotacion[0]) if rotacion is not None else self.limite
+
+    def reiniciar(self):
+        self.ultimo_dia = None
+        self.racha = 0
+        self.desde = None
+        self.abierta = None
+
+    def procesar(self, turno_id, inicio, fin, dia, rotacion):
+        if dia == self.ultimo_dia:
+            return None
+        if self.ultimo_dia is not None and dia - self.ultimo_dia == timedelta(days=1):
+            self.racha += 1
+        else:
+            self.racha, self.desde, self.abierta = 1, dia, None
+        self.ultimo_dia = dia
+        limite = self.limite_para(rotacion)
+        if self.racha <= limite:
+            return None
+        if self.abierta is not None:
+            self.abierta['valor'] = self.racha
+            return None
+        self.abierta = self.infraccion(turno_id, dia, self.racha, limite, desde=self.desde)
+        return self.abierta
+
+
+def reglas_configuradas():
+    """Reglas con los límites de settings (los de una semana sin rotación)"""
+    return [
+        HorasSemanales(getattr(settings, 'ERP_MAX_HORAS_SEMANALES', 42)),
+        DescansoMinimo(getattr(settings, 'ERP_DESCANSO_MINIMO_HORAS', 12)),
+        DiasConsecutivos(getattr(settings, 'ERP_MAX_DIAS_CONSECUTIVOS', 6)),
+    ]
+
+
+def limites_rotacion(rotacion, reglas=None):
+    """Límite de cada regla (por código) para los turnos de una rotación"""
+    reglas = reglas if reglas is not None else reglas_configuradas()
+    return {regla.codigo: regla.limite_para(rotacion) for regla in reglas}
+
+
+def evaluar(intervalos, reglas, desde=None):
+    """
+    Recorre intervalos (personal_id, inicio, fin, turno_id, dias_trabajo,
+    dias_descanso) ordenados por persona e inicio, con los días de la
+    rotación en None si el turno no tiene, aplicando todas las reglas en una pasada. Solo se
+    informan las infracciones de turnos que empiezan en desde o después (los
+    anteriores se cargan como contexto de las ventanas).
+    """
+    infracciones = []
+    for personal_id, turnos in groupby(intervalos, key=itemgetter(0)):
+        for regla in reglas:
+            regla.reiniciar()
+        for _, inicio, fin, turno_id, dias_trabajo, dias_descanso in turnos:
+            dia = timezone.localtime(inicio).date()
+            rotacion = (dias_trabajo, dias_descanso) if dias_trabajo is not None else None
+            for regla in reglas:
+                infraccion = regla.procesar(turno_id, inicio, fin, dia, rotacion)
+                if infraccion is None:
+                    continue
+                if desde is not None and inicio < desde:
+                    # Anterior al rango: si continúa dentro del rango se informa desde ahí
+                    regla.abierta = None
+                    continue
+                infraccion['personal_id'] = personal_id
+                infracciones.append(infraccion)
+    return infracciones
+
+
+def verificar_jornada(fecha_desde, fecha_hasta, personal_ids=None, instalacion=None, reglas=None):
+    """
+    Infracciones de los turnos que empiezan entre fecha_desde y fecha_hasta
+    (inclusive), del personal indicado o con turnos en la instalación.
+    """
+    reglas = reglas if reglas is not None else reglas_configuradas()
+    inicio, fin = rango_datetime(fecha_desde, fecha_hasta)
+    # Contexto previo para las ventanas: el ciclo más largo o la racha máxima de días, lo que sea mayor
+    margen = timedelta(days=max(
+        [CICLO_MAXIMO] + [r.limite + 1 for r in reglas if isinstance(r, DiasConsecutivos)]
+    ))
+    turnos = Turno.objects.filter(
+        estado__in=ESTADOS_TRABAJADOS,
+        fecha_inicio__gte=inicio - margen,
+        fecha_inicio__lt=fin,
+    )
+    if personal_ids is not None:
+        turnos = turnos.filter(personal_id__in=personal_ids)
+    elif instalacion is not None:
+        turnos = turnos.filter(personal_id__in=Turno.objects.filter(
+            instalacion=instalacion,
+            estado__in=ESTADOS_TRABAJADOS,
+            fecha_inicio__gte=inicio,
+            fecha_inicio__lt=fin,
+        ).values('personal_id'))
+    # Rotación de la configuración del turno o, si no tiene, de la de su instalación
+    intervalos = turnos.order_by('personal_id', 'fecha_inicio').values_list(
+        'personal_id', 'fecha_inicio', 'fecha_fin', 'id',
+        Coalesce('configuracion__dias_trabajo', 'instalacion__requerimientos__configuracion_turnos__dias_trabajo'),
+        Coalesce('configuracion__dias_descanso', 'instalacion__requerimientos__configuracion_turnos__dias_descanso'),
+    ).iterator(chunk_size=5000)
+    return evaluar(intervalos, reglas, desde=inicio)
+
+
+def reporte_jornada(fecha_desde, fecha_hasta, personal_ids=None, instalacion=None):
+    """Infracciones con el nombre y RUT de cada persona y totales por regla"""
+    reglas = reglas_configuradas()
+    infracciones = verificar_jornada(fecha_desde, fecha_hasta, personal_ids, instalacion, reglas)
+    personas = {
+        pk: (f'{nombres} {apellidos}', rut)
+        for pk, nombres, apellidos, rut in Personal.objects.filter(
+            pk__in={i['personal_id'] for i in infracciones}
+        ).values_list('id', 'nombres', 'apellidos', 'rut')
+    }
+    for infraccion in infracciones:
+        infraccion['nombre'], infraccion['rut'] = personas.get(infraccion['personal_id'], ('', ''))
+    infracciones.sort(key=itemgetter('fecha', 'nombre', 'regla'))
+    return {
+        'desde': fecha_desde,
+        'hasta': fecha_hasta,
+        'reglas': [
+            {'regla': r.codigo, 'descripcion': r.descripcion, 'limite': r.limite,
+             'infracciones': sum(1 for i in infracciones if i['regla'] == r.codigo)}
+            for r in reglas
+        ],
+        'personal_afectado': len(personas),
+        'infracciones': infracciones,
+    }
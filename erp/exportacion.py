@@ -0,0 +1,292 @@
+"""
+Exportación de datos a CSV y XLSX en streaming.
+
+Las filas se leen con values_list (solo las columnas exportadas, con los
+nombres relacionados resueltos por JOIN) sobre queryset.iterator(), y se
+escriben a medida que se envían: la memoria usada no depende de la cantidad
+de filas y la descarga comienza de inmediato.
+
+El formato de las columnas coincide con el de la importación masiva, de
+modo que un archivo exportado se puede volver a importar.
+"""
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Incidencia, Personal, Turno, Vehiculo
+
+# Filas leídas de la base de datos por viaje
+CHUNK_SIZE = 2000
+
+# Filas acumuladas antes de enviar un bloque al cliente
+FILAS_POR_BLOQUE = 500
+
+
+def formatear(valor):
+    """Convierte un valor de la base de datos al texto que se exporta"""
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sí' if valor else 'No'
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime('%d-%m-%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d-%m-%Y')
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+class Exportacion:
+    """
+    Definición de una exportación: columnas como (encabezado, campo) y las
+    opciones (choices) que se exportan con su etiqueta.
+    """
+
+    def __init__(self, modelo, nombre, columnas, orden, opciones=None):
+        self.modelo = modelo
+        self.nombre = nombre
+        self.columnas = columnas
+        self.orden = orden
+        self.opciones = {campo: dict(choices) for campo, choices in (opciones or {}).items()}
+
+    @property
+    def encabezados(self):
+        return [encabezado for encabezado, _ in self.columnas]
+
+    def queryset(self):
+        return self.modelo.objects.order_by(*self.orden)
+
+    def filas(self, queryset=None):
+        """Genera las filas formateadas, leyendo la base de datos por bloques"""
+        if queryset is None:
+            queryset = self.queryset()
+        campos = [campo for _, campo in self.columnas]
+        etiquetas = [self.opciones.get(campo) for campo in campos]
+        for valores in queryset.values_list(*campos).iterator(chunk_size=CHUNK_SIZE):
+            yield [
+                etiqueta.get(valor, valor) if etiqueta else formatear(valor)
+                for valor, etiqueta in zip(valores, etiquetas)
+            ]
+
+
+EXPORTACIONES = {
+    'personal': Exportacion(
+        Personal,
+        'Personal',
+        columnas=[
+            ('nombres', 'nombres'),
+            ('apellidos', 'apellidos'),
+            ('rut', 'rut'),
+            ('fecha_nacimiento', 'fecha_nacimiento'),
+            ('direccion', 'direccion'),
+            ('telefono', 'telefono'),
+            ('email', 'email'),
+            ('cargo', 'cargo__nombre'),
+            ('fecha_contratacion', 'fecha_contratacion'),
+            ('cliente', 'cliente__razon_social'),
+            ('instalacion', 'instalacion_asignada__nombre'),
+            ('activo', 'activo'),
+        ],
+        orden=['apellidos', 'nombres'],
+    ),
+    'vehiculos': Exportacion(
+        Vehiculo,
+        'Vehículos',
+        columnas=[
+            ('patente', 'patente'),
+            ('tipo', 'tipo__nombre'),
+            ('marca', 'marca'),
+            ('modelo', 'modelo'),
+            ('ano', 'ano'),
+            ('color', 'color'),
+            ('tipo_combustible', 'tipo_combustible'),
+            ('estado', 'estado'),
+            ('en_servicio', 'en_servicio'),
+            ('kilometraje', 'kilometraje'),
+            ('kilometraje_mantenimiento', 'kilometraje_mantenimiento'),
+            ('vencimiento_seguro', 'vencimiento_seguro'),
+            ('revision_tecnica', 'revision_tecnica'),
+            ('permiso_circulacion', 'permiso_circulacion'),
+            ('instalacion', 'instalacion_asignada__nombre'),
+        ],
+        orden=['patente'],
+        opciones={
+            'tipo_combustible': Vehiculo.TIPO_COMBUSTIBLE,
+            'estado': Vehiculo.ESTADO_VEHICULO,
+        },
+    ),
+    'turnos': Exportacion(
+        Turno,
+        'Turnos',
+        columnas=[
+            ('rut', 'personal__rut'),
+            ('nombres', 'personal__nombres'),
+            ('apellidos', 'personal__apellidos'),
+            ('instalacion', 'instalacion__nombre'),
+            ('cliente', 'instalacion__cliente__razon_social'),
+            ('fecha_inicio', 'fecha_inicio'),
+            ('fecha_fin', 'fecha_fin'),
+            ('tipo_turno', 'tipo_turno'),
+            ('estado', 'estado'),
+            ('horas_planificadas', 'horas_planificadas'),
+            ('horas_reales', 'horas_reales'),
+            ('notas', 'notas'),
+        ],
+        orden=['fecha_inicio', 'personal_id'],
+        opciones={
+            'tipo_turno': Turno.TIPO_TURNO_CHOICES,
+            'estado': Turno.ESTADO_TURNO_CHOICES,
+        },
+    ),
+    'incidencias': Exportacion(
+        Incidencia,
+        'Incidencias',
+        columnas=[
+            ('id', 'id'),
+            ('titulo', 'titulo'),
+            ('instalacion', 'instalacion__nombre'),
+            ('cliente', 'instalacion__cliente__razon_social'),
+            ('tipo', 'tipo_incidencia__nombre'),
+            ('fecha_suceso', 'fecha_hora_suceso'),
+            ('fecha_reporte', 'fecha_hora_reporte'),
+            ('estado', 'estado'),
+            ('reportado_por', 'reportado_por__username'),
+            ('descripcion', 'descripcion'),
+        ],
+        orden=['-fecha_hora_suceso'],
+        opciones={'estado': Incidencia.ESTADO_CHOICES},
+    ),
+}
+
+
+# --- CSV ---
+class _Eco:
+    """Pseudo-archivo que devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(encabezados, filas):
+    """Genera el CSV en bloques de texto; comienza con BOM para que Excel lo lea como UTF-8"""
+    writer = csv.writer(_Eco())
+    yield '﻿' + writer.writerow(encabezados)
+    bloque = []
+    for fila in filas:
+        bloque.append(writer.writerow(fila))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+# --- XLSX ---
+# Un XLSX es un ZIP con partes XML. La hoja se escribe con celdas de texto en
+# línea (inlineStr), sin tabla de textos compartidos, para poder generarla
+# fila a fila. zipfile admite escribir en un destino sin seek (usa descriptores
+# de datos), así que cada bloque comprimido se envía apenas se produce.
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_HOJA_FIN = '</sheetData></worksheet>'
+
+
+class _Salida:
+    """Destino de zipfile que acumula los bytes escritos hasta que se retiran"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def _celda(valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return f'<c t="n"><v>{valor}</v></c>'
+    texto = escape(str(valor)).replace('"', '&quot;')
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(valores):
+    return '<row>' + ''.join(_celda(valor) for valor in valores) + '</row>'
+
+
+def generar_xlsx(encabezados, filas, hoja='Datos'):
+    """Genera un libro XLSX de una hoja en bloques de bytes"""
+    salida = _Salida()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK.format(hoja=escape(hoja[:31])))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield salida.retirar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as parte:
+            parte.write((_HOJA_INICIO + _fila_xml(encabezados)).encode('utf-8'))
+            bloque = []
+            for fila in filas:
+                bloque.append(_fila_xml(fila))
+                if len(bloque) >= FILAS_POR_BLOQUE:
+                    parte.write(''.join(bloque).encode('utf-8'))
+                    bloque = []
+                    datos = salida.retirar()
+                    if datos:
+                        yield datos
+            parte.write((''.join(bloque) + _HOJA_FIN).encode('utf-8'))
+    yield salida.retirar()
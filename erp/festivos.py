@@ -0,0 +1,66 @@
+"""
+Calendario de feriados en memoria.
+
+Los feriados de cada año se cargan una sola vez por proceso como un conjunto
+de fechas, de modo que la planificación, los reportes de horas y los
+controles de horas extra puedan consultar es_feriado() en O(1) sin ir a la
+base de datos. Las señales de Feriado descartan el caché de todos los años
+(un feriado puede cambiar de fecha y de año, y se modifican pocas veces).
+"""
+from datetime import timedelta
+from threading import Lock
+
+import numpy as np
+
+from .models import Feriado
+
+_feriados_por_anio = {}
+_lock = Lock()
+
+
+def feriados_del_anio(anio):
+    """Conjunto inmutable de fechas feriadas de un año"""
+    feriados = _feriados_por_anio.get(anio)
+    if feriados is None:
+        with _lock:
+            feriados = _feriados_por_anio.get(anio)
+            if feriados is None:
+                feriados = frozenset(
+                    Feriado.objects.filter(fecha__year=anio).values_list('fecha', flat=True)
+                )
+                _feriados_por_anio[anio] = feriados
+    return feriados
+
+
+def es_feriado(fecha):
+    """Indica si una fecha es feriado"""
+    return fecha in feriados_del_anio(fecha.year)
+
+
+def feriados_en_rango(fecha_desde, fecha_hasta):
+    """Fechas feriadas entre fecha_desde y fecha_hasta (inclusive), ordenadas"""
+    fechas = set()
+    for anio in range(fecha_desde.year, fecha_hasta.year + 1):
+        fechas.update(f for f in feriados_del_anio(anio) if fecha_desde <= f <= fecha_hasta)
+    return sorted(fechas)
+
+
+def mascara_feriados(fecha_desde, total_dias):
+    """
+    Arreglo booleano de largo total_dias donde True marca un feriado; se
+    combina directamente con las matrices del motor de rotación.
+    """
+    mascara = np.zeros(total_dias, dtype=bool)
+    fecha_hasta = fecha_desde + timedelta(days=total_dias - 1)
+    for fecha in feriados_en_rango(fecha_desde, fecha_hasta):
+        mascara[(fecha - fecha_desde).days] = True
+    return mascara
+
+
+def invalidar_feriados(anio=None):
+    """Descarta el caché de un año (o de todos)"""
+    with _lock:
+        if anio is None:
+            _feriados_por_anio.clear()
+        else:
+            _feriados_por_anio.pop(anio, None)
@@ -2,7 +2,8 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.utils.translation import gettext_lazy as _
-from .models import Personal, Cliente, Cargo, Instalacion, GestorCliente, RequerimientosCliente
+from .models import Personal, Cliente, Cargo, Instalacion, GestorCliente, RequerimientosCliente, Turno, Incidencia
+from .widgets import AutocompletarSelect, AutocompletarSelectMultiple
 
 
 class InstalacionForm(forms.ModelForm):
@@ -91,7 +92,7 @@ class PersonalForm(forms.ModelForm):
         label='Cliente',
         required=True,
         help_text='Seleccione el cliente al que pertenece el personal',
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=AutocompletarSelect('cliente', attrs={'class': 'form-select'})
     )
     
     instalacion = forms.ModelChoiceField(
@@ -128,7 +129,7 @@ class PersonalForm(forms.ModelForm):
                 'placeholder': '12.345.678-9',
                 'required': 'required'
             }),
-            'cargo': forms.Select(attrs={
+            'cargo': AutocompletarSelect('cargo', attrs={
                 'class': 'form-select',
                 'required': 'required'
             }),
@@ -204,6 +205,34 @@ class PersonalForm(forms.ModelForm):
         return personal
 
 
+class TurnoForm(forms.ModelForm):
+    class Meta:
+        model = Turno
+        fields = ['personal', 'instalacion', 'fecha_inicio', 'fecha_fin', 'tipo_turno']
+        widgets = {
+            'personal': AutocompletarSelect('personal', attrs={'class': 'form-select'},
+                                            depende_de={'instalacion': 'id_instalacion'}),
+            'instalacion': AutocompletarSelect('instalacion', attrs={'class': 'form-select'}),
+            'fecha_inicio': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+            'fecha_fin': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+            'tipo_turno': forms.Select(attrs={'class': 'form-select'}),
+        }
+
+
+class IncidenciaForm(forms.ModelForm):
+    class Meta:
+        model = Incidencia
+        fields = ['titulo', 'instalacion', 'tipo_incidencia', 'fecha_hora_suceso', 'descripcion', 'personal_involucrado']
+        widgets = {
+            'titulo': forms.TextInput(attrs={'class': 'form-control'}),
+            'instalacion': AutocompletarSelect('instalacion', attrs={'class': 'form-select'}),
+            'tipo_incidencia': forms.Select(attrs={'class': 'form-select'}),
+            'fecha_hora_suceso': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+            'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
+            'personal_involucrado': AutocompletarSelectMultiple('personal', attrs={'class': 'form-select'}),
+        }
+
+
 class RequerimientosInstalacionForm(forms.ModelForm):
     class Meta:
         model = RequerimientosCliente
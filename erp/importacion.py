@@ -0,0 +1,834 @@
+"""
+Importación masiva de datos desde archivos CSV.
+
+Los archivos se decodifican de forma incremental (línea a línea, sin cargar
+el contenido completo en memoria), las tablas de referencia se precargan en
+diccionarios una sola vez y las filas se insertan con bulk_create en lotes,
+ya sea en una única transacción o lote a lote acumulando los errores por fila.
+
+Vehículos (por patente) y turnos (por RUT e inicio) se sincronizan por clave
+natural: las filas existentes se actualizan y solo las nuevas se crean.
+"""
+import codecs
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from . import indice_prefijos, pronostico
+from .conflictos import ESTADOS_ACTIVOS, detectar_superposiciones
+from .models import Cargo, Cliente, Instalacion, Personal, TipoVehiculo, Turno, Vehiculo
+from .reportes import invalidar_horas
+from .rut import normalizar_rut, partes_rut, rut_valido
+from .utils import actualizar_contador
+
+# Filas por lote de inserción
+BATCH_SIZE = 1000
+
+CAMPOS_PERSONAL = [
+    'nombres', 'apellidos', 'rut', 'fecha_nacimiento', 'direccion',
+    'telefono', 'email', 'cargo', 'fecha_contratacion', 'cliente'
+]
+
+
+class ErrorImportacion(ValueError):
+    """Error en una fila del archivo importado"""
+
+    def __init__(self, mensaje, fila=None, campo=''):
+        self.fila = fila
+        self.campo = campo
+        self.detalle = mensaje
+        if fila is not None:
+            mensaje = f'Fila {fila}: {mensaje}'
+        super().__init__(mensaje)
+
+
+def leer_csv(archivo, encoding='utf-8-sig'):
+    """
+    Devuelve un csv.DictReader que decodifica el archivo subido a medida que
+    se recorre, en lugar de leerlo completo.
+    """
+    return csv.DictReader(codecs.iterdecode(archivo, encoding))
+
+
+def validar_encabezados(reader, requeridos):
+    """Lanza ErrorImportacion si faltan columnas requeridas"""
+    faltantes = [h for h in requeridos if h not in (reader.fieldnames or [])]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan los siguientes campos en el CSV: {', '.join(faltantes)}")
+
+
+def parse_fecha(valor):
+    """Convierte una fecha DD-MM-YYYY del CSV; vacía se interpreta como None"""
+    valor = (valor or '').strip()
+    if not valor:
+        return None
+    return datetime.strptime(valor, '%d-%m-%Y').date()
+
+
+def en_lotes(iterable, tamano):
+    """Agrupa un iterable en listas de hasta `tamano` elementos"""
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class CatalogoPersonal:
+    """Clientes y cargos precargados en diccionarios para resolver cada fila sin consultas"""
+
+    def __init__(self):
+        self.clientes = dict(Cliente.objects.values_list('razon_social', 'id'))
+        self.cargos = dict(Cargo.objects.values_list('nombre', 'id'))
+
+    def cliente_id(self, razon_social):
+        return self.clientes.get((razon_social or '').strip())
+
+    def cargo_id(self, nombre, crear=True):
+        nombre = (nombre or '').strip()
+        cargo_id = self.cargos.get(nombre)
+        if cargo_id is None and crear and nombre:
+            # Los cargos nuevos se crean al vuelo, como hacía get_or_create
+            cargo_id = Cargo.objects.create(nombre=nombre).id
+            self.cargos[nombre] = cargo_id
+        return cargo_id
+
+
+def validar_fila_personal(row, catalogo):
+    """
+    Valida una fila de personal sin escribir en la base de datos.
+    Devuelve una lista de (campo, mensaje); vacía si la fila es válida.
+    """
+    errores = []
+    for campo in ('nombres', 'apellidos', 'rut'):
+        if not (row.get(campo) or '').strip():
+            errores.append((campo, f'El campo {campo} es obligatorio'))
+    if (row.get('rut') or '').strip() and not rut_valido(row['rut']):
+        errores.append(('rut', f"RUT inválido '{row['rut']}' (dígito verificador incorrecto)"))
+    if catalogo.cliente_id(row.get('cliente')) is None:
+        errores.append(('cliente', f"No existe el cliente '{row.get('cliente') or ''}'"))
+    if not (row.get('cargo') or '').strip():
+        errores.append(('cargo', 'El cargo es obligatorio'))
+    for campo in ('fecha_nacimiento', 'fecha_contratacion'):
+        try:
+            parse_fecha(row.get(campo))
+        except ValueError:
+            errores.append((campo, f"Fecha inválida '{row.get(campo)}', use el formato DD-MM-YYYY"))
+    return errores
+
+
+def construir_personal(row, catalogo, fila):
+    """Convierte una fila del CSV en una instancia de Personal (sin guardar)"""
+    errores = validar_fila_personal(row, catalogo)
+    if errores:
+        raise ErrorImportacion(errores[0][1], fila)
+
+    # bulk_create no llama a Personal.save(): el RUT normalizado se completa aquí
+    rut_numero, rut_dv = partes_rut(row['rut'])
+    # Las filas cortas traen None en las columnas que faltan: todo pasa por _texto
+    return Personal(
+        cliente_id=catalogo.cliente_id(row.get('cliente')),
+        nombres=_texto(row.get('nombres')),
+        apellidos=_texto(row.get('apellidos')),
+        rut=_texto(row.get('rut')),
+        rut_numero=rut_numero,
+        rut_dv=rut_dv,
+        fecha_nacimiento=parse_fecha(row.get('fecha_nacimiento')),
+        direccion=_texto(row.get('direccion')),
+        telefono=_texto(row.get('telefono')),
+        email=_texto(row.get('email')),
+        cargo_id=catalogo.cargo_id(row.get('cargo')),
+        fecha_contratacion=parse_fecha(row.get('fecha_contratacion')),
+        activo=True
+    )
+
+
+class ResultadoImportacion:
+    """Avance y errores acumulados de una importación"""
+
+    def __init__(self):
+        self.procesadas = 0
+        self.creadas = 0
+        self.actualizadas = 0
+        self.sin_cambios = 0
+        self.errores = []
+        self.advertencias = []
+
+    @property
+    def fallidas(self):
+        """Filas rechazadas (una fila puede acumular varios errores)"""
+        return len({error['fila'] for error in self.errores})
+
+    def agregar_error(self, fila, mensaje, campo=''):
+        self.errores.append({'fila': fila, 'campo': campo, 'error': mensaje})
+
+
+def _insertar_lote_tolerante(modelo, lote, resultado):
+    """
+    Inserta un lote de (fila, instancia). Si el lote falla en la base de datos
+    (por ejemplo, un RUT duplicado), se reintenta fila por fila con savepoints
+    para aislar las filas con error.
+    """
+    try:
+        with transaction.atomic():
+            modelo.objects.bulk_create([instancia for _, instancia in lote])
+        resultado.creadas += len(lote)
+        return
+    except DatabaseError:
+        pass
+    for fila, instancia in lote:
+        try:
+            with transaction.atomic():
+                instancia.pk = None
+                instancia.save(force_insert=True)
+            resultado.creadas += 1
+        except DatabaseError as e:
+            resultado.agregar_error(fila, f'No se pudo guardar: {e}')
+
+
+def insertar_lote(modelo):
+    """Función de guardado que solo inserta filas nuevas"""
+    def guardar(lote, resultado, tolerante):
+        if tolerante:
+            _insertar_lote_tolerante(modelo, lote, resultado)
+        else:
+            modelo.objects.bulk_create([instancia for _, instancia in lote])
+            resultado.creadas += len(lote)
+    return guardar
+
+
+class Sincronizador:
+    """
+    Inserta o actualiza lotes de instancias según una clave natural.
+
+    Cada lote resuelve las filas existentes con una sola consulta IN
+    (buscar), crea las nuevas con bulk_create y actualiza con bulk_update
+    solo los `campos` de las filas que cambiaron. validar(nuevas, modificadas)
+    puede devolver {fila: mensaje} con filas que deben rechazarse. Una clave
+    repetida dentro del archivo se rechaza en lugar de sobrescribir la fila
+    anterior. conservar(fila, campos) marca campos cuya celda venía vacía:
+    en las filas existentes mantienen el valor guardado.
+    """
+
+    def __init__(self, modelo, campos, clave, buscar, validar=None):
+        self.modelo = modelo
+        self.clave = clave
+        self.buscar = buscar
+        self.validar = validar
+        self.campos = list(campos)
+        self.atributos = [modelo._meta.get_field(campo).attname for campo in self.campos]
+        # Clave -> fila del archivo que la guardó; solo se registra tras guardar
+        self.claves_vistas = {}
+        # Fila -> atributos que conservan el valor guardado
+        self.conservados = {}
+        # bulk_update no aplica auto_now: se actualizan a mano
+        self.campos_auto_now = [
+            f for f in modelo._meta.concrete_fields if getattr(f, 'auto_now', False)
+        ]
+        self.campos_guardados = self.campos + [
+            f.name for f in self.campos_auto_now if f.name not in self.campos
+        ]
+
+    def conservar(self, fila, campos):
+        """Los campos indicados de la fila no se sobrescriben si el registro ya existe"""
+        if campos:
+            self.conservados[fila] = [self.modelo._meta.get_field(campo).attname for campo in campos]
+
+    def _registrar(self, fila, instancia):
+        self.claves_vistas[self.clave(instancia)] = fila
+
+    def clasificar(self, lote, resultado):
+        """
+        Separa el lote en filas nuevas, filas existentes con cambios y filas
+        con clave repetida ({fila: mensaje}).
+        """
+        existentes = {
+            self.clave(actual): actual
+            for actual in self.buscar([instancia for _, instancia in lote])
+        }
+        nuevas, modificadas, repetidas = [], [], {}
+        en_lote = {}
+        for fila, instancia in lote:
+            clave = self.clave(instancia)
+            anterior = self.claves_vistas.get(clave) or en_lote.get(clave)
+            conservados = self.conservados.pop(fila, ())
+            if anterior is not None:
+                repetidas[fila] = f'Registro repetido en el archivo (fila {anterior})'
+                continue
+            en_lote[clave] = fila
+            actual = existentes.get(clave)
+            if actual is None:
+                nuevas.append((fila, instancia))
+                continue
+            for atributo in conservados:
+                setattr(instancia, atributo, getattr(actual, atributo))
+            if any(getattr(actual, a) != getattr(instancia, a) for a in self.atributos):
+                instancia.pk = actual.pk
+                instancia._state.adding = False
+                for campo in self.campos_auto_now:
+                    campo.pre_save(instancia, add=False)
+                modificadas.append((fila, instancia))
+            else:
+                self._registrar(fila, instancia)
+                resultado.sin_cambios += 1
+        return nuevas, modificadas, repetidas
+
+    def _guardar(self, nuevas, modificadas):
+        if nuevas:
+            self.modelo.objects.bulk_create([instancia for _, instancia in nuevas])
+        if modificadas:
+            self.modelo.objects.bulk_update(
+                [instancia for _, instancia in modificadas], self.campos_guardados
+            )
+
+    def _guardar_por_fila(self, nuevas, modificadas, resultado):
+        for fila, instancia in nuevas + modificadas:
+            nueva = instancia.pk is None
+            try:
+                with transaction.atomic():
+                    if nueva:
+                        instancia.save(force_insert=True)
+                    else:
+                        instancia.save(update_fields=self.campos_guardados)
+            except DatabaseError as e:
+                resultado.agregar_error(fila, f'No se pudo guardar: {e}')
+                continue
+            self._registrar(fila, instancia)
+            if nueva:
+                resultado.creadas += 1
+            else:
+                resultado.actualizadas += 1
+
+    def __call__(self, lote, resultado, tolerante):
+        nuevas, modificadas, rechazadas = self.clasificar(lote, resultado)
+        if self.validar:
+            rechazadas.update(self.validar(nuevas, modificadas))
+
+        if rechazadas:
+            if not tolerante:
+                fila = min(rechazadas)
+                raise ErrorImportacion(rechazadas[fila], fila)
+            for fila in sorted(rechazadas):
+                resultado.agregar_error(fila, rechazadas[fila])
+            nuevas = [(f, i) for f, i in nuevas if f not in rechazadas]
+            modificadas = [(f, i) for f, i in modificadas if f not in rechazadas]
+
+        if not tolerante:
+            self._guardar(nuevas, modificadas)
+        else:
+            try:
+                with transaction.atomic():
+                    self._guardar(nuevas, modificadas)
+            except DatabaseError:
+                # Aislar las filas con error reintentando una por una
+                for _, instancia in nuevas:
+                    instancia.pk = None
+                self._guardar_por_fila(nuevas, modificadas, resultado)
+                return
+        for fila, instancia in nuevas + modificadas:
+            self._registrar(fila, instancia)
+        resultado.creadas += len(nuevas)
+        resultado.actualizadas += len(modificadas)
+
+
+def _importar(reader, construir, guardar, batch_size, tolerante, al_avanzar):
+    """
+    Recorre las filas del reader, construye las instancias y las guarda en
+    lotes con guardar(lote, resultado, tolerante).
+
+    Sin tolerancia todo ocurre en una transacción y la primera fila inválida
+    detiene la importación. Con tolerancia cada lote se confirma por separado
+    y los errores se acumulan por fila.
+    """
+    resultado = ResultadoImportacion()
+    # La fila 1 corresponde a los encabezados
+    filas = enumerate(reader, start=2)
+
+    if not tolerante:
+        with transaction.atomic():
+            for lote in en_lotes(filas, batch_size):
+                guardar([(fila, construir(row, fila)) for fila, row in lote], resultado, False)
+                resultado.procesadas += len(lote)
+                if al_avanzar:
+                    al_avanzar(resultado)
+        return resultado
+
+    for lote in en_lotes(filas, batch_size):
+        validas = []
+        for fila, row in lote:
+            try:
+                validas.append((fila, construir(row, fila)))
+            except ErrorImportacion as e:
+                resultado.agregar_error(fila, e.detalle, e.campo)
+        if validas:
+            guardar(validas, resultado, True)
+        resultado.procesadas += len(lote)
+        if al_avanzar:
+            al_avanzar(resultado)
+    return resultado
+
+
+def importar_personal(archivo, batch_size=BATCH_SIZE, tolerante=False, al_avanzar=None):
+    """
+    Importa personal desde un CSV y devuelve un ResultadoImportacion.
+
+    Por defecto todo el archivo se carga en una sola transacción: ante la
+    primera fila inválida no queda nada guardado. Con tolerante=True se
+    importan las filas válidas y se informa el error de cada fila rechazada.
+    al_avanzar(resultado) se llama después de cada lote.
+    """
+    reader = leer_csv(archivo)
+    validar_encabezados(reader, CAMPOS_PERSONAL)
+    catalogo = CatalogoPersonal()
+
+    def construir(row, fila):
+        return construir_personal(row, catalogo, fila)
+
+    try:
+        return _importar(reader, construir, insertar_lote(Personal), batch_size, tolerante, al_avanzar)
+    finally:
+        # bulk_create no emite post_save: se actualizan el contador del dashboard
+        # y el índice de búsqueda rápida
+        actualizar_contador('personal_activo')
+        indice_prefijos.invalidar()
+
+
+def validar_personal(archivo):
+    """
+    Valida un CSV de personal completo sin escribir nada (modo de prueba).
+
+    Revisa cada fila (campos obligatorios, dígito verificador del RUT,
+    fechas DD-MM-YYYY, cliente y cargo conocidos) y los RUT duplicados dentro
+    del archivo y contra el personal existente, usando un único conjunto de
+    RUT precargado. Devuelve un ResultadoImportacion con todos los errores.
+    """
+    reader = leer_csv(archivo)
+    validar_encabezados(reader, CAMPOS_PERSONAL)
+    catalogo = CatalogoPersonal()
+    ruts_existentes = set(
+        Personal.objects.filter(rut_numero__isnull=False).values_list('rut_numero', flat=True).iterator()
+    )
+    ruts_en_archivo = {}
+    cargos_nuevos = set()
+
+    resultado = ResultadoImportacion()
+    for fila, row in enumerate(reader, start=2):
+        resultado.procesadas += 1
+        errores = validar_fila_personal(row, catalogo)
+
+        rut = normalizar_rut(row.get('rut'))
+        if rut:
+            if partes_rut(rut)[0] in ruts_existentes:
+                errores.append(('rut', f'Ya existe personal registrado con el RUT {rut}'))
+            if rut in ruts_en_archivo:
+                errores.append(('rut', f'RUT {rut} duplicado en el archivo (fila {ruts_en_archivo[rut]})'))
+            else:
+                ruts_en_archivo[rut] = fila
+
+        for campo, mensaje in errores:
+            resultado.agregar_error(fila, mensaje, campo)
+
+        cargo = (row.get('cargo') or '').strip()
+        if cargo and catalogo.cargo_id(cargo, crear=False) is None and cargo not in cargos_nuevos:
+            cargos_nuevos.add(cargo)
+            resultado.advertencias.append({
+                'fila': fila, 'campo': 'cargo',
+                'error': f"El cargo '{cargo}' no existe y se creará al importar"
+            })
+    return resultado
+
+
+# --- Conversión de columnas ---
+def _texto(valor):
+    return (valor or '').strip()
+
+
+def _entero(valor):
+    valor = _texto(valor)
+    if not valor:
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(f"Número inválido '{valor}'")
+    if numero < 0:
+        raise ValueError(f"El número no puede ser negativo: '{valor}'")
+    return numero
+
+
+def _decimal(valor):
+    valor = _texto(valor).replace(',', '.')
+    if not valor:
+        return None
+    try:
+        return Decimal(valor).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Número inválido '{valor}'")
+
+
+def _booleano(valor):
+    valor = _texto(valor).lower()
+    if not valor:
+        return None
+    if valor in ('1', 's', 'si', 'sí', 'true', 'verdadero'):
+        return True
+    if valor in ('0', 'n', 'no', 'false', 'falso'):
+        return False
+    raise ValueError(f"Valor inválido '{valor}', use Sí o No")
+
+
+def _fecha(valor):
+    try:
+        return parse_fecha(valor)
+    except ValueError:
+        raise ValueError(f"Fecha inválida '{_texto(valor)}', use el formato DD-MM-YYYY")
+
+
+def parse_fecha_hora(valor):
+    """Convierte una fecha y hora DD-MM-YYYY HH:MM del CSV a un datetime con zona horaria"""
+    valor = _texto(valor)
+    try:
+        fecha_hora = datetime.strptime(valor, '%d-%m-%Y %H:%M')
+    except ValueError:
+        raise ValueError(f"Fecha y hora inválida '{valor}', use el formato DD-MM-YYYY HH:MM")
+    return timezone.make_aware(fecha_hora)
+
+
+def _opcion(choices):
+    """Acepta el código o la etiqueta de una opción (sin distinguir mayúsculas)"""
+    opciones = {}
+    for codigo, etiqueta in choices:
+        opciones[codigo.lower()] = codigo
+        opciones[etiqueta.lower()] = codigo
+
+    def convertir(valor):
+        valor = _texto(valor)
+        if not valor:
+            return None
+        try:
+            return opciones[valor.lower()]
+        except KeyError:
+            validas = ', '.join(etiqueta for _, etiqueta in choices)
+            raise ValueError(f"Valor inválido '{valor}' (opciones: {validas})")
+    return convertir
+
+
+def _columnas_opcionales(row, columnas, presentes, fila):
+    """
+    Convierte las columnas opcionales presentes en el archivo. Una celda
+    vacía se omite: las filas nuevas toman el valor por defecto del modelo
+    (ver _celdas_vacias para las existentes).
+    """
+    valores = {}
+    for columna, (campo, convertir) in columnas.items():
+        if columna not in presentes or not _texto(row.get(columna)):
+            continue
+        try:
+            valor = convertir(row.get(columna))
+        except ValueError as e:
+            raise ErrorImportacion(str(e), fila, columna)
+        if valor is not None:
+            valores[campo] = valor
+    return valores
+
+
+def _celdas_vacias(row, columnas, presentes):
+    """Campos del modelo cuya celda está vacía; en las filas existentes conservan su valor"""
+    return [columnas[c][0] for c in presentes if c in columnas and not _texto(row.get(c))]
+
+
+def _instalaciones_por_nombre():
+    """Nombre -> id de instalación; None si el nombre se repite"""
+    instalaciones = {}
+    for instalacion_id, nombre in Instalacion.objects.values_list('id', 'nombre'):
+        instalaciones[nombre] = None if nombre in instalaciones else instalacion_id
+    return instalaciones
+
+
+def _instalacion_id(instalaciones, nombre, fila, obligatoria=True):
+    nombre = _texto(nombre)
+    if not nombre:
+        if obligatoria:
+            raise ErrorImportacion('La instalación es obligatoria', fila, 'instalacion')
+        return None
+    if nombre not in instalaciones:
+        raise ErrorImportacion(f"No existe la instalación '{nombre}'", fila, 'instalacion')
+    if instalaciones[nombre] is None:
+        raise ErrorImportacion(
+            f"Hay más de una instalación llamada '{nombre}'", fila, 'instalacion'
+        )
+    return instalaciones[nombre]
+
+
+# --- Vehículos ---
+CAMPOS_VEHICULO = ['patente', 'tipo', 'marca', 'modelo', 'ano']
+
+# Columna opcional -> (campo del modelo, conversión)
+COLUMNAS_VEHICULO = {
+    'numero_motor': ('numero_motor', _texto),
+    'numero_chasis': ('numero_chasis', _texto),
+    'color': ('color', _texto),
+    'tipo_combustible': ('tipo_combustible', _opcion(Vehiculo.TIPO_COMBUSTIBLE)),
+    'capacidad_tanque': ('capacidad_tanque', _entero),
+    'estado': ('estado', _opcion(Vehiculo.ESTADO_VEHICULO)),
+    'en_servicio': ('en_servicio', _booleano),
+    'kilometraje': ('kilometraje', _entero),
+    'kilometraje_mantenimiento': ('kilometraje_mantenimiento', _entero),
+    'poliza_seguro': ('poliza_seguro', _texto),
+    'vencimiento_seguro': ('vencimiento_seguro', _fecha),
+    'revision_tecnica': ('revision_tecnica', _fecha),
+    'permiso_circulacion': ('permiso_circulacion', _fecha),
+    'observaciones': ('observaciones', _texto),
+}
+
+
+def normalizar_patente(valor):
+    """Patente en mayúsculas y sin espacios"""
+    return ''.join(_texto(valor).split()).upper()
+
+
+class CatalogoVehiculos:
+    """Tipos de vehículo e instalaciones precargados en diccionarios"""
+
+    def __init__(self):
+        self.tipos = dict(TipoVehiculo.objects.values_list('nombre', 'id'))
+        self.instalaciones = _instalaciones_por_nombre()
+
+    def tipo_id(self, nombre):
+        nombre = _texto(nombre)
+        tipo_id = self.tipos.get(nombre)
+        if tipo_id is None and nombre:
+            # Igual que los cargos del personal, los tipos nuevos se crean al vuelo
+            tipo_id = TipoVehiculo.objects.create(nombre=nombre).id
+            self.tipos[nombre] = tipo_id
+        return tipo_id
+
+
+def construir_vehiculo(row, catalogo, presentes, fila):
+    """Convierte una fila del CSV en una instancia de Vehiculo (sin guardar)"""
+    for campo in CAMPOS_VEHICULO:
+        if not _texto(row.get(campo)):
+            raise ErrorImportacion(f'El campo {campo} es obligatorio', fila, campo)
+    try:
+        ano = _entero(row['ano'])
+    except ValueError as e:
+        raise ErrorImportacion(str(e), fila, 'ano')
+
+    valores = _columnas_opcionales(row, COLUMNAS_VEHICULO, presentes, fila)
+    if 'instalacion' in presentes:
+        valores['instalacion_asignada_id'] = _instalacion_id(
+            catalogo.instalaciones, row.get('instalacion'), fila, obligatoria=False
+        )
+    return Vehiculo(
+        patente=normalizar_patente(row['patente']),
+        tipo_id=catalogo.tipo_id(row['tipo']),
+        marca=_texto(row['marca']),
+        modelo=_texto(row['modelo']),
+        ano=ano,
+        **valores
+    )
+
+
+def importar_vehiculos(archivo, batch_size=BATCH_SIZE, tolerante=False, al_avanzar=None):
+    """
+    Importa vehículos desde un CSV, actualizando los que ya existen por patente.
+
+    Además de las columnas obligatorias (CAMPOS_VEHICULO) se aceptan las de
+    COLUMNAS_VEHICULO y 'instalacion'; solo las columnas presentes en el
+    archivo se actualizan en los vehículos existentes, y una celda vacía
+    conserva el valor guardado.
+    """
+    reader = leer_csv(archivo)
+    validar_encabezados(reader, CAMPOS_VEHICULO)
+    catalogo = CatalogoVehiculos()
+    presentes = [c for c in reader.fieldnames if c in COLUMNAS_VEHICULO or c == 'instalacion']
+
+    campos = ['tipo', 'marca', 'modelo', 'ano'] + [
+        'instalacion_asignada' if c == 'instalacion' else COLUMNAS_VEHICULO[c][0]
+        for c in presentes
+    ]
+    sincronizar = Sincronizador(
+        Vehiculo,
+        campos,
+        clave=lambda vehiculo: vehiculo.patente,
+        buscar=lambda vehiculos: Vehiculo.objects.filter(
+            patente__in=[v.patente for v in vehiculos]
+        ).only('id', 'patente', *campos)
+    )
+
+    columnas = {**COLUMNAS_VEHICULO, 'instalacion': ('instalacion_asignada', None)}
+
+    def construir(row, fila):
+        vehiculo = construir_vehiculo(row, catalogo, presentes, fila)
+        sincronizar.conservar(fila, _celdas_vacias(row, columnas, presentes))
+        return vehiculo
+
+    try:
+        return _importar(reader, construir, sincronizar, batch_size, tolerante, al_avanzar)
+    finally:
+        # bulk_create/bulk_update no emiten post_save
+        actualizar_contador('vehiculos_en_servicio')
+        indice_prefijos.invalidar()
+
+
+# --- Turnos ---
+CAMPOS_TURNO = ['rut', 'instalacion', 'fecha_inicio', 'fecha_fin', 'tipo_turno']
+
+COLUMNAS_TURNO = {
+    'estado': ('estado', _opcion(Turno.ESTADO_TURNO_CHOICES)),
+    'horas_planificadas': ('horas_planificadas', _decimal),
+    'horas_reales': ('horas_reales', _decimal),
+    'notas': ('notas', _texto),
+}
+
+_tipo_turno = _opcion(Turno.TIPO_TURNO_CHOICES)
+
+
+class CatalogoTurnos:
+    """Personal (por número de RUT) e instalaciones precargados en diccionarios"""
+
+    def __init__(self):
+        self.personal = dict(
+            Personal.objects.filter(rut_numero__isnull=False).values_list('rut_numero', 'id').iterator()
+        )
+        self.instalaciones = _instalaciones_por_nombre()
+
+
+def construir_turno(row, catalogo, presentes, fila):
+    """Convierte una fila del CSV en una instancia de Turno (sin guardar)"""
+    for campo in CAMPOS_TURNO:
+        if not _texto(row.get(campo)):
+            raise ErrorImportacion(f'El campo {campo} es obligatorio', fila, campo)
+
+    rut = normalizar_rut(row['rut'])
+    personal_id = catalogo.personal.get(partes_rut(rut)[0])
+    if personal_id is None:
+        raise ErrorImportacion(f'No existe personal con el RUT {rut}', fila, 'rut')
+    instalacion_id = _instalacion_id(catalogo.instalaciones, row['instalacion'], fila)
+
+    fechas = {}
+    for campo in ('fecha_inicio', 'fecha_fin'):
+        try:
+            fechas[campo] = parse_fecha_hora(row[campo])
+        except ValueError as e:
+            raise ErrorImportacion(str(e), fila, campo)
+    try:
+        tipo_turno = _tipo_turno(row['tipo_turno'])
+    except ValueError as e:
+        raise ErrorImportacion(str(e), fila, 'tipo_turno')
+
+    valores = _columnas_opcionales(row, COLUMNAS_TURNO, presentes, fila)
+    turno = Turno(
+        personal_id=personal_id,
+        instalacion_id=instalacion_id,
+        fecha=timezone.localdate(fechas['fecha_inicio']),
+        tipo_turno=tipo_turno,
+        **fechas,
+        **valores
+    )
+    try:
+        turno.clean()
+    except ValidationError as e:
+        raise ErrorImportacion(' '.join(e.messages), fila, 'fecha_fin')
+
+    # bulk_create no llama a Turno.save(): las horas se completan aquí
+    if turno.horas_planificadas is None:
+        turno.horas_planificadas = Decimal(turno.duracion).quantize(Decimal('0.01'))
+    if turno.horas_reales is None and 'horas_reales' not in presentes:
+        turno.horas_reales = turno.horas_planificadas
+    return turno
+
+
+def _describir_conflicto(referencia, inicio, fin):
+    if referencia < 0:
+        return f'la fila {-referencia}'
+    return (f"el turno #{referencia} ({timezone.localtime(inicio):%d-%m-%Y %H:%M} - "
+            f"{timezone.localtime(fin):%d-%m-%Y %H:%M})")
+
+
+def validar_superposiciones_turnos(nuevas, modificadas):
+    """
+    Rechaza las filas cuyos turnos activos se superponen con otros turnos del
+    mismo personal, existentes o del mismo lote. Devuelve {fila: mensaje}.
+    """
+    # Las filas se identifican con números negativos para no confundirlas con id de turnos
+    candidatos = [
+        (turno.personal_id, turno.fecha_inicio, turno.fecha_fin, -fila)
+        for fila, turno in nuevas + modificadas
+        if turno.estado in ESTADOS_ACTIVOS
+    ]
+    if not candidatos:
+        return {}
+    # La versión guardada de los turnos que se actualizan no cuenta como conflicto
+    reemplazados = {turno.pk for _, turno in modificadas}
+
+    conflictos = detectar_superposiciones(
+        timezone.localdate(min(c[1] for c in candidatos)),
+        timezone.localdate(max(c[2] for c in candidatos)),
+        candidatos=candidatos
+    )
+    rechazadas = {}
+    for conflicto in conflictos:
+        a, b = conflicto['turno_a'], conflicto['turno_b']
+        if a in reemplazados or b in reemplazados:
+            continue
+        if b < 0:
+            fila, otro, inicio, fin = -b, a, conflicto['inicio_a'], conflicto['fin_a']
+        elif a < 0:
+            fila, otro, inicio, fin = -a, b, conflicto['inicio_b'], conflicto['fin_b']
+        else:
+            continue
+        rechazadas.setdefault(fila, f'El turno se superpone con {_describir_conflicto(otro, inicio, fin)}')
+    return rechazadas
+
+
+def importar_turnos(archivo, batch_size=BATCH_SIZE, tolerante=False, al_avanzar=None):
+    """
+    Importa turnos desde un CSV, actualizando los existentes según el RUT del
+    personal y la fecha y hora de inicio (DD-MM-YYYY HH:MM).
+
+    Cada lote se valida contra los turnos guardados del mismo personal con la
+    detección de superposiciones en lote; las filas que chocan se rechazan.
+    Una celda opcional vacía conserva el valor guardado del turno existente.
+    """
+    reader = leer_csv(archivo)
+    validar_encabezados(reader, CAMPOS_TURNO)
+    catalogo = CatalogoTurnos()
+    presentes = [c for c in reader.fieldnames if c in COLUMNAS_TURNO]
+
+    campos = ['instalacion', 'fecha', 'fecha_fin', 'tipo_turno', 'horas_planificadas'] + [
+        COLUMNAS_TURNO[c][0] for c in presentes if c != 'horas_planificadas'
+    ]
+    sincronizar = Sincronizador(
+        Turno,
+        campos,
+        clave=lambda turno: (turno.personal_id, turno.fecha_inicio),
+        buscar=lambda turnos: Turno.objects.filter(
+            personal_id__in={t.personal_id for t in turnos},
+            fecha_inicio__in={t.fecha_inicio for t in turnos}
+        ).only('id', 'personal_id', 'fecha_inicio', *campos),
+        validar=validar_superposiciones_turnos
+    )
+
+    meses = set()
+
+    def construir(row, fila):
+        turno = construir_turno(row, catalogo, presentes, fila)
+        sincronizar.conservar(fila, _celdas_vacias(row, COLUMNAS_TURNO, presentes))
+        meses.add(turno.fecha.replace(day=1))
+        return turno
+
+    try:
+        return _importar(reader, construir, sincronizar, batch_size, tolerante, al_avanzar)
+    finally:
+        # bulk_create/bulk_update no emiten post_save: se descartan los resúmenes de horas
+        # y el pronóstico de brechas
+        for mes in meses:
+            invalidar_horas(mes)
+        pronostico.invalidar()
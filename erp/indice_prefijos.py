@@ -0,0 +1,314 @@
+"""
+Índice de prefijos en memoria para la búsqueda rápida (typeahead).
+
+Guarda las claves de búsqueda de Personal (nombre y RUT), Vehiculo (patente),
+Instalacion (nombre) y Cliente (razón social y RUT) en una lista ordenada de
+tuplas (clave, tipo, id); una búsqueda es un bisect al primer elemento con
+el prefijo y un recorrido hasta juntar los resultados, sin consultar la base
+de datos. Cada nombre se indexa desde cada una de sus palabras, de modo que
+"soto" encuentra a "Juan Soto".
+
+El índice se construye la primera vez que se usa (una consulta por modelo),
+las señales de los modelos lo mantienen al día dentro del proceso al
+confirmarse cada transacción y se reconstruye cada VIGENCIA segundos para
+recoger los cambios hechos por otros procesos (importaciones en segundo
+plano, otros workers). La reconstrucción periódica corre en un hilo aparte:
+mientras tanto las búsquedas usan el índice anterior.
+
+Un índice publicado no se modifica: cada cambio arma una copia y la
+reemplaza bajo el lock, de modo que las búsquedas leen sin lock una versión
+completa.
+"""
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from threading import Lock, Thread
+
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+
+from .models import Cliente, Instalacion, Personal, Vehiculo
+
+logger = logging.getLogger(__name__)
+
+# Segundos antes de reconstruir el índice
+VIGENCIA = 300
+
+# Palabras iniciales desde las que se indexa cada nombre
+MAX_PALABRAS = 4
+
+TIPOS = {
+    'personal': 'erp:personal_detail',
+    'vehiculo': 'erp:vehiculo_detail',
+    'instalacion': 'erp:instalacion_detail',
+    'cliente': 'erp:cliente_detail',
+}
+
+_SEPARADORES_UNIDOS = re.compile(r'[.\-]')
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar_clave(texto):
+    """
+    Minúsculas, sin tildes ni signos. Puntos y guiones se eliminan sin dejar
+    espacio para que "12.345.678-9" y "AB-CD-12" coincidan con lo escrito de
+    corrido.
+    """
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = _SEPARADORES_UNIDOS.sub('', texto)
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def _claves_nombre(*nombres):
+    """Claves de un nombre desde cada una de sus primeras palabras"""
+    claves = set()
+    for nombre in nombres:
+        palabras = normalizar_clave(nombre).split()
+        for i in range(min(len(palabras), MAX_PALABRAS)):
+            claves.add(' '.join(palabras[i:]))
+    return claves
+
+
+def _clave_rut(rut_numero, rut_dv):
+    return {f'{rut_numero}{rut_dv}'.lower()} if rut_numero else set()
+
+
+def _filtrar(modelo, pks):
+    return modelo.objects.filter(pk__in=pks) if pks is not None else modelo.objects.all()
+
+
+# Por cada tipo: lectura de los campos y armado de (id, claves, texto, detalle)
+
+def _personal(pks=None):
+    filas = _filtrar(Personal, pks).values_list('id', 'nombres', 'apellidos', 'rut', 'rut_numero', 'rut_dv', 'activo')
+    for pk, nombres, apellidos, rut, rut_numero, rut_dv, activo in filas.iterator():
+        claves = _claves_nombre(f'{nombres} {apellidos}', f'{apellidos} {nombres}')
+        claves |= _clave_rut(rut_numero, rut_dv)
+        detalle = rut if activo else f'{rut} (inactivo)'
+        yield pk, claves, f'{nombres} {apellidos}', detalle
+
+
+def _vehiculos(pks=None):
+    filas = _filtrar(Vehiculo, pks).values_list('id', 'patente', 'marca', 'modelo')
+    for pk, patente, marca, modelo in filas.iterator():
+        claves = {normalizar_clave(patente)} | _claves_nombre(f'{marca} {modelo}')
+        yield pk, claves, patente, f'{marca} {modelo}'
+
+
+def _instalaciones(pks=None):
+    filas = _filtrar(Instalacion, pks).values_list('id', 'nombre', 'cliente__razon_social')
+    for pk, nombre, cliente in filas.iterator():
+        yield pk, _claves_nombre(nombre), nombre, cliente
+
+
+def _clientes(pks=None):
+    filas = _filtrar(Cliente, pks).values_list('id', 'razon_social', 'rut', 'rut_numero', 'rut_dv')
+    for pk, razon_social, rut, rut_numero, rut_dv in filas.iterator():
+        yield pk, _claves_nombre(razon_social) | _clave_rut(rut_numero, rut_dv), razon_social, rut
+
+
+_CARGADORES = {
+    'personal': _personal,
+    'vehiculo': _vehiculos,
+    'instalacion': _instalaciones,
+    'cliente': _clientes,
+}
+
+
+class IndicePrefijos:
+    """
+    Lista ordenada de (clave, tipo, id) más los textos a mostrar de cada
+    entidad. quitar() y poner() solo se usan sobre una copia aún no publicada.
+    """
+
+    def __init__(self):
+        self.entradas = []
+        # (tipo, id) -> (claves, texto, detalle)
+        self.entidades = {}
+        self.creado = time.monotonic()
+
+    def copia(self):
+        """Copia modificable que conserva el instante de construcción"""
+        indice = IndicePrefijos()
+        indice.entradas = list(self.entradas)
+        indice.entidades = dict(self.entidades)
+        indice.creado = self.creado
+        return indice
+
+    @classmethod
+    def construir(cls):
+        indice = cls()
+        entradas = []
+        for tipo, cargar in _CARGADORES.items():
+            for pk, claves, texto, detalle in cargar():
+                indice.entidades[(tipo, pk)] = (claves, texto, detalle)
+                entradas.extend((clave, tipo, pk) for clave in claves if clave)
+        entradas.sort()
+        indice.entradas = entradas
+        return indice
+
+    def quitar(self, tipo, pk):
+        datos = self.entidades.pop((tipo, pk), None)
+        if datos is None:
+            return
+        for clave in datos[0]:
+            i = bisect_left(self.entradas, (clave, tipo, pk))
+            if i < len(self.entradas) and self.entradas[i] == (clave, tipo, pk):
+                del self.entradas[i]
+
+    def poner(self, tipo, pk, claves, texto, detalle):
+        self.quitar(tipo, pk)
+        self.entidades[(tipo, pk)] = (claves, texto, detalle)
+        for clave in claves:
+            if clave:
+                insort(self.entradas, (clave, tipo, pk))
+
+    def buscar(self, texto, tipos=None, limite=10):
+        """Entidades cuya clave comienza con el texto, como (tipo, id, texto, detalle)"""
+        prefijo = normalizar_clave(texto)
+        if not prefijo:
+            return []
+        resultados = []
+        vistos = set()
+        i = bisect_left(self.entradas, (prefijo,))
+        while i < len(self.entradas) and len(resultados) < limite:
+            clave, tipo, pk = self.entradas[i]
+            if not clave.startswith(prefijo):
+                break
+            i += 1
+            if (tipo, pk) in vistos or (tipos and tipo not in tipos):
+                continue
+            vistos.add((tipo, pk))
+            datos = self.entidades.get((tipo, pk))
+            if datos is not None:
+                resultados.append((tipo, pk, datos[1], datos[2]))
+        return resultados
+
+
+_indice = None
+_lock = Lock()
+# Cambios confirmados mientras se reconstruye, para aplicarlos al índice nuevo;
+# None si no hay una reconstrucción en curso
+_pendientes = None
+# Aumenta con cada invalidar(): una reconstrucción iniciada antes no se publica
+_generacion = 0
+
+
+def obtener_indice():
+    """
+    Índice vigente. Se construye si no existe; si venció se sigue usando
+    mientras se reconstruye en segundo plano.
+    """
+    global _indice
+    indice = _indice
+    if indice is None:
+        with _lock:
+            indice = _indice
+            if indice is None:
+                indice = _indice = IndicePrefijos.construir()
+    elif time.monotonic() - indice.creado > VIGENCIA:
+        _programar_reconstruccion()
+    return indice
+
+
+def _programar_reconstruccion():
+    global _pendientes
+    with _lock:
+        if _pendientes is not None:
+            return
+        _pendientes = []
+    Thread(target=_reconstruir_en_hilo, name='erp-indice-prefijos', daemon=True).start()
+
+
+def _reconstruir_en_hilo():
+    close_old_connections()
+    try:
+        _reconstruir()
+    except Exception:
+        logger.exception('Error reconstruyendo el índice de búsqueda rápida')
+    finally:
+        close_old_connections()
+
+
+def _reconstruir():
+    """
+    Construye un índice nuevo, le aplica los cambios confirmados durante la
+    construcción y lo publica, salvo que invalidar() lo haya descartado.
+    """
+    global _indice, _pendientes
+    generacion = _generacion
+    try:
+        nuevo = IndicePrefijos.construir()
+        while True:
+            with _lock:
+                cambios, _pendientes = _pendientes, []
+                if not cambios:
+                    if generacion == _generacion and _indice is not None:
+                        _indice = nuevo
+                    return
+            for tipo, pks in cambios:
+                _cargar(nuevo, tipo, pks)
+    finally:
+        with _lock:
+            _pendientes = None
+
+
+def buscar(texto, tipos=None, limite=10):
+    """Resultados de la búsqueda rápida con la URL de detalle de cada uno"""
+    return [
+        {
+            'tipo': tipo,
+            'id': pk,
+            'texto': nombre,
+            'detalle': detalle,
+            'url': reverse(TIPOS[tipo], args=[pk]),
+        }
+        for tipo, pk, nombre, detalle in obtener_indice().buscar(texto, tipos, limite)
+    ]
+
+
+def actualizar(tipo, pks):
+    """
+    Vuelve a leer las entidades indicadas cuando se confirma la transacción
+    en curso; las que ya no existen se quitan. Si la transacción se revierte
+    el índice no cambia.
+    """
+    pks = set(pks)
+    if _indice is None or not pks:
+        # Aún no se construyó: tomará los datos actuales cuando se use
+        return
+    transaction.on_commit(lambda: _aplicar(tipo, pks))
+
+
+def _cargar(indice, tipo, pks):
+    """Vuelve a leer las entidades en un índice aún no publicado"""
+    encontrados = set()
+    for pk, claves, texto, detalle in _CARGADORES[tipo](pks):
+        indice.poner(tipo, pk, claves, texto, detalle)
+        encontrados.add(pk)
+    for pk in pks - encontrados:
+        indice.quitar(tipo, pk)
+
+
+def _aplicar(tipo, pks):
+    global _indice
+    with _lock:
+        # invalidar() puede haber descartado el índice desde que se programó
+        if _indice is None:
+            return
+        if _pendientes is not None:
+            _pendientes.append((tipo, pks))
+        indice = _indice.copia()
+        _cargar(indice, tipo, pks)
+        _indice = indice
+
+
+def invalidar():
+    """Descarta el índice; se reconstruye en la próxima búsqueda"""
+    global _indice, _generacion
+    with _lock:
+        _generacion += 1
+        _indice = None
@@ -0,0 +1,11 @@
+from datetime import datetime
+
+from django.core.management.base import CommandError
+
+
+def fecha_argumento(valor):
+    """Convierte un argumento AAAA-MM-DD en fecha"""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Fecha inválida '{valor}', use el formato AAAA-MM-DD")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from erp.asignacion import asignar_turnos
+from erp.conflictos import ConflictoTurnosError
+from erp.models import ConfiguracionTurno
+from erp.planificacion import BATCH_SIZE
+
+from ._argumentos import fecha_argumento
+
+
+class Command(BaseCommand):
+    help = 'Asigna personal del cliente a los tramos sin cubrir de una instalación en un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('instalacion', type=int, help='ID de la instalación')
+        parser.add_argument('--desde', required=True, type=fecha_argumento, help='Fecha de inicio (AAAA-MM-DD)')
+        parser.add_argument('--hasta', required=True, type=fecha_argumento, help='Fecha de término (AAAA-MM-DD)')
+        parser.add_argument(
+            '--guardar', action='store_true',
+            help='Inserta los turnos asignados (por defecto solo muestra la propuesta)'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamaño de lote para la inserción')
+
+    def handle(self, *args, **options):
+        try:
+            configuracion = ConfiguracionTurno.objects.select_related(
+                'requerimientos__instalacion'
+            ).get(requerimientos__instalacion_id=options['instalacion'])
+        except ConfiguracionTurno.DoesNotExist:
+            raise CommandError(f"La instalación {options['instalacion']} no tiene configuración de turnos")
+
+        try:
+            resultado = asignar_turnos(
+                configuracion,
+                options['desde'],
+                options['hasta'],
+                guardar=options['guardar'],
+                batch_size=options['batch_size'],
+            )
+        except ConflictoTurnosError as e:
+            raise CommandError(f'{e}; no se asignaron turnos')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for faltante in resultado.sin_cubrir[:20]:
+            self.stderr.write(f"Sin cubrir: {faltante['fecha']:%d/%m/%Y} tramo {faltante['tramo']} "
+                              f"({faltante['faltantes']} cupos)")
+        asignados = len(resultado.asignaciones)
+        mensaje = (f'{asignados} de {resultado.requeridos} cupos asignados a '
+                   f'{len(resultado.horas_por_personal)} guardias en {resultado.instalacion}')
+        if options['guardar']:
+            mensaje = f'Se crearon {resultado.creados} turnos: {mensaje}'
+        self.stdout.write(self.style.SUCCESS(mensaje))
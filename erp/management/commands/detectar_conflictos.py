@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from erp.conflictos import detectar_superposiciones, turnos_excedidos
+
+from ._argumentos import fecha_argumento
+
+
+class Command(BaseCommand):
+    help = 'Reporta los turnos superpuestos y los que exceden la duración máxima en un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, type=fecha_argumento, help='Fecha de inicio (AAAA-MM-DD)')
+        parser.add_argument('--hasta', required=True, type=fecha_argumento, help='Fecha de término (AAAA-MM-DD)')
+        parser.add_argument('--instalacion', type=int, help='Revisar solo el personal con turnos en esta instalación')
+        parser.add_argument('--personal', nargs='+', type=int, help='IDs del personal a revisar')
+
+    def handle(self, *args, **options):
+        conflictos = detectar_superposiciones(
+            options['desde'],
+            options['hasta'],
+            personal_ids=options['personal'],
+            instalacion=options['instalacion'],
+        )
+        for conflicto in conflictos:
+            self.stdout.write(
+                f"Personal {conflicto['personal_id']}: turno {conflicto['turno_a']} "
+                f"({conflicto['inicio_a']:%d/%m/%Y %H:%M} - {conflicto['fin_a']:%d/%m/%Y %H:%M}) "
+                f"se superpone con turno {conflicto['turno_b']} "
+                f"({conflicto['inicio_b']:%d/%m/%Y %H:%M} - {conflicto['fin_b']:%d/%m/%Y %H:%M})"
+            )
+        if conflictos:
+            self.stdout.write(self.style.WARNING(f'Se encontraron {len(conflictos)} superposiciones'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No se encontraron superposiciones'))
+
+        excedidos = list(turnos_excedidos(options['desde'], options['hasta']))
+        for turno_id, personal_id, inicio, fin in excedidos:
+            self.stdout.write(
+                f"Personal {personal_id}: turno {turno_id} "
+                f"({inicio:%d/%m/%Y %H:%M} - {fin:%d/%m/%Y %H:%M}) excede la duración máxima"
+            )
+        if excedidos:
+            self.stdout.write(self.style.WARNING(f'Se encontraron {len(excedidos)} turnos demasiado largos'))
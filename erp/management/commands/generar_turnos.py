@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from erp.conflictos import ConflictoTurnosError
+from erp.models import ConfiguracionTurno, Personal
+from erp.planificacion import BATCH_SIZE, generar_turnos
+
+from ._argumentos import fecha_argumento
+
+
+class Command(BaseCommand):
+    help = 'Genera los turnos de una configuración de turnos para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('configuracion', type=int, help='ID de la configuración de turnos')
+        parser.add_argument('--desde', required=True, type=fecha_argumento, help='Fecha de inicio (AAAA-MM-DD)')
+        parser.add_argument('--hasta', required=True, type=fecha_argumento, help='Fecha de término (AAAA-MM-DD)')
+        parser.add_argument(
+            '--personal', nargs='+', type=int,
+            help='IDs del personal a planificar (por defecto, el personal activo de la instalación)'
+        )
+        parser.add_argument(
+            '--reemplazar', action='store_true',
+            help='Elimina los turnos pendientes de la configuración en el rango antes de generar'
+        )
+        parser.add_argument(
+            '--sin-validar', action='store_true',
+            help='No verifica superposiciones con turnos existentes antes de insertar'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamaño de lote para la inserción')
+
+    def handle(self, *args, **options):
+        try:
+            configuracion = ConfiguracionTurno.objects.select_related(
+                'requerimientos__instalacion'
+            ).get(pk=options['configuracion'])
+        except ConfiguracionTurno.DoesNotExist:
+            raise CommandError(f"No existe la configuración de turnos {options['configuracion']}")
+
+        personal = None
+        if options['personal']:
+            personal = list(Personal.objects.filter(pk__in=options['personal']).values_list('pk', flat=True))
+
+        try:
+            creados = generar_turnos(
+                configuracion,
+                options['desde'],
+                options['hasta'],
+                personal=personal,
+                reemplazar=options['reemplazar'],
+                validar=not options['sin_validar'],
+                batch_size=options['batch_size'],
+            )
+        except ConflictoTurnosError as e:
+            for conflicto in e.conflictos[:20]:
+                self.stderr.write(
+                    f"Personal {conflicto['personal_id']}: "
+                    f"{conflicto['inicio_a']:%d/%m/%Y %H:%M}-{conflicto['fin_a']:%H:%M} choca con "
+                    f"{conflicto['inicio_b']:%d/%m/%Y %H:%M}-{conflicto['fin_b']:%H:%M}"
+                )
+            raise CommandError(f'{e}; no se generaron turnos')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Se generaron {creados} turnos para {configuracion}'))
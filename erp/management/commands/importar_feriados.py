@@ -0,0 +1,79 @@
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from erp.festivos import invalidar_feriados
+from erp.models import Feriado
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+VALORES_VERDADEROS = {'1', 'si', 'sí', 's', 'true', 'x'}
+
+
+def _parse_fecha(valor):
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor.strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa feriados desde un archivo CSV local con columnas fecha, nombre '
+        'y opcionalmente irrenunciable'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta al archivo CSV')
+        parser.add_argument('--delimitador', default=',', help='Delimitador de columnas (por defecto ",")')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as f:
+                reader = csv.DictReader(f, delimiter=options['delimitador'])
+                faltantes = {'fecha', 'nombre'} - set(reader.fieldnames or [])
+                if faltantes:
+                    raise CommandError(f"Faltan los siguientes campos en el CSV: {', '.join(sorted(faltantes))}")
+
+                feriados = {}
+                for numero, row in enumerate(reader, start=2):
+                    # Las filas cortas traen None en las columnas que faltan
+                    valor_fecha = (row.get('fecha') or '').strip()
+                    nombre = (row.get('nombre') or '').strip()
+                    if not valor_fecha and not nombre:
+                        continue
+                    fecha = _parse_fecha(valor_fecha)
+                    if fecha is None:
+                        raise CommandError(f"Fecha inválida en la línea {numero}: '{valor_fecha}'")
+                    if not nombre:
+                        raise CommandError(f'Falta el nombre del feriado en la línea {numero}')
+                    feriados[fecha] = (
+                        nombre,
+                        (row.get('irrenunciable') or '').strip().lower() in VALORES_VERDADEROS
+                    )
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+
+        existentes = Feriado.objects.in_bulk(list(feriados), field_name='fecha')
+        nuevos, modificados = [], []
+        for fecha, (nombre, irrenunciable) in feriados.items():
+            feriado = existentes.get(fecha)
+            if feriado is None:
+                nuevos.append(Feriado(fecha=fecha, nombre=nombre, irrenunciable=irrenunciable))
+            elif (feriado.nombre, feriado.irrenunciable) != (nombre, irrenunciable):
+                feriado.nombre = nombre
+                feriado.irrenunciable = irrenunciable
+                modificados.append(feriado)
+
+        with transaction.atomic():
+            Feriado.objects.bulk_create(nuevos)
+            Feriado.objects.bulk_update(modificados, ['nombre', 'irrenunciable'])
+        # bulk_create/bulk_update no emiten señales
+        invalidar_feriados()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Feriados importados: {len(nuevos)} nuevos, {len(modificados)} actualizados'
+        ))
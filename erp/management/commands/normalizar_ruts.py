@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from erp.models import Cliente, Personal
+from erp.rut import partes_rut
+
+
+class Command(BaseCommand):
+    help = 'Completa el RUT normalizado (rut_numero, rut_dv) de clientes y personal existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Registros procesados por lote')
+
+    def handle(self, *args, **options):
+        for modelo in (Cliente, Personal):
+            actualizados, conflictos = self.normalizar(modelo, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{modelo._meta.verbose_name_plural}: {actualizados} RUT normalizados'
+            ))
+            for pk, rut, otro in conflictos:
+                self.stdout.write(self.style.WARNING(
+                    f"  {modelo._meta.verbose_name} {pk}: el RUT '{rut}' coincide con el registro {otro}; "
+                    'se deja sin normalizar hasta corregirlo'
+                ))
+
+    def normalizar(self, modelo, batch_size):
+        """
+        Recorre la tabla por lotes en orden de pk y actualiza con bulk_update
+        solo los registros cuyo RUT normalizado cambió. Un número de RUT ya
+        asignado a otro registro se informa como conflicto.
+        """
+        usados = dict(
+            modelo.objects.filter(rut_numero__isnull=False).values_list('rut_numero', 'pk').iterator()
+        )
+        actualizados = 0
+        conflictos = []
+        ultimo_pk = 0
+        while True:
+            lote = list(
+                modelo.objects.filter(pk__gt=ultimo_pk).order_by('pk').only('pk', 'rut', 'rut_numero', 'rut_dv')[:batch_size]
+            )
+            if not lote:
+                break
+            ultimo_pk = lote[-1].pk
+
+            cambios = []
+            for instancia in lote:
+                numero, dv = partes_rut(instancia.rut)
+                otro = usados.get(numero, instancia.pk) if numero is not None else instancia.pk
+                if otro != instancia.pk:
+                    conflictos.append((instancia.pk, instancia.rut, otro))
+                    numero, dv = None, ''
+                if (numero, dv) == (instancia.rut_numero, instancia.rut_dv):
+                    continue
+                if instancia.rut_numero is not None and usados.get(instancia.rut_numero) == instancia.pk:
+                    del usados[instancia.rut_numero]
+                if numero is not None:
+                    usados[numero] = instancia.pk
+                instancia.rut_numero, instancia.rut_dv = numero, dv
+                cambios.append(instancia)
+
+            if cambios:
+                with transaction.atomic():
+                    modelo.objects.bulk_update(cambios, ['rut_numero', 'rut_dv'])
+                actualizados += len(cambios)
+        return actualizados, conflictos
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from erp.models import TrabajoImportacion
+from erp.trabajos import procesar_trabajo, recuperar_interrumpidos
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de importación pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabajo', type=int, help='Procesar solo este trabajo')
+        parser.add_argument(
+            '--reintentar-interrumpidos', action='store_true',
+            help='Vuelve a procesar los trabajos interrumpidos en lugar de marcarlos como fallidos'
+        )
+
+    def handle(self, *args, **options):
+        # Trabajos que quedaron "en proceso" por la caída o el reinicio de un worker
+        recuperados = recuperar_interrumpidos(reintentar=options['reintentar_interrumpidos'])
+        if recuperados:
+            accion = 'se reintentarán' if options['reintentar_interrumpidos'] else 'se marcaron como fallidos'
+            self.stdout.write(self.style.WARNING(f'{recuperados} trabajos interrumpidos {accion}'))
+
+        pendientes = TrabajoImportacion.objects.filter(estado='P').order_by('fecha_creacion')
+        if options['trabajo']:
+            pendientes = pendientes.filter(pk=options['trabajo'])
+
+        for trabajo_id in pendientes.values_list('pk', flat=True):
+            trabajo = procesar_trabajo(trabajo_id)
+            if trabajo is None:
+                continue
+            estilo = self.style.SUCCESS if trabajo.estado == 'C' else self.style.ERROR
+            self.stdout.write(estilo(f'{trabajo}: {trabajo.mensaje}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from erp.utils import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla de contadores del dashboard'
+
+    def handle(self, *args, **options):
+        contadores = recalcular_contadores()
+        self.stdout.write(self.style.SUCCESS(
+            f"Contadores recalculados: {contadores.personal_activo} personal activo, "
+            f"{contadores.vehiculos_en_servicio} vehículos en servicio, "
+            f"{contadores.incidencias_abiertas} incidencias abiertas, "
+            f"{contadores.personal_en_turno} personal en turno"
+        ))
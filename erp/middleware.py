@@ -0,0 +1,99 @@
+"""
+Medición de las consultas SQL de cada request.
+
+Con ERP_MEDIR_CONSULTAS activo, MedicionConsultasMiddleware cuenta las
+consultas, suma su tiempo y guarda las más lentas (mediante
+connection.execute_wrapper, sin depender de DEBUG) y las expone en las
+cabeceras X-DB-Queries y Server-Timing, que el navegador muestra en la
+pestaña de red. Si un request supera ERP_CONSULTAS_ADVERTENCIA consultas se
+registra una advertencia con las sentencias más lentas.
+
+En respuestas en streaming solo se cuentan las consultas hechas antes de
+enviar las cabeceras.
+"""
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Largo máximo del SQL incluido en las cabeceras y el log
+LARGO_SQL = 120
+
+
+class RegistroConsultas:
+    """execute_wrapper que acumula cantidad, tiempo total y las n consultas más lentas"""
+
+    def __init__(self, lentas=3):
+        self.cantidad = 0
+        self.duracion = 0.0
+        self.lentas = []
+        self.max_lentas = lentas
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.cantidad += 1
+            self.duracion += duracion
+            # Montículo de mínimos: se conservan las max_lentas más lentas
+            entrada = (duracion, self.cantidad, sql)
+            if len(self.lentas) < self.max_lentas:
+                heapq.heappush(self.lentas, entrada)
+            elif duracion > self.lentas[0][0]:
+                heapq.heapreplace(self.lentas, entrada)
+
+    def mas_lentas(self):
+        """(duración en ms, sql) de la más lenta a la más rápida"""
+        return [(duracion * 1000, sql) for duracion, _, sql in sorted(self.lentas, reverse=True)]
+
+
+def _descripcion(texto):
+    # Server-Timing admite una cadena entre comillas: sin comillas ni saltos de línea
+    texto = ' '.join(texto.split()).replace('\\', '').replace('"', "'")
+    return texto[:LARGO_SQL]
+
+
+class MedicionConsultasMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'ERP_MEDIR_CONSULTAS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lentas = getattr(settings, 'ERP_CONSULTAS_LENTAS', 3)
+        self.advertencia = getattr(settings, 'ERP_CONSULTAS_ADVERTENCIA', None)
+
+    def __call__(self, request):
+        registro = RegistroConsultas(self.lentas)
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            response = self.get_response(request)
+        total = (time.perf_counter() - inicio) * 1000
+
+        lentas = registro.mas_lentas()
+        metricas = [
+            f'total;dur={total:.1f}',
+            f'db;dur={registro.duracion * 1000:.1f};desc="{registro.cantidad} consultas"',
+        ]
+        metricas += [
+            f'sql-{i};dur={duracion:.1f};desc="{_descripcion(sql)}"'
+            for i, (duracion, sql) in enumerate(lentas, start=1)
+        ]
+        response['X-DB-Queries'] = str(registro.cantidad)
+        response['Server-Timing'] = ', '.join(metricas)
+
+        if self.advertencia is not None and registro.cantidad > self.advertencia:
+            logger.warning(
+                '%s %s ejecutó %d consultas (%.1f ms en SQL); más lentas: %s',
+                request.method, request.path, registro.cantidad, registro.duracion * 1000,
+                '; '.join(f'{duracion:.1f} ms {sql[:LARGO_SQL]}' for duracion, sql in lentas),
+            )
+        return response
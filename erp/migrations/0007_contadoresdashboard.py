@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:36
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0006_alter_gestorcliente_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadoresDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('personal_activo', models.PositiveIntegerField(default=0, verbose_name='Personal Activo')),
+                ('vehiculos_en_servicio', models.PositiveIntegerField(default=0, verbose_name='Vehículos en Servicio')),
+                ('incidencias_abiertas', models.PositiveIntegerField(default=0, verbose_name='Incidencias Abiertas')),
+                ('personal_en_turno', models.PositiveIntegerField(default=0, verbose_name='Personal en Turno')),
+                ('personal_en_turno_calculado', models.DateTimeField(blank=True, help_text='Momento del último cálculo de personal en turno (depende de la hora)', null=True, verbose_name='Cálculo de Personal en Turno')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Contadores del Dashboard',
+                'verbose_name_plural': 'Contadores del Dashboard',
+            },
+        ),
+        migrations.AddField(
+            model_name='gestorcliente',
+            name='activo',
+            field=models.BooleanField(default=True, help_text='Indica si el gestor está activo en el sistema', verbose_name='¿Activo?'),
+        ),
+        migrations.AddField(
+            model_name='requerimientoscliente',
+            name='personal_por_turno',
+            field=models.PositiveIntegerField(default=1, help_text='Número de personas necesarias por turno', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Personal por turno'),
+        ),
+        migrations.AddField(
+            model_name='requerimientoscliente',
+            name='personal_requerido',
+            field=models.PositiveIntegerField(default=1, help_text='Número total de personas necesarias para cubrir la instalación', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Cantidad de personal requerido'),
+        ),
+        migrations.AddField(
+            model_name='requerimientoscliente',
+            name='requisitos_especiales',
+            field=models.TextField(blank=True, help_text='Cualquier requisito especial para el personal o vehículos (ej: certificaciones específicas, equipamiento especial, etc.)', verbose_name='Requisitos especiales'),
+        ),
+        migrations.AlterField(
+            model_name='requerimientoscliente',
+            name='cantidad_vehiculos',
+            field=models.PositiveIntegerField(default=0, help_text='Número total de vehículos necesarios para la instalación', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Cantidad de vehículos requeridos'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0007_contadoresdashboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['fecha_inicio', 'fecha_fin'], name='turno_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['instalacion', 'fecha_inicio', 'fecha_fin'], name='turno_activo_inst_idx'),
+        ),
+    ]
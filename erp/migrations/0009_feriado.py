@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0008_turno_activo_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True, verbose_name='Fecha')),
+                ('nombre', models.CharField(max_length=150, verbose_name='Nombre')),
+                ('irrenunciable', models.BooleanField(default=False, help_text='Feriado en que el comercio no puede operar (Ley 19.973)', verbose_name='Irrenunciable')),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0009_feriado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('personal', 'Personal')], max_length=20, verbose_name='Tipo de Importación')),
+                ('archivo', models.FileField(upload_to='importaciones/%Y/%m/', verbose_name='Archivo')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255, verbose_name='Nombre del Archivo')),
+                ('estado', models.CharField(choices=[('P', 'Pendiente'), ('E', 'En Proceso'), ('C', 'Completado'), ('F', 'Fallido')], default='P', max_length=1, verbose_name='Estado')),
+                ('filas_procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('filas_creadas', models.PositiveIntegerField(default=0, verbose_name='Filas Creadas')),
+                ('filas_fallidas', models.PositiveIntegerField(default=0, verbose_name='Filas Fallidas')),
+                ('errores', models.JSONField(blank=True, default=list, verbose_name='Errores por Fila')),
+                ('mensaje', models.TextField(blank=True, verbose_name='Mensaje')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio del Proceso')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin del Proceso')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Importación',
+                'verbose_name_plural': 'Trabajos de Importación',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
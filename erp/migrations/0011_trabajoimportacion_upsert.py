@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0010_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='filas_actualizadas',
+            field=models.PositiveIntegerField(default=0, verbose_name='Filas Actualizadas'),
+        ),
+        migrations.AlterField(
+            model_name='trabajoimportacion',
+            name='tipo',
+            field=models.CharField(choices=[('personal', 'Personal'), ('vehiculos', 'Vehículos'), ('turnos', 'Turnos')], max_length=20, verbose_name='Tipo de Importación'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0011_trabajoimportacion_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenHorasMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveIntegerField(verbose_name='Año')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mes')),
+                ('filas', models.JSONField(default=list, verbose_name='Horas Agregadas')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Fecha de Cálculo')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Horas Mensual',
+                'verbose_name_plural': 'Resúmenes de Horas Mensuales',
+                'ordering': ['-anio', '-mes'],
+                'constraints': [models.UniqueConstraint(fields=('anio', 'mes'), name='resumen_horas_mes_unico')],
+            },
+        ),
+    ]
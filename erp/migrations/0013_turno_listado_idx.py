@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0012_resumenhorasmensual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['-fecha', 'fecha_inicio', 'personal', 'id'], name='turno_listado_idx'),
+        ),
+    ]
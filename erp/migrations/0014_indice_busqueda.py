@@ -0,0 +1,63 @@
+from django.db import DatabaseError, migrations, transaction
+
+# Copia del esquema y del llenado de erp/busqueda.py al momento de esta
+# migración: una migración no debe depender del código actual de la aplicación
+TABLA = 'erp_busqueda'
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    # Solo en SQLite con FTS5; en otros motores la búsqueda usa icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    clientes = apps.get_model('erp', 'Cliente')._meta.db_table
+    gestores = apps.get_model('erp', 'GestorCliente')._meta.db_table
+    instalaciones = apps.get_model('erp', 'Instalacion')._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+                    "tipo UNINDEXED, objeto_id UNINDEXED, titulo, contenido, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                )
+        except DatabaseError:
+            # SQLite compilado sin FTS5
+            return
+        cursor.execute(f'DELETE FROM {TABLA}')
+        cursor.execute(f"""
+            INSERT INTO {TABLA} (tipo, objeto_id, titulo, contenido)
+            SELECT 'cliente', c.id, c.razon_social,
+                   c.rut || ' ' || REPLACE(REPLACE(c.rut, '.', ''), '-', '') || ' ' ||
+                   c.direccion || ' ' || c.email_contacto || ' ' || c.telefono_contacto || ' ' ||
+                   COALESCE((
+                       SELECT GROUP_CONCAT(g.nombre || ' ' || g.email || ' ' || g.cargo, ' ')
+                       FROM {gestores} g WHERE g.cliente_id = c.id
+                   ), '')
+            FROM {clientes} c
+        """)
+        cursor.execute(f"""
+            INSERT INTO {TABLA} (tipo, objeto_id, titulo, contenido)
+            SELECT 'instalacion', i.id, i.nombre,
+                   i.direccion || ' ' || i.contacto_nombre || ' ' || i.contacto_email || ' ' ||
+                   c.razon_social || ' ' || COALESCE(g.nombre, '')
+            FROM {instalaciones} i
+            JOIN {clientes} c ON c.id = i.cliente_id
+            LEFT JOIN {gestores} g ON g.id = i.gestor_id
+        """)
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0013_turno_listado_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:04
+
+import erp.rut
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0014_indice_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_dv',
+            field=models.CharField(blank=True, editable=False, max_length=1, verbose_name='Dígito Verificador'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='rut_numero',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Número de RUT'),
+        ),
+        migrations.AddField(
+            model_name='personal',
+            name='rut_dv',
+            field=models.CharField(blank=True, editable=False, max_length=1, verbose_name='Dígito Verificador'),
+        ),
+        migrations.AddField(
+            model_name='personal',
+            name='rut_numero',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Número de RUT'),
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut',
+            field=models.CharField(max_length=12, unique=True, validators=[erp.rut.validar_rut], verbose_name='RUT'),
+        ),
+        migrations.AlterField(
+            model_name='personal',
+            name='rut',
+            field=models.CharField(max_length=12, unique=True, validators=[erp.rut.validar_rut], verbose_name='RUT'),
+        ),
+    ]
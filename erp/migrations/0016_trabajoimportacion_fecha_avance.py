@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp', '0015_rut_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='fecha_avance',
+            field=models.DateTimeField(blank=True, help_text='Momento del último lote procesado; sin avance por un tiempo, el trabajo se da por interrumpido', null=True, verbose_name='Último Avance'),
+        ),
+    ]
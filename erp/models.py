@@ -1,7 +1,15 @@
 from django.db import models
+from django.db.models import (
+    BooleanField, Case, Count, F, Max, Min, OuterRef, Prefetch, Q, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from datetime import timedelta
+
+from .rut import partes_rut, validar_rut
 
 # --- Módulo: Gestión de Instalaciones ---
 class CentroCosto(models.Model):
@@ -17,22 +25,90 @@ class CentroCosto(models.Model):
         verbose_name_plural = "Centros de Costo"
 
 
+def rut_duplicado(instancia):
+    """Indica si otro registro del mismo modelo tiene el mismo número de RUT"""
+    numero, _ = partes_rut(instancia.rut)
+    if numero is None:
+        return False
+    return type(instancia).objects.filter(rut_numero=numero).exclude(pk=instancia.pk).exists()
+
+
+def contar(queryset, campo):
+    """
+    Subconsulta con la cantidad de filas del queryset cuyo campo coincide con
+    el registro exterior (filtrado con OuterRef). A diferencia de varios
+    Count() en el mismo annotate, no multiplica filas con los JOIN.
+    """
+    conteo = queryset.order_by().values(campo).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(conteo), 0)
+
+
+# Dotación asignada a una instalación: el mismo criterio en la cobertura, el
+# cumplimiento de requerimientos y el dashboard
+def contar_personal_asignado(instalacion):
+    """Personal activo con la instalación (OuterRef) como instalación asignada"""
+    return contar(
+        Personal.objects.filter(instalacion_asignada=instalacion, activo=True), 'instalacion_asignada'
+    )
+
+
+def contar_vehiculos_asignados(instalacion):
+    """Vehículos en servicio con la instalación (OuterRef) como instalación asignada"""
+    return contar(
+        Vehiculo.objects.filter(instalacion_asignada=instalacion, en_servicio=True), 'instalacion_asignada'
+    )
+
+
+class ClienteQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Anota num_instalaciones y num_personal_activo"""
+        return self.annotate(
+            num_instalaciones=contar(Instalacion.objects.filter(cliente=OuterRef('pk')), 'cliente'),
+            num_personal_activo=contar(
+                Personal.objects.filter(cliente=OuterRef('pk'), activo=True), 'cliente'
+            ),
+        )
+
+    def with_gestor_principal(self):
+        """Precarga el gestor principal de cada cliente (ver Cliente.gestor_principal)"""
+        return self.prefetch_related(Prefetch(
+            'gestores',
+            queryset=GestorCliente.objects.filter(es_principal=True).order_by('pk'),
+            to_attr='gestores_principales',
+        ))
+
+
 class Cliente(models.Model):
     # Información básica del cliente
     razon_social = models.CharField('Razón Social', max_length=200, unique=True)
-    rut = models.CharField('RUT', max_length=12, unique=True)
+    rut = models.CharField('RUT', max_length=12, unique=True, validators=[validar_rut])
+    # RUT normalizado (sin puntos ni guion) para búsquedas y unicidad; se completa en save()
+    rut_numero = models.PositiveIntegerField('Número de RUT', unique=True, null=True, blank=True, editable=False)
+    rut_dv = models.CharField('Dígito Verificador', max_length=1, blank=True, editable=False)
     direccion = models.CharField('Dirección', max_length=255, blank=True)
     email_contacto = models.EmailField('Email de Contacto', blank=True)
     telefono_contacto = models.CharField('Teléfono de Contacto', max_length=20, blank=True)
     fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
     fecha_actualizacion = models.DateTimeField('Última Actualización', auto_now=True)
     
+    objects = ClienteQuerySet.as_manager()
+    
     @property
     def gestor_principal(self):
-        return self.gestores.filter(es_principal=True).first()
+        if hasattr(self, 'gestores_principales'):
+            return self.gestores_principales[0] if self.gestores_principales else None
+        return self.gestores.filter(es_principal=True).order_by('pk').first()
     
     def __str__(self):
         return self.razon_social
+    
+    def clean(self):
+        if rut_duplicado(self):
+            raise ValidationError({'rut': 'Ya existe un cliente con este RUT'})
+    
+    def save(self, *args, **kwargs):
+        self.rut_numero, self.rut_dv = partes_rut(self.rut)
+        super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'Cliente'
@@ -40,6 +116,22 @@ class Cliente(models.Model):
         ordering = ['razon_social']
 
 
+class GestorClienteQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Anota num_instalaciones, num_personal_activo y num_vehiculos_activos"""
+        return self.annotate(
+            num_instalaciones=contar(Instalacion.objects.filter(gestor=OuterRef('pk')), 'gestor'),
+            num_personal_activo=contar(
+                Personal.objects.filter(instalacion_asignada__gestor=OuterRef('pk'), activo=True),
+                'instalacion_asignada__gestor',
+            ),
+            num_vehiculos_activos=contar(
+                Vehiculo.objects.filter(requerimientos_cliente__instalacion__gestor=OuterRef('pk'), en_servicio=True),
+                'requerimientos_cliente__instalacion__gestor',
+            ),
+        )
+
+
 class GestorCliente(models.Model):
     cliente = models.ForeignKey(
         Cliente, 
@@ -57,28 +149,77 @@ class GestorCliente(models.Model):
     fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
     fecha_actualizacion = models.DateTimeField('Última Actualización', auto_now=True)
     
+    objects = GestorClienteQuerySet.as_manager()
+    
     def __str__(self):
         return self.nombre
     
+    # Los conteos usan las anotaciones de with_counts() si están presentes
     @property
     def tiene_instalaciones(self):
+        if hasattr(self, 'num_instalaciones'):
+            return self.num_instalaciones > 0
         return self.instalaciones.exists()
     
     @property
     def cantidad_instalaciones(self):
+        if hasattr(self, 'num_instalaciones'):
+            return self.num_instalaciones
         return self.instalaciones.count()
     
     @property
     def personal_activo(self):
-        return self.personal.filter(activo=True).count()
+        if hasattr(self, 'num_personal_activo'):
+            return self.num_personal_activo
+        return Personal.objects.filter(instalacion_asignada__gestor=self, activo=True).count()
     
     @property
     def vehiculos_activos(self):
+        if hasattr(self, 'num_vehiculos_activos'):
+            return self.num_vehiculos_activos
         return Vehiculo.objects.filter(
-            requerimientos_cliente__instalacion__cliente=self,
+            requerimientos_cliente__instalacion__gestor=self,
             en_servicio=True
         ).count()
 
+class InstalacionQuerySet(models.QuerySet):
+    def with_counts(self):
+        """Anota num_personal_asignado y num_instalaciones_gestor (todas las del gestor asignado)"""
+        return self.annotate(
+            num_personal_asignado=contar_personal_asignado(OuterRef('pk')),
+            num_instalaciones_gestor=contar(
+                Instalacion.objects.filter(gestor=OuterRef('gestor'), gestor__isnull=False), 'gestor'
+            ),
+        )
+
+    def with_cobertura(self):
+        """
+        Anota la dotación asignada (personal activo y vehículos en servicio),
+        la requerida según RequerimientosCliente y el déficit de cada una, en
+        la misma consulta. Sin requerimientos registrados se usan los valores
+        por defecto del modelo (un guardia, sin vehículos).
+        """
+        return self.annotate(
+            cobertura_personal_asignado=contar_personal_asignado(OuterRef('pk')),
+            cobertura_vehiculos_asignados=contar_vehiculos_asignados(OuterRef('pk')),
+            cobertura_personal_requerido=Case(
+                When(requerimientos__requiere_personal=False, then=0),
+                default=Coalesce('requerimientos__personal_requerido', 1),
+                output_field=models.IntegerField(),
+            ),
+            cobertura_vehiculos_requeridos=Case(
+                When(requerimientos__requiere_vehiculos=True, then='requerimientos__cantidad_vehiculos'),
+                default=0,
+                output_field=models.IntegerField(),
+            ),
+        ).annotate(
+            deficit_personal=Greatest(F('cobertura_personal_requerido') - F('cobertura_personal_asignado'), 0),
+            deficit_vehiculos=Greatest(F('cobertura_vehiculos_requeridos') - F('cobertura_vehiculos_asignados'), 0),
+        ).annotate(
+            deficit_total=F('deficit_personal') + F('deficit_vehiculos'),
+        )
+
+
 class Instalacion(models.Model):
     # Relaciones
     cliente = models.ForeignKey(
@@ -112,6 +253,8 @@ class Instalacion(models.Model):
     fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
     fecha_actualizacion = models.DateTimeField('Última Actualización', auto_now=True)
     
+    objects = InstalacionQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Instalación'
         verbose_name_plural = 'Instalaciones'
@@ -126,6 +269,29 @@ class Instalacion(models.Model):
         return hasattr(self, 'requerimientos')
 
 
+class RequerimientosClienteQuerySet(models.QuerySet):
+    def with_compliance(self):
+        """
+        Anota num_personal_asignado, num_vehiculos_asignados y cumple (el
+        mismo criterio de cumple_requerimientos), filtrables y ordenables.
+        Cumple quien no tiene déficit en Instalacion.objects.with_cobertura().
+        """
+        return self.annotate(
+            num_personal_asignado=contar_personal_asignado(OuterRef('instalacion')),
+            num_vehiculos_asignados=contar_vehiculos_asignados(OuterRef('instalacion')),
+        ).annotate(
+            cumple=Case(
+                When(
+                    Q(requiere_personal=True, num_personal_asignado__lt=F('personal_requerido'))
+                    | Q(requiere_vehiculos=True, num_vehiculos_asignados__lt=F('cantidad_vehiculos')),
+                    then=Value(False),
+                ),
+                default=Value(True),
+                output_field=BooleanField(),
+            ),
+        )
+
+
 class RequerimientosCliente(models.Model):
     """
     Modelo para almacenar los requerimientos de personal y flota para una instalación.
@@ -182,6 +348,8 @@ class RequerimientosCliente(models.Model):
     fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
     fecha_actualizacion = models.DateTimeField('Última Actualización', auto_now=True)
     
+    objects = RequerimientosClienteQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Requerimientos del Cliente'
         verbose_name_plural = 'Requerimientos de Clientes'
@@ -193,26 +361,31 @@ class RequerimientosCliente(models.Model):
     def cliente(self):
         return self.instalacion.cliente
     
+    # Los conteos usan las anotaciones de with_compliance() si están presentes;
+    # ver contar_personal_asignado / contar_vehiculos_asignados
     @property
     def personal_asignado(self):
-        return self.instalacion.personal_asignado.count()
+        if hasattr(self, 'num_personal_asignado'):
+            return self.num_personal_asignado
+        return self.instalacion.personal_asignado.filter(activo=True).count()
     
     @property
     def vehiculos_asignados(self):
-        return self.vehiculos.count()
+        if hasattr(self, 'num_vehiculos_asignados'):
+            return self.num_vehiculos_asignados
+        return self.instalacion.vehiculos_asignados.filter(en_servicio=True).count()
     
     @property
     def cumple_requerimientos(self):
         """Verifica si se cumplen los requerimientos de personal y vehículos"""
-        if self.requiere_personal and self.personal_asignado == 0:
+        if hasattr(self, 'cumple'):
+            return self.cumple
+        if self.requiere_personal and self.personal_asignado < self.personal_requerido:
             return False
         if self.requiere_vehiculos and self.vehiculos_asignados < self.cantidad_vehiculos:
             return False
         return True
 
-    def __str__(self):
-        return f"{self.nombre} ({self.cliente.razon_social})"
-
 # --- Módulo: Gestión de Personal ---
 class Cargo(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -272,7 +445,10 @@ class Personal(models.Model):
     # Información personal
     nombres = models.CharField('Nombres', max_length=100)
     apellidos = models.CharField('Apellidos', max_length=100)
-    rut = models.CharField('RUT', max_length=12, unique=True)
+    rut = models.CharField('RUT', max_length=12, unique=True, validators=[validar_rut])
+    # RUT normalizado (sin puntos ni guion) para búsquedas y unicidad; se completa en save()
+    rut_numero = models.PositiveIntegerField('Número de RUT', unique=True, null=True, blank=True, editable=False)
+    rut_dv = models.CharField('Dígito Verificador', max_length=1, blank=True, editable=False)
     fecha_nacimiento = models.DateField('Fecha de Nacimiento', blank=True, null=True)
     estado_civil = models.CharField(
         'Estado Civil', 
@@ -314,6 +490,14 @@ class Personal(models.Model):
     def __str__(self):
         return f"{self.nombres} {self.apellidos} ({self.rut})"
     
+    def clean(self):
+        if rut_duplicado(self):
+            raise ValidationError({'rut': 'Ya existe personal registrado con este RUT'})
+    
+    def save(self, *args, **kwargs):
+        self.rut_numero, self.rut_dv = partes_rut(self.rut)
+        super().save(*args, **kwargs)
+    
     @property
     def nombre_completo(self):
         return f"{self.nombres} {self.apellidos}"
@@ -464,6 +648,24 @@ class Vehiculo(models.Model):
         verbose_name = "Configuración de Turno"
         verbose_name_plural = "Configuraciones de Turnos"
 
+# --- Módulo: Feriados ---
+class Feriado(models.Model):
+    fecha = models.DateField('Fecha', unique=True)
+    nombre = models.CharField('Nombre', max_length=150)
+    irrenunciable = models.BooleanField(
+        'Irrenunciable',
+        default=False,
+        help_text='Feriado en que el comercio no puede operar (Ley 19.973)'
+    )
+
+    class Meta:
+        verbose_name = 'Feriado'
+        verbose_name_plural = 'Feriados'
+        ordering = ['fecha']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.fecha.strftime('%d/%m/%Y')})"
+
 # --- Módulo: Configuración de Turnos ---
 class ConfiguracionTurno(models.Model):
     TIPO_TURNO_CHOICES = [
@@ -613,6 +815,37 @@ class ConfiguracionTurno(models.Model):
         diferencia = fin - inicio
         return round(diferencia.total_seconds() / 3600, 2)
 
+class TurnoQuerySet(models.QuerySet):
+    # Campos que intervienen en los resúmenes de horas (ver reportes.py)
+    CAMPOS_RESUMEN_HORAS = {
+        'personal', 'personal_id', 'instalacion', 'instalacion_id', 'fecha', 'estado',
+        'horas_planificadas', 'horas_reales',
+    }
+
+    def update(self, **kwargs):
+        """
+        update() (y bulk_update) no emiten señales: se descartan aquí los
+        resúmenes de horas de los meses de los turnos, antes y después de
+        cambiar su fecha.
+        """
+        if not self.CAMPOS_RESUMEN_HORAS & kwargs.keys():
+            return super().update(**kwargs)
+        from .reportes import invalidar_horas
+
+        afectados = self
+        if 'fecha' in kwargs:
+            # Tras cambiar la fecha el filtro original puede dejar de incluirlos
+            afectados = Turno.objects.filter(pk__in=list(self.values_list('pk', flat=True)))
+        rangos = [afectados.aggregate(desde=Min('fecha'), hasta=Max('fecha'))]
+        filas = super().update(**kwargs)
+        if 'fecha' in kwargs:
+            rangos.append(afectados.aggregate(desde=Min('fecha'), hasta=Max('fecha')))
+        for rango in rangos:
+            if rango['desde']:
+                invalidar_horas(rango['desde'], rango['hasta'])
+        return filas
+
+
 # Usar strings para referencias de modelo que aún no están definidas
 class Turno(models.Model):
     """
@@ -707,6 +940,8 @@ class Turno(models.Model):
     
     # Notas y observaciones
     notas = models.TextField('Notas Adicionales', blank=True)
+
+    objects = TurnoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Turno'
@@ -717,12 +952,42 @@ class Turno(models.Model):
             models.Index(fields=['personal']),
             models.Index(fields=['instalacion']),
             models.Index(fields=['estado']),
+            # Búsqueda de turnos activos en un instante (fecha_inicio <= t <= fecha_fin)
+            models.Index(fields=['fecha_inicio', 'fecha_fin'], name='turno_activo_idx'),
+            models.Index(fields=['instalacion', 'fecha_inicio', 'fecha_fin'], name='turno_activo_inst_idx'),
+            # Mismo orden que el listado paginado por cursor
+            models.Index(fields=['-fecha', 'fecha_inicio', 'personal', 'id'], name='turno_listado_idx'),
         ]
     
+    # Duración máxima de un turno; acota el rango de búsqueda de turnos activos
+    DURACION_MAXIMA = timedelta(hours=24)
+    
     def __str__(self):
         return f"{self.personal} - {self.get_tipo_turno_display()} - {self.fecha.strftime('%d/%m/%Y')}"
     
+    @classmethod
+    def error_duracion(cls, inicio, fin):
+        """Mensaje de error si el intervalo no es un turno válido, o None"""
+        if fin <= inicio:
+            return 'El fin del turno debe ser posterior a su inicio.'
+        if fin - inicio > cls.DURACION_MAXIMA:
+            return f'Un turno no puede durar más de {int(cls.DURACION_MAXIMA.total_seconds() // 3600)} horas.'
+        return None
+    
+    def clean(self):
+        super().clean()
+        if self.fecha_inicio and self.fecha_fin:
+            error = self.error_duracion(self.fecha_inicio, self.fecha_fin)
+            if error:
+                raise ValidationError({'fecha_fin': error})
+    
     def save(self, *args, **kwargs):
+        # get_turns_at depende de DURACION_MAXIMA: se exige también fuera de los formularios
+        if self.fecha_inicio and self.fecha_fin:
+            error = self.error_duracion(self.fecha_inicio, self.fecha_fin)
+            if error:
+                raise ValidationError({'fecha_fin': error})
+        
         # Calcular horas planificadas si no están definidas
         if not self.horas_planificadas and self.fecha_inicio and self.fecha_fin:
             self.horas_planificadas = round((self.fecha_fin - self.fecha_inicio).total_seconds() / 3600, 2)
@@ -798,3 +1063,123 @@ class Incidencia(models.Model):
 
     def __str__(self):
         return f"[{self.get_estado_display()}] {self.titulo} - {self.instalacion.nombre}"
+
+
+# --- Módulo: Dashboard ---
+class ContadoresDashboard(models.Model):
+    """
+    Fila única con los contadores del dashboard, mantenida por señales sobre
+    Personal, Vehiculo e Incidencia para evitar un COUNT(*) por cada visita.
+    """
+    PK_UNICA = 1
+
+    personal_activo = models.PositiveIntegerField('Personal Activo', default=0)
+    vehiculos_en_servicio = models.PositiveIntegerField('Vehículos en Servicio', default=0)
+    incidencias_abiertas = models.PositiveIntegerField('Incidencias Abiertas', default=0)
+    personal_en_turno = models.PositiveIntegerField('Personal en Turno', default=0)
+    personal_en_turno_calculado = models.DateTimeField(
+        'Cálculo de Personal en Turno',
+        null=True,
+        blank=True,
+        help_text='Momento del último cálculo de personal en turno (depende de la hora)'
+    )
+    fecha_actualizacion = models.DateTimeField('Última Actualización', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Contadores del Dashboard'
+        verbose_name_plural = 'Contadores del Dashboard'
+
+    def __str__(self):
+        return f"Contadores del dashboard ({self.fecha_actualizacion:%d/%m/%Y %H:%M})"
+
+
+# --- Módulo: Importaciones ---
+class TrabajoImportacion(models.Model):
+    """
+    Importación masiva ejecutada en segundo plano. Guarda el archivo subido,
+    el avance y el detalle de las filas que no se pudieron importar.
+    """
+    TIPO_CHOICES = [
+        ('personal', 'Personal'),
+        ('vehiculos', 'Vehículos'),
+        ('turnos', 'Turnos'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('P', 'Pendiente'),
+        ('E', 'En Proceso'),
+        ('C', 'Completado'),
+        ('F', 'Fallido'),
+    ]
+
+    tipo = models.CharField('Tipo de Importación', max_length=20, choices=TIPO_CHOICES)
+    archivo = models.FileField('Archivo', upload_to='importaciones/%Y/%m/')
+    nombre_archivo = models.CharField('Nombre del Archivo', max_length=255, blank=True)
+    estado = models.CharField('Estado', max_length=1, choices=ESTADO_CHOICES, default='P')
+
+    # Avance
+    filas_procesadas = models.PositiveIntegerField('Filas Procesadas', default=0)
+    filas_creadas = models.PositiveIntegerField('Filas Creadas', default=0)
+    filas_actualizadas = models.PositiveIntegerField('Filas Actualizadas', default=0)
+    filas_fallidas = models.PositiveIntegerField('Filas Fallidas', default=0)
+    errores = models.JSONField('Errores por Fila', default=list, blank=True)
+    mensaje = models.TextField('Mensaje', blank=True)
+
+    # Auditoría
+    fecha_creacion = models.DateTimeField('Fecha de Creación', auto_now_add=True)
+    fecha_inicio = models.DateTimeField('Inicio del Proceso', null=True, blank=True)
+    fecha_avance = models.DateTimeField(
+        'Último Avance',
+        null=True,
+        blank=True,
+        help_text='Momento del último lote procesado; sin avance por un tiempo, el trabajo se da por interrumpido'
+    )
+    fecha_fin = models.DateTimeField('Fin del Proceso', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Trabajo de Importación'
+        verbose_name_plural = 'Trabajos de Importación'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.nombre_archivo} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('C', 'F')
+
+    @property
+    def filas_por_segundo(self):
+        """Velocidad de procesamiento en filas por segundo"""
+        if not self.fecha_inicio:
+            return 0
+        fin = self.fecha_fin or timezone.now()
+        segundos = (fin - self.fecha_inicio).total_seconds()
+        if segundos <= 0:
+            return 0
+        return round(self.filas_procesadas / segundos, 1)
+
+
+# --- Módulo: Reportes ---
+class ResumenHorasMensual(models.Model):
+    """
+    Horas planificadas y reales de un mes cerrado, agregadas por personal,
+    instalación, centro de costo y cliente. Se calcula una sola vez por mes y
+    se descarta si se modifica algún turno de ese mes o los nombres que copia
+    (personal, instalación, cliente y centro de costo).
+    """
+    anio = models.PositiveIntegerField('Año')
+    mes = models.PositiveSmallIntegerField('Mes')
+    filas = models.JSONField('Horas Agregadas', default=list)
+    fecha_calculo = models.DateTimeField('Fecha de Cálculo', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumen de Horas Mensual'
+        verbose_name_plural = 'Resúmenes de Horas Mensuales'
+        ordering = ['-anio', '-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['anio', 'mes'], name='resumen_horas_mes_unico'),
+        ]
+
+    def __str__(self):
+        return f"Horas {self.mes:02d}/{self.anio}"
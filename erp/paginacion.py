@@ -0,0 +1,222 @@
+"""
+Paginación por cursor (keyset) para las vistas de listado.
+
+En lugar de OFFSET, cada página se pide con los valores de orden de la última
+(o primera) fila de la página anterior: WHERE (a, b, pk) > (x, y, z) ORDER BY
+a, b, pk LIMIT n. Así una página profunda cuesta lo mismo que la primera.
+El orden se toma de Meta.ordering del modelo (o de orden_keyset) y siempre
+se completa con la clave primaria para que el cursor sea único.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.http import Http404
+
+
+def _serializar(valor):
+    # isoformat conserva los microsegundos (DjangoJSONEncoder los trunca)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, (Decimal, UUID)):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(valores):
+    datos = json.dumps([_serializar(v) for v in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Lista de valores del cursor; lanza ValueError si no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Cursor inválido') from e
+    if not isinstance(valores, list):
+        raise ValueError('Cursor inválido')
+    return valores
+
+
+class PaginaKeyset:
+    """Página de resultados con los enlaces a la página anterior y siguiente"""
+
+    def __init__(self, object_list, has_next, has_previous, url_siguiente, url_anterior, url_primera):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.url_siguiente = url_siguiente
+        self.url_anterior = url_anterior
+        self.url_primera = url_primera
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginationMixin:
+    """
+    Reemplaza la paginación por número de página de ListView. La página
+    siguiente se pide con ?despues=<cursor> y la anterior con ?antes=<cursor>;
+    el resto de los parámetros de la URL (filtros) se conserva.
+    """
+    paginate_by = 25
+    # Campos de orden ('-campo' para descendente); por defecto Meta.ordering
+    orden_keyset = None
+    parametro_despues = 'despues'
+    parametro_antes = 'antes'
+
+    def get_orden_keyset(self):
+        """
+        Lista de (ruta, descendente, campo del modelo, admite NULL) terminada
+        en la clave primaria.
+        """
+        orden = []
+        for entrada in self.orden_keyset or self.model._meta.ordering:
+            descendente = entrada.startswith('-')
+            ruta = entrada.lstrip('-')
+            campo, nulo = self._resolver_campo(ruta)
+            if campo.is_relation:
+                # Una relación se ordena por su id para que el cursor sea un valor simple
+                ruta = f'{ruta}_id'
+            orden.append((ruta, descendente, campo, nulo))
+        if not any(ruta == 'pk' or campo.primary_key for ruta, _, campo, _ in orden):
+            orden.append(('pk', False, self.model._meta.pk, False))
+        return orden
+
+    def _resolver_campo(self, ruta):
+        """Campo final de la ruta y si puede ser NULL (también por una relación opcional)"""
+        modelo = self.model
+        campo = None
+        nulo = False
+        for parte in ruta.split('__'):
+            if campo is not None:
+                modelo = campo.related_model
+            campo = modelo._meta.pk if parte == 'pk' else modelo._meta.get_field(parte)
+            nulo = nulo or campo.null
+        return campo, nulo
+
+    @staticmethod
+    def _expresion_orden(ruta, descendente, campo, nulo):
+        # NULL se trata siempre como el menor valor, igual en todos los motores
+        if nulo:
+            return F(ruta).desc(nulls_last=True) if descendente else F(ruta).asc(nulls_first=True)
+        return f'-{ruta}' if descendente else ruta
+
+    @staticmethod
+    def _posterior(ruta, descendente, nulo, valor):
+        """Condición "viene después de valor" para una columna, o None si ninguna fila cumple"""
+        if descendente:
+            if valor is None:
+                return None
+            condicion = Q(**{f'{ruta}__lt': valor})
+            if nulo:
+                condicion |= Q(**{f'{ruta}__isnull': True})
+            return condicion
+        if valor is None:
+            return Q(**{f'{ruta}__isnull': False})
+        return Q(**{f'{ruta}__gt': valor})
+
+    def _filtro_cursor(self, orden, valores):
+        """(c1, c2, ..., pk) posterior a los valores del cursor, en orden lexicográfico"""
+        filtro = None
+        iguales = Q()
+        for (ruta, descendente, _, nulo), valor in zip(orden, valores):
+            posterior = self._posterior(ruta, descendente, nulo, valor)
+            if posterior is not None:
+                posterior = iguales & posterior
+                filtro = posterior if filtro is None else filtro | posterior
+            if valor is None:
+                iguales &= Q(**{f'{ruta}__isnull': True})
+            else:
+                iguales &= Q(**{ruta: valor})
+
+        # Cota redundante sobre la primera columna: permite recorrer el índice
+        # por rango en lugar de evaluar el OR sobre toda la tabla
+        ruta, descendente, _, nulo = orden[0]
+        if filtro is not None and valores[0] is not None and not nulo:
+            filtro &= Q(**{f"{ruta}__{'lte' if descendente else 'gte'}": valores[0]})
+        return filtro
+
+    def _valores_cursor(self, orden, cursor):
+        try:
+            valores = decodificar_cursor(cursor)
+            if len(valores) != len(orden):
+                raise ValueError('Cursor inválido')
+            return [
+                None if valor is None else campo.to_python(valor)
+                for (_, _, campo, _), valor in zip(orden, valores)
+            ]
+        except (ValueError, ValidationError):
+            raise Http404('Cursor de paginación inválido')
+
+    def _url(self, parametro=None, cursor=None):
+        parametros = self.request.GET.copy()
+        parametros.pop(self.parametro_despues, None)
+        parametros.pop(self.parametro_antes, None)
+        if parametro:
+            parametros[parametro] = cursor
+        consulta = parametros.urlencode()
+        return f'?{consulta}' if consulta else self.request.path
+
+    def paginate_queryset(self, queryset, page_size):
+        orden = self.get_orden_keyset()
+        despues = self.request.GET.get(self.parametro_despues)
+        antes = None if despues else self.request.GET.get(self.parametro_antes)
+
+        # Los valores de orden se anotan para armar los cursores sin consultas extra
+        claves = {f'keyset_{i}': F(ruta) for i, (ruta, _, _, _) in enumerate(orden)}
+        queryset = queryset.annotate(**claves)
+
+        if antes:
+            # Hacia atrás: se invierte el orden, se avanza y se da vuelta el resultado
+            invertido = [(ruta, not descendente, campo, nulo) for ruta, descendente, campo, nulo in orden]
+            filtro = self._filtro_cursor(invertido, self._valores_cursor(orden, antes))
+            queryset = queryset.order_by(*(self._expresion_orden(*o) for o in invertido))
+        else:
+            filtro = self._filtro_cursor(orden, self._valores_cursor(orden, despues)) if despues else Q()
+            queryset = queryset.order_by(*(self._expresion_orden(*o) for o in orden))
+        if filtro is None:
+            objetos = []
+        else:
+            objetos = list(queryset.filter(filtro)[:page_size + 1])
+
+        hay_mas = len(objetos) > page_size
+        objetos = objetos[:page_size]
+        if antes and not hay_mas:
+            # Se llegó al comienzo: se muestra la primera página completa
+            antes = None
+            queryset = queryset.order_by(*(self._expresion_orden(*o) for o in orden))
+            objetos = list(queryset[:page_size + 1])
+            hay_mas = len(objetos) > page_size
+            objetos = objetos[:page_size]
+        if antes:
+            objetos.reverse()
+            has_next, has_previous = True, hay_mas
+        else:
+            has_next, has_previous = hay_mas, bool(despues)
+
+        def cursor(objeto):
+            return codificar_cursor([getattr(objeto, clave) for clave in claves])
+
+        pagina = PaginaKeyset(
+            objetos,
+            has_next=has_next and bool(objetos),
+            has_previous=has_previous and bool(objetos),
+            url_siguiente=self._url(self.parametro_despues, cursor(objetos[-1])) if objetos else None,
+            url_anterior=self._url(self.parametro_antes, cursor(objetos[0])) if objetos else None,
+            url_primera=self._url(),
+        )
+        return None, pagina, objetos, pagina.has_other_pages()
@@ -0,0 +1,221 @@
+"""
+Generación masiva de turnos a partir de una ConfiguracionTurno.
+
+La rotación (días de trabajo / días de descanso) se resuelve de forma
+aritmética por ciclo, sin recorrer día a día ni llamar a save() por fila;
+los turnos se insertan con bulk_create en lotes.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from math import ceil
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import pronostico
+from .conflictos import validar_candidatos
+from .festivos import feriados_en_rango
+from .models import Personal, Turno
+from .reportes import invalidar_horas
+
+# Tamaño de lote por defecto para bulk_create
+BATCH_SIZE = 2000
+
+# Tramos de la configuración: (tipo de Turno, campo de inicio, campo de fin)
+TRAMOS = [
+    ('M', 'turno_mañana_inicio', 'turno_mañana_fin'),
+    ('T', 'turno_tarde_inicio', 'turno_tarde_fin'),
+]
+
+
+def largo_ciclo(configuracion):
+    """Días de un ciclo completo de la rotación"""
+    return configuracion.dias_trabajo + configuracion.dias_descanso
+
+
+def fases_rotacion(configuracion):
+    """
+    Desfases (en días) necesarios para que la rotación cubra todos los días
+    del ciclo: en un 4x4 son 0 y 4, en un 5x2 son 0 y 5, etc.
+    """
+    trabajo = configuracion.dias_trabajo
+    if not trabajo:
+        raise ValueError('La configuración de turnos debe tener al menos un día de trabajo')
+    ciclo = largo_ciclo(configuracion)
+    return [(k * trabajo) % ciclo for k in range(ceil(ciclo / trabajo))]
+
+
+def cuadrillas(configuracion):
+    """(tipo_turno, desfase) de cada cuadrilla necesaria para cubrir todos los días"""
+    return [
+        (tipo, fase)
+        for tipo, _, _ in TRAMOS
+        for fase in fases_rotacion(configuracion)
+    ]
+
+
+def dotacion_requerida(configuracion):
+    """Guardias necesarios para tener personal_requerido_por_turno en cada tramo todos los días"""
+    return len(cuadrillas(configuracion)) * configuracion.personal_requerido_por_turno
+
+
+def asignar_cuadrillas(personal_ids, configuracion):
+    """
+    Reparte al personal en cuadrillas (tramo × fase) de forma circular.
+    Devuelve {personal_id: (tipo_turno, desfase)}.
+    """
+    cuadrillas_rotacion = cuadrillas(configuracion)
+    return {
+        personal_id: cuadrillas_rotacion[i % len(cuadrillas_rotacion)]
+        for i, personal_id in enumerate(personal_ids)
+    }
+
+
+def dias_de_trabajo(desfase, dias_trabajo, ciclo, total_dias):
+    """
+    Índices de día (0..total_dias-1) trabajados por un desfase dado.
+    Se recorre un ciclo a la vez, no un día a la vez.
+    """
+    inicio = (desfase % ciclo) - ciclo
+    for comienzo in range(inicio, total_dias, ciclo):
+        yield from range(max(comienzo, 0), min(comienzo + dias_trabajo, total_dias))
+
+
+def horarios_por_dia(configuracion, fecha_desde, total_dias):
+    """
+    Precalcula (inicio, fin, horas) de cada tramo para cada día del rango,
+    compartidos por todo el personal.
+    """
+    horarios = {}
+    for tipo, campo_inicio, campo_fin in TRAMOS:
+        hora_inicio = getattr(configuracion, campo_inicio)
+        hora_fin = getattr(configuracion, campo_fin)
+        dias = []
+        for d in range(total_dias):
+            fecha = fecha_desde + timedelta(days=d)
+            inicio = timezone.make_aware(datetime.combine(fecha, hora_inicio))
+            fin = timezone.make_aware(datetime.combine(fecha, hora_fin))
+            # Si la hora de fin es menor que la de inicio, el turno termina al día siguiente
+            if fin <= inicio:
+                fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), hora_fin))
+            # bulk_create no llama a save(): el límite de duración se valida aquí
+            error = Turno.error_duracion(inicio, fin)
+            if error:
+                raise ValueError(f'{tipo} {fecha:%d/%m/%Y}: {error}')
+            horas = Decimal(round((fin - inicio).total_seconds() / 3600, 2)).quantize(Decimal('0.01'))
+            dias.append((fecha, inicio, fin, horas))
+        horarios[tipo] = dias
+    return horarios
+
+
+def iterar_intervalos(configuracion, asignaciones, fecha_desde, fecha_hasta):
+    """
+    Genera los turnos de la rotación como tuplas
+    (personal_id, tipo_turno, fecha, inicio, fin, horas).
+
+    asignaciones: {personal_id: (tipo_turno, desfase)}
+    """
+    total_dias = (fecha_hasta - fecha_desde).days + 1
+    ciclo = largo_ciclo(configuracion)
+    horarios = horarios_por_dia(configuracion, fecha_desde, total_dias)
+
+    # Si la configuración no incluye festivos, esos días quedan sin turnos
+    excluidos = set()
+    if not configuracion.incluir_festivos:
+        excluidos = {(f - fecha_desde).days for f in feriados_en_rango(fecha_desde, fecha_hasta)}
+
+    for personal_id, (tipo, desfase) in asignaciones.items():
+        dias = horarios[tipo]
+        for d in dias_de_trabajo(desfase, configuracion.dias_trabajo, ciclo, total_dias):
+            if d not in excluidos:
+                yield (personal_id, tipo) + dias[d]
+
+
+def iterar_turnos(configuracion, asignaciones, fecha_desde, fecha_hasta, creado_por=None):
+    """Genera (sin guardar) los objetos Turno de la rotación"""
+    instalacion_id = configuracion.requerimientos.instalacion_id
+    creado_por_id = creado_por.pk if creado_por else None
+
+    for personal_id, tipo, fecha, inicio, fin, horas in iterar_intervalos(
+            configuracion, asignaciones, fecha_desde, fecha_hasta):
+        # bulk_create no llama a Turno.save(): las horas se completan aquí
+        yield Turno(
+            personal_id=personal_id,
+            instalacion_id=instalacion_id,
+            configuracion_id=configuracion.pk,
+            fecha=fecha,
+            fecha_inicio=inicio,
+            fecha_fin=fin,
+            tipo_turno=tipo,
+            estado='P',
+            horas_planificadas=horas,
+            horas_reales=horas,
+            creado_por_id=creado_por_id,
+        )
+
+
+def generar_turnos(configuracion, fecha_desde, fecha_hasta, personal=None,
+                   asignaciones=None, reemplazar=False, creado_por=None,
+                   validar=True, batch_size=BATCH_SIZE):
+    """
+    Expande una ConfiguracionTurno en filas de Turno para un rango de fechas.
+
+    Si no se indica personal, se usa el personal activo asignado a la
+    instalación de la configuración. Se planifican dotacion_requerida()
+    guardias, en orden, para cubrir personal_requerido_por_turno en cada
+    tramo; el resto queda sin turnos y, si faltan, se lanza ValueError.
+    Si reemplazar es True, se eliminan antes los turnos pendientes de esa
+    configuración en el rango.
+    Si validar es True, se verifica antes de insertar que los turnos nuevos
+    no choquen con otros turnos del mismo personal (ConflictoTurnosError).
+    Devuelve la cantidad de turnos creados.
+    """
+    if fecha_hasta < fecha_desde:
+        raise ValueError('La fecha de término debe ser igual o posterior a la de inicio')
+    if configuracion.requerimientos is None:
+        raise ValueError('La configuración de turnos no está asociada a una instalación')
+
+    if asignaciones is None:
+        if personal is None:
+            personal = Personal.objects.filter(
+                instalacion_asignada=configuracion.requerimientos.instalacion,
+                activo=True
+            )
+        personal_ids = [p if isinstance(p, int) else p.pk for p in personal]
+        requerida = dotacion_requerida(configuracion)
+        if len(personal_ids) < requerida:
+            raise ValueError(
+                f'La configuración requiere {requerida} guardias '
+                f'({configuracion.personal_requerido_por_turno} por turno en '
+                f'{requerida // configuracion.personal_requerido_por_turno} cuadrillas) y hay {len(personal_ids)}'
+            )
+        asignaciones = asignar_cuadrillas(personal_ids[:requerida], configuracion)
+
+    turnos = iterar_turnos(configuracion, asignaciones, fecha_desde, fecha_hasta, creado_por)
+    creados = 0
+    with transaction.atomic():
+        if reemplazar:
+            Turno.objects.filter(
+                configuracion=configuracion,
+                personal_id__in=list(asignaciones),
+                fecha__range=(fecha_desde, fecha_hasta),
+                estado='P'
+            ).delete()
+        if validar:
+            validar_candidatos(fecha_desde, fecha_hasta, (
+                (personal_id, inicio, fin, None)
+                for personal_id, _, _, inicio, fin, _ in iterar_intervalos(
+                    configuracion, asignaciones, fecha_desde, fecha_hasta)
+            ))
+        while True:
+            lote = list(islice(turnos, batch_size))
+            if not lote:
+                break
+            Turno.objects.bulk_create(lote, batch_size=batch_size)
+            creados += len(lote)
+        # bulk_create no emite post_save: se descartan los resúmenes de horas del rango
+        # y el pronóstico de brechas
+        invalidar_horas(fecha_desde, fecha_hasta)
+        pronostico.invalidar()
+    return creados
@@ -0,0 +1,185 @@
+"""
+Pronóstico de brechas de dotación para los próximos días.
+
+Compara, por instalación × fecha × tramo (mañana y tarde de la
+ConfiguracionTurno), los turnos planificados con personal_requerido_por_turno.
+Los turnos del horizonte se agrupan en una sola consulta; la dotación
+requerida y la planificada se arman como arreglos de NumPy
+(instalaciones × días × tramos) y la brecha es su diferencia, sin recorrer
+celda por celda.
+
+El resultado se guarda en memoria por proceso: las señales de Turno y de
+ConfiguracionTurno lo invalidan, igual que la generación e importación
+masiva de turnos, y se recalcula cada VIGENCIA segundos para recoger los
+cambios hechos por otros procesos.
+"""
+import time
+from datetime import timedelta
+from threading import Lock
+
+import numpy as np
+from django.db.models import Count
+from django.utils import timezone
+
+from .festivos import mascara_feriados
+from .models import ConfiguracionTurno, Turno
+
+# Días pronosticados por defecto y máximo
+HORIZONTE = 30
+HORIZONTE_MAXIMO = 90
+
+# Segundos que se reutiliza un pronóstico ya calculado
+VIGENCIA = 300
+
+# Tramos de la ConfiguracionTurno, en el orden del tercer eje de los arreglos
+TRAMOS = ['M', 'T']
+
+# Tipo de Turno -> tramos que cubre (el turno completo cubre ambos)
+TRAMOS_POR_TIPO = {'M': [0], 'T': [1], 'N': [1], 'C': [0, 1]}
+
+# Los turnos cancelados o de ausencias ya registradas no cubren el tramo
+ESTADOS_EXCLUIDOS = ['X', 'A', 'J']
+
+# (fecha, días) -> (instante de cálculo, PronosticoBrechas)
+_cache = {}
+_generacion = 0
+_lock = Lock()
+
+
+class PronosticoBrechas:
+    """
+    Dotación requerida, planificada y faltante de cada instalación.
+    Los arreglos tienen forma (instalaciones, días, tramos).
+    """
+
+    def __init__(self, fecha_desde, dias, instalaciones, requerido, planificado):
+        self.fecha_desde = fecha_desde
+        self.dias = dias
+        self.instalaciones = instalaciones
+        self.indices = {pk: i for i, (pk, _) in enumerate(instalaciones)}
+        self.requerido = requerido
+        self.planificado = planificado
+        self.brecha = np.maximum(requerido - planificado, 0)
+
+    @property
+    def fechas(self):
+        return [self.fecha_desde + timedelta(days=d) for d in range(self.dias)]
+
+    def _filas(self, instalacion_id):
+        """Índices de instalación a incluir (todas si instalacion_id es None)"""
+        if instalacion_id is None:
+            return range(len(self.instalaciones))
+        return [self.indices[instalacion_id]] if instalacion_id in self.indices else []
+
+    def brechas(self, instalacion_id=None):
+        """Tramos sin cubrir, ordenados por fecha, instalación y tramo"""
+        celdas = np.argwhere(self.brecha > 0)
+        if instalacion_id is not None:
+            celdas = celdas[celdas[:, 0] == self.indices.get(instalacion_id, -1)]
+        resultado = [
+            {
+                'instalacion_id': self.instalaciones[i][0],
+                'instalacion': self.instalaciones[i][1],
+                'fecha': self.fecha_desde + timedelta(days=int(d)),
+                'tramo': TRAMOS[t],
+                'requerido': int(self.requerido[i, d, t]),
+                'planificado': int(self.planificado[i, d, t]),
+                'faltantes': int(self.brecha[i, d, t]),
+            }
+            for i, d, t in celdas
+        ]
+        resultado.sort(key=lambda b: (b['fecha'], b['instalacion'], b['tramo']))
+        return resultado
+
+    def mapa_calor(self, instalacion_id=None, solo_brechas=False):
+        """
+        Una fila por instalación y tramo con los faltantes de cada día, en el
+        orden de fechas.
+        """
+        filas = []
+        for i in self._filas(instalacion_id):
+            pk, nombre = self.instalaciones[i]
+            for t, tramo in enumerate(TRAMOS):
+                faltantes = self.brecha[i, :, t]
+                if solo_brechas and not faltantes.any():
+                    continue
+                filas.append({
+                    'instalacion_id': pk,
+                    'instalacion': nombre,
+                    'tramo': tramo,
+                    'faltantes': faltantes.tolist(),
+                })
+        return filas
+
+
+def calcular_pronostico(fecha_desde, dias, instalacion_id=None):
+    """
+    Pronóstico de brechas entre fecha_desde y los dias siguientes (dos
+    consultas), de todas las instalaciones activas o solo de instalacion_id.
+    """
+    fecha_hasta = fecha_desde + timedelta(days=dias - 1)
+    configuraciones = ConfiguracionTurno.objects.filter(requerimientos__instalacion__activa=True)
+    if instalacion_id is not None:
+        configuraciones = configuraciones.filter(requerimientos__instalacion_id=instalacion_id)
+    configuraciones = list(
+        configuraciones.order_by('requerimientos__instalacion__nombre').values_list(
+            'requerimientos__instalacion_id', 'requerimientos__instalacion__nombre',
+            'personal_requerido_por_turno', 'incluir_festivos',
+        )
+    )
+    instalaciones = [(pk, nombre) for pk, nombre, _, _ in configuraciones]
+    indices = {pk: i for i, (pk, _) in enumerate(instalaciones)}
+
+    # Requerido: personal por turno de cada instalación, transmitido a todos los días y tramos;
+    # sin festivos incluidos, los feriados no requieren dotación
+    por_turno = np.array([c[2] for c in configuraciones], dtype=np.int64).reshape(-1, 1, 1)
+    requerido = np.broadcast_to(por_turno, (len(instalaciones), dias, len(TRAMOS))).copy()
+    sin_festivos = np.array([not c[3] for c in configuraciones], dtype=bool)
+    if sin_festivos.any():
+        feriados = mascara_feriados(fecha_desde, dias)
+        requerido[np.ix_(sin_festivos, feriados)] = 0
+
+    # Planificado: turnos agrupados por instalación, fecha y tipo en una sola consulta
+    filas = Turno.objects.filter(
+        fecha__range=(fecha_desde, fecha_hasta), instalacion_id__in=list(indices)
+    ).exclude(
+        estado__in=ESTADOS_EXCLUIDOS
+    ).values_list('instalacion_id', 'fecha', 'tipo_turno').annotate(total=Count('id')).order_by()
+    planificado = np.zeros_like(requerido)
+    posiciones, tramos, totales = [], [], []
+    for instalacion_id, fecha, tipo, total in filas:
+        for tramo in TRAMOS_POR_TIPO.get(tipo, ()):
+            posiciones.append((indices[instalacion_id], (fecha - fecha_desde).days))
+            tramos.append(tramo)
+            totales.append(total)
+    if posiciones:
+        posiciones = np.array(posiciones, dtype=np.int64)
+        np.add.at(planificado, (posiciones[:, 0], posiciones[:, 1], np.array(tramos)), totales)
+
+    return PronosticoBrechas(fecha_desde, dias, instalaciones, requerido, planificado)
+
+
+def obtener_pronostico(dias=HORIZONTE):
+    """Pronóstico desde hoy, reutilizado mientras no cambien los turnos"""
+    clave = (timezone.localdate(), dias)
+    entrada = _cache.get(clave)
+    if entrada is not None and time.monotonic() - entrada[0] <= VIGENCIA:
+        return entrada[1]
+
+    generacion = _generacion
+    pronostico = calcular_pronostico(clave[0], dias)
+    with _lock:
+        # Si se invalidó mientras se calculaba, el resultado se entrega pero no se guarda
+        if generacion == _generacion:
+            for vieja in [c for c in _cache if c[0] != clave[0]]:
+                del _cache[vieja]
+            _cache[clave] = (time.monotonic(), pronostico)
+    return pronostico
+
+
+def invalidar():
+    """Descarta los pronósticos calculados"""
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _cache.clear()
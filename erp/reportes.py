@@ -0,0 +1,166 @@
+"""
+Reporte mensual de horas trabajadas.
+
+Las horas de un mes se obtienen con una única consulta agrupada (Sum sobre
+los turnos del mes) por personal, instalación, centro de costo y cliente; los
+totales por cada dimensión se acumulan en Python a partir de ese resultado.
+Los meses cerrados se guardan en ResumenHorasMensual y no se vuelven a
+calcular mientras no cambien sus turnos.
+"""
+from datetime import date
+
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import ResumenHorasMensual, Turno
+
+# Estados cuyos turnos suman horas reales (los pendientes aún no se trabajan)
+ESTADOS_TRABAJADOS = ['E', 'C']
+
+# Los turnos cancelados no suman horas planificadas
+ESTADOS_EXCLUIDOS = ['X']
+
+# Agrupación -> (campo id, campos que forman el nombre)
+AGRUPACIONES = {
+    'personal': ('personal_id', ('personal_nombres', 'personal_apellidos')),
+    'instalacion': ('instalacion_id', ('instalacion_nombre',)),
+    'centro_costo': ('centro_costo_id', ('centro_costo_nombre',)),
+    'cliente': ('cliente_id', ('cliente_razon_social',)),
+}
+
+HORAS = ('horas_planificadas', 'horas_reales')
+
+
+def rango_mes(anio, mes):
+    """Primer día del mes y primer día del mes siguiente"""
+    inicio = date(anio, mes, 1)
+    fin = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    return inicio, fin
+
+
+def mes_anterior(fecha=None):
+    """(año, mes) del mes anterior a la fecha (por defecto, hoy)"""
+    fecha = fecha or timezone.localdate()
+    if fecha.month == 1:
+        return fecha.year - 1, 12
+    return fecha.year, fecha.month - 1
+
+
+def mes_cerrado(anio, mes, hoy=None):
+    """Un mes está cerrado cuando ya terminó"""
+    hoy = hoy or timezone.localdate()
+    return rango_mes(anio, mes)[1] <= hoy
+
+
+def calcular_horas_mes(anio, mes):
+    """
+    Horas del mes agrupadas por personal, instalación, centro de costo y
+    cliente, en una sola consulta.
+    """
+    inicio, fin = rango_mes(anio, mes)
+    filas = Turno.objects.filter(
+        fecha__gte=inicio, fecha__lt=fin
+    ).exclude(
+        estado__in=ESTADOS_EXCLUIDOS
+    ).values(
+        'personal_id', 'instalacion_id',
+        centro_costo_id=F('personal__centro_costo_id'),
+        cliente_id=F('instalacion__cliente_id'),
+        personal_rut=F('personal__rut'),
+        personal_nombres=F('personal__nombres'),
+        personal_apellidos=F('personal__apellidos'),
+        instalacion_nombre=F('instalacion__nombre'),
+        centro_costo_nombre=F('personal__centro_costo__nombre'),
+        cliente_razon_social=F('instalacion__cliente__razon_social'),
+    ).annotate(
+        horas_planificadas=Sum('horas_planificadas'),
+        horas_reales=Sum('horas_reales', filter=Q(estado__in=ESTADOS_TRABAJADOS)),
+        turnos=Count('id'),
+        ausencias=Count('id', filter=Q(estado='A')),
+    ).order_by()
+
+    resultado = []
+    for fila in filas:
+        for campo in HORAS:
+            # Decimal no es serializable en JSON; las horas tienen 2 decimales
+            fila[campo] = float(fila[campo] or 0)
+        resultado.append(fila)
+    return resultado
+
+
+def horas_del_mes(anio, mes):
+    """
+    Filas agregadas de un mes. Los meses cerrados se leen del resumen guardado
+    y se calculan solo la primera vez; el mes en curso se calcula siempre.
+    """
+    if not mes_cerrado(anio, mes):
+        return calcular_horas_mes(anio, mes)
+    resumen = ResumenHorasMensual.objects.filter(anio=anio, mes=mes).first()
+    if resumen is None:
+        resumen, _ = ResumenHorasMensual.objects.update_or_create(
+            anio=anio, mes=mes, defaults={'filas': calcular_horas_mes(anio, mes)}
+        )
+    return resumen.filas
+
+
+def resumir_horas(filas, agrupar):
+    """Acumula las filas agregadas según una de las AGRUPACIONES"""
+    campo_id, campos_nombre = AGRUPACIONES[agrupar]
+    totales = {}
+    for fila in filas:
+        clave = fila[campo_id]
+        total = totales.get(clave)
+        if total is None:
+            total = totales[clave] = {
+                'id': clave,
+                'nombre': ' '.join(fila[c] for c in campos_nombre if fila[c]) or 'Sin asignar',
+                'horas_planificadas': 0,
+                'horas_reales': 0,
+                'turnos': 0,
+                'ausencias': 0,
+            }
+            if agrupar == 'personal':
+                total['rut'] = fila['personal_rut']
+        for campo in HORAS + ('turnos', 'ausencias'):
+            total[campo] += fila[campo]
+
+    resultado = sorted(totales.values(), key=lambda t: t['nombre'])
+    for total in resultado:
+        for campo in HORAS:
+            total[campo] = round(total[campo], 2)
+        total['diferencia'] = round(total['horas_reales'] - total['horas_planificadas'], 2)
+    return resultado
+
+
+def reporte_horas(anio, mes, agrupar='personal'):
+    """Reporte de horas de un mes con los totales por agrupación y generales"""
+    filas = horas_del_mes(anio, mes)
+    resumen = resumir_horas(filas, agrupar)
+    total = {campo: round(sum(r[campo] for r in resumen), 2) for campo in HORAS}
+    total['diferencia'] = round(total['horas_reales'] - total['horas_planificadas'], 2)
+    return {
+        'anio': anio,
+        'mes': mes,
+        'cerrado': mes_cerrado(anio, mes),
+        'agrupar': agrupar,
+        'total': total,
+        'filas': resumen,
+    }
+
+
+def invalidar_horas(fecha_desde, fecha_hasta=None):
+    """Descarta los resúmenes guardados de los meses entre ambas fechas"""
+    fecha_hasta = fecha_hasta or fecha_desde
+    if (fecha_desde.year, fecha_desde.month) == (fecha_hasta.year, fecha_hasta.month):
+        filtro = Q(anio=fecha_desde.year, mes=fecha_desde.month)
+    else:
+        filtro = Q(anio__gt=fecha_desde.year) | Q(anio=fecha_desde.year, mes__gte=fecha_desde.month)
+        filtro &= Q(anio__lt=fecha_hasta.year) | Q(anio=fecha_hasta.year, mes__lte=fecha_hasta.month)
+    ResumenHorasMensual.objects.filter(filtro).delete()
+
+
+def invalidar_horas_de_turnos(**filtro):
+    """Descarta los resúmenes de los meses en que hay turnos que cumplen el filtro"""
+    rango = Turno.objects.filter(**filtro).aggregate(desde=Min('fecha'), hasta=Max('fecha'))
+    if rango['desde']:
+        invalidar_horas(rango['desde'], rango['hasta'])
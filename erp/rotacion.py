@@ -0,0 +1,84 @@
+"""
+Motor de rotación vectorizado.
+
+Calcula, sin consultar la base de datos, qué personal trabaja cada día bajo
+una rotación (días de trabajo / días de descanso más un desfase por persona)
+como una única operación sobre arreglos de NumPy. Pensado para simulaciones
+de dotación ("¿qué pasa si...?") sobre miles de guardias.
+"""
+import numpy as np
+
+from .planificacion import asignar_cuadrillas
+
+
+def matriz_trabajo(desfases, dias_trabajo, dias_descanso, total_dias):
+    """
+    Devuelve una matriz booleana (personal × días) donde True indica día de
+    trabajo. Una persona trabaja el día d si (d - desfase) mod ciclo < dias_trabajo.
+
+    dias_trabajo y dias_descanso pueden ser escalares (misma rotación para
+    todos) o arreglos con un valor por persona.
+    """
+    desfases = np.asarray(desfases, dtype=np.int64)
+    trabajo = np.asarray(dias_trabajo, dtype=np.int64)
+    ciclo = trabajo + np.asarray(dias_descanso, dtype=np.int64)
+    if np.any(ciclo <= 0):
+        raise ValueError('El ciclo de la rotación debe tener al menos un día')
+
+    # Las columnas se expanden a (personal, 1) para transmitirse contra los días
+    if trabajo.ndim:
+        trabajo = trabajo[:, None]
+    if ciclo.ndim:
+        ciclo = ciclo[:, None]
+    dias = np.arange(total_dias, dtype=np.int64)
+    return (dias[None, :] - desfases[:, None]) % ciclo < trabajo
+
+
+def dotacion_por_grupo(matriz, grupos):
+    """
+    Suma la matriz de trabajo por grupo (por ejemplo, instalación y tipo de
+    turno). grupos es una secuencia con la clave de cada persona.
+
+    Devuelve (claves, dotacion) donde dotacion[i, d] es la cantidad de
+    personas del grupo claves[i] que trabajan el día d.
+    """
+    claves, indices = np.unique(np.asarray(grupos), return_inverse=True, axis=0)
+    indices = indices.reshape(-1)
+    dotacion = np.zeros((len(claves), matriz.shape[1]), dtype=np.int64)
+    np.add.at(dotacion, indices, matriz)
+    return claves, dotacion
+
+
+def dotacion_diaria(matriz, instalaciones, tipos_turno):
+    """
+    Dotación diaria por instalación y tipo de turno.
+
+    Devuelve {(instalacion_id, tipo_turno): arreglo con la dotación de cada día}.
+    """
+    instalaciones = np.asarray(instalaciones)
+    tipos_turno = np.asarray(tipos_turno)
+    # Se codifica el tipo de turno como entero para agrupar ambas columnas juntas
+    tipos, codigos = np.unique(tipos_turno, return_inverse=True)
+    grupos = np.column_stack([instalaciones.astype(np.int64), codigos.reshape(-1)])
+    claves, dotacion = dotacion_por_grupo(matriz, grupos)
+    return {
+        (int(instalacion), str(tipos[codigo])): fila
+        for (instalacion, codigo), fila in zip(claves, dotacion)
+    }
+
+
+def simular_configuracion(configuracion, cantidad_personal, total_dias, instalacion_id=None):
+    """
+    Simula la dotación diaria de una ConfiguracionTurno con cierta cantidad de
+    guardias repartidos en cuadrillas, igual que el generador de turnos.
+
+    Devuelve (matriz, dotacion) con dotacion por (instalacion_id, tipo_turno).
+    """
+    asignaciones = asignar_cuadrillas(range(cantidad_personal), configuracion)
+    tipos = [asignaciones[i][0] for i in range(cantidad_personal)]
+    desfases = [asignaciones[i][1] for i in range(cantidad_personal)]
+    matriz = matriz_trabajo(desfases, configuracion.dias_trabajo, configuracion.dias_descanso, total_dias)
+    if instalacion_id is None and configuracion.requerimientos_id:
+        instalacion_id = configuracion.requerimientos.instalacion_id
+    instalaciones = np.full(cantidad_personal, instalacion_id or 0, dtype=np.int64)
+    return matriz, dotacion_diaria(matriz, instalaciones, tipos)
@@ -0,0 +1,79 @@
+"""
+Utilidades para el RUT chileno.
+
+Se aceptan las formas habituales de escribirlo ("12.345.678-9",
+"12345678-9", "123456789") y se normalizan a "12345678-9". Cliente y Personal
+guardan además el número y el dígito verificador por separado (rut_numero,
+rut_dv) para buscar por RUT con una igualdad sobre un índice.
+"""
+import re
+
+from django.core.exceptions import ValidationError
+
+_CARACTERES_IGNORADOS = re.compile(r'[\s.\-]')
+
+
+def digito_verificador(cuerpo):
+    """Calcula el dígito verificador (módulo 11) de la parte numérica del RUT"""
+    suma = 0
+    multiplicador = 2
+    for digito in reversed(str(cuerpo)):
+        suma += int(digito) * multiplicador
+        multiplicador = multiplicador + 1 if multiplicador < 7 else 2
+    resto = 11 - (suma % 11)
+    if resto == 11:
+        return '0'
+    if resto == 10:
+        return 'K'
+    return str(resto)
+
+
+def separar_rut(valor):
+    """
+    Devuelve (cuerpo, dv) a partir de un RUT escrito en cualquier formato,
+    o None si no tiene forma de RUT.
+    """
+    limpio = _CARACTERES_IGNORADOS.sub('', str(valor or '')).upper()
+    if len(limpio) < 2:
+        return None
+    cuerpo, dv = limpio[:-1], limpio[-1]
+    if not cuerpo.isdigit() or not (dv.isdigit() or dv == 'K'):
+        return None
+    return int(cuerpo), dv
+
+
+def rut_valido(valor):
+    """Indica si el RUT tiene forma válida y su dígito verificador es correcto"""
+    partes = separar_rut(valor)
+    return partes is not None and digito_verificador(partes[0]) == partes[1]
+
+
+def normalizar_rut(valor):
+    """
+    Normaliza un RUT a la forma "12345678-9". Si no tiene forma de RUT se
+    devuelve el valor original sin espacios, para no perder el dato.
+    """
+    partes = separar_rut(valor)
+    if partes is None:
+        return str(valor or '').strip()
+    return f'{partes[0]}-{partes[1]}'
+
+
+def partes_rut(valor):
+    """
+    (número, dígito verificador) para guardar en rut_numero / rut_dv, o
+    (None, '') si el valor no tiene forma de RUT.
+    """
+    partes = separar_rut(valor)
+    if partes is None:
+        return None, ''
+    return partes
+
+
+def validar_rut(valor):
+    """Validador de formularios y modelos: forma de RUT y dígito verificador"""
+    if not rut_valido(valor):
+        raise ValidationError(
+            'RUT inválido: revise el número y el dígito verificador (ej: 12.345.678-9)',
+            code='rut_invalido',
+        )
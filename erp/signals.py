@@ -0,0 +1,138 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from . import indice_prefijos, pronostico
+from .busqueda import indexar_clientes, indexar_instalaciones
+from .festivos import invalidar_feriados
+from .models import (
+    CentroCosto, Cliente, ConfiguracionTurno, GestorCliente, Instalacion, Personal, Vehiculo, Incidencia, Feriado,
+    Turno,
+)
+from .reportes import invalidar_horas, invalidar_horas_de_turnos, mes_cerrado
+from .utils import CONTADORES, ajustar_contador, cuenta_en
+
+
+# --- Contadores del dashboard ---
+# Cada escritura suma o resta 1 según el valor anterior y el nuevo, sin COUNT(*)
+CONTADOR_POR_MODELO = {modelo: contador for contador, (modelo, _, _) in CONTADORES.items()}
+
+@receiver(pre_save, sender=Personal)
+@receiver(pre_save, sender=Vehiculo)
+@receiver(pre_save, sender=Incidencia)
+def recordar_contador(sender, instance, **kwargs):
+    contador = CONTADOR_POR_MODELO[sender]
+    _, campo, valor = CONTADORES[contador]
+    instance._contaba = not instance._state.adding and sender.objects.filter(
+        pk=instance.pk, **{campo: valor}
+    ).exists()
+
+@receiver(post_save, sender=Personal)
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_save, sender=Incidencia)
+def ajustar_contador_guardado(sender, instance, **kwargs):
+    contador = CONTADOR_POR_MODELO[sender]
+    ajustar_contador(contador, cuenta_en(contador, instance) - getattr(instance, '_contaba', False))
+
+@receiver(post_delete, sender=Personal)
+@receiver(post_delete, sender=Vehiculo)
+@receiver(post_delete, sender=Incidencia)
+def ajustar_contador_eliminado(sender, instance, **kwargs):
+    contador = CONTADOR_POR_MODELO[sender]
+    ajustar_contador(contador, -cuenta_en(contador, instance))
+
+
+# --- Caché de feriados ---
+@receiver([post_save, post_delete], sender=Feriado)
+def invalidar_cache_feriados(sender, **kwargs):
+    invalidar_feriados()
+
+
+# --- Resúmenes de horas de meses cerrados ---
+# Los update() de turnos los invalida TurnoQuerySet.update
+@receiver(pre_save, sender=Turno)
+def recordar_fecha_turno(sender, instance, **kwargs):
+    instance._fecha_guardada = None if instance._state.adding else sender.objects.filter(
+        pk=instance.pk
+    ).values_list('fecha', flat=True).first()
+
+@receiver([post_save, post_delete], sender=Turno)
+def invalidar_resumen_horas(sender, instance, **kwargs):
+    # Al mover un turno de mes cambian el mes que deja y el mes al que llega
+    for fecha in {instance.fecha, getattr(instance, '_fecha_guardada', None)}:
+        if fecha and mes_cerrado(fecha.year, fecha.month):
+            invalidar_horas(fecha)
+
+# Modelo -> (campos copiados en las filas del resumen, filtro de sus turnos)
+CAMPOS_AGRUPACION = {
+    Personal: (('nombres', 'apellidos', 'rut', 'centro_costo_id'), 'personal'),
+    Instalacion: (('nombre', 'cliente_id'), 'instalacion'),
+    Cliente: (('razon_social',), 'instalacion__cliente'),
+    CentroCosto: (('nombre',), 'personal__centro_costo'),
+}
+
+@receiver(pre_save, sender=Personal)
+@receiver(pre_save, sender=Instalacion)
+@receiver(pre_save, sender=Cliente)
+@receiver(pre_save, sender=CentroCosto)
+def recordar_agrupacion(sender, instance, **kwargs):
+    campos, _ = CAMPOS_AGRUPACION[sender]
+    instance._agrupacion_guardada = None if instance._state.adding else sender.objects.filter(
+        pk=instance.pk
+    ).values_list(*campos).first()
+
+@receiver(post_save, sender=Personal)
+@receiver(post_save, sender=Instalacion)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=CentroCosto)
+def invalidar_resumen_por_agrupacion(sender, instance, created, **kwargs):
+    campos, filtro = CAMPOS_AGRUPACION[sender]
+    anterior = getattr(instance, '_agrupacion_guardada', None)
+    if created or anterior is None or anterior == tuple(getattr(instance, c) for c in campos):
+        return
+    invalidar_horas_de_turnos(**{filtro: instance.pk})
+
+
+# --- Pronóstico de brechas de dotación ---
+@receiver([post_save, post_delete], sender=Turno)
+@receiver([post_save, post_delete], sender=ConfiguracionTurno)
+@receiver([post_save, post_delete], sender=Feriado)
+def invalidar_pronostico(sender, **kwargs):
+    pronostico.invalidar()
+
+
+# --- Índice de búsqueda de clientes e instalaciones ---
+@receiver([post_save, post_delete], sender=Cliente)
+def indexar_cliente(sender, instance, **kwargs):
+    indexar_clientes([instance.pk])
+    # La razón social también forma parte del documento de cada instalación
+    if kwargs.get('signal') is post_save:
+        indexar_instalaciones(cliente_id=instance.pk)
+
+@receiver([post_save, post_delete], sender=GestorCliente)
+def indexar_gestor(sender, instance, **kwargs):
+    indexar_clientes([instance.cliente_id])
+    indexar_instalaciones(cliente_id=instance.cliente_id)
+
+@receiver([post_save, post_delete], sender=Instalacion)
+def indexar_instalacion(sender, instance, **kwargs):
+    indexar_instalaciones([instance.pk])
+
+
+# --- Índice de búsqueda rápida (typeahead) ---
+@receiver([post_save, post_delete], sender=Personal)
+def actualizar_prefijos_personal(sender, instance, **kwargs):
+    indice_prefijos.actualizar('personal', [instance.pk])
+
+@receiver([post_save, post_delete], sender=Vehiculo)
+def actualizar_prefijos_vehiculo(sender, instance, **kwargs):
+    indice_prefijos.actualizar('vehiculo', [instance.pk])
+
+@receiver([post_save, post_delete], sender=Instalacion)
+def actualizar_prefijos_instalacion(sender, instance, **kwargs):
+    indice_prefijos.actualizar('instalacion', [instance.pk])
+
+@receiver([post_save, post_delete], sender=Cliente)
+def actualizar_prefijos_cliente(sender, instance, **kwargs):
+    indice_prefijos.actualizar('cliente', [instance.pk])
+    # Las instalaciones muestran la razón social de su cliente
+    if kwargs.get('signal') is post_save:
+        indice_prefijos.actualizar('instalacion', instance.instalaciones.values_list('id', flat=True))
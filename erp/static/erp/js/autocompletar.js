@@ -0,0 +1,133 @@
+// Autocompletado para los <select data-autocompletar> (ver erp/widgets.py).
+// El <select> queda oculto y conserva las opciones elegidas, que son las que
+// se envían con el formulario; la caja de texto consulta la API por páginas.
+(function() {
+    function filtros(select) {
+        const parametros = new URLSearchParams();
+        (select.dataset.dependeDe || '').split(',').filter(Boolean).forEach(function(par) {
+            const [parametro, campo] = par.split(':');
+            const origen = document.getElementById(campo);
+            if (origen && origen.value) parametros.set(parametro, origen.value);
+        });
+        return parametros;
+    }
+
+    function iniciar(select) {
+        const multiple = select.multiple;
+        const contenedor = document.createElement('div');
+        contenedor.className = 'position-relative flex-grow-1';
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.autocomplete = 'off';
+        input.className = 'form-control';
+        input.placeholder = 'Escriba para buscar...';
+        const lista = document.createElement('div');
+        lista.className = 'dropdown-menu w-100';
+        lista.style.maxHeight = '300px';
+        lista.style.overflowY = 'auto';
+        const elegidos = document.createElement('div');
+        elegidos.className = 'mt-1';
+
+        select.parentNode.insertBefore(contenedor, select);
+        contenedor.append(input, lista, select);
+        if (multiple) contenedor.appendChild(elegidos);
+        select.classList.add('d-none');
+
+        function mostrarElegidos() {
+            if (!multiple) {
+                const opcion = select.selectedOptions[0];
+                input.value = opcion && opcion.value ? opcion.text : '';
+                return;
+            }
+            elegidos.replaceChildren(...Array.from(select.selectedOptions).map(function(opcion) {
+                const etiqueta = document.createElement('span');
+                etiqueta.className = 'badge bg-secondary me-1';
+                etiqueta.textContent = opcion.text + ' ';
+                const quitar = document.createElement('a');
+                quitar.href = '#';
+                quitar.className = 'text-white';
+                quitar.textContent = '×';
+                quitar.addEventListener('click', function(e) {
+                    e.preventDefault();
+                    opcion.remove();
+                    mostrarElegidos();
+                    select.dispatchEvent(new Event('change'));
+                });
+                etiqueta.appendChild(quitar);
+                return etiqueta;
+            }));
+        }
+
+        function elegir(resultado) {
+            let opcion = Array.from(select.options).find(o => o.value === String(resultado.id));
+            if (!opcion) {
+                opcion = new Option(resultado.texto, resultado.id);
+                select.add(opcion);
+            }
+            if (!multiple) {
+                Array.from(select.options).forEach(o => { if (o !== opcion && o.value) o.remove(); });
+            }
+            opcion.selected = true;
+            lista.classList.remove('show');
+            mostrarElegidos();
+            if (multiple) input.value = '';
+            select.dispatchEvent(new Event('change'));
+        }
+
+        let pendiente = null;
+        function buscar(pagina) {
+            const parametros = filtros(select);
+            parametros.set('q', input.value.trim());
+            parametros.set('pagina', pagina);
+            fetch(select.dataset.autocompletar + '?' + parametros)
+                .then(r => r.json())
+                .then(function(data) {
+                    if (pagina === 1) lista.replaceChildren();
+                    lista.querySelector('.autocompletar-mas')?.remove();
+                    data.resultados.forEach(function(resultado) {
+                        const item = document.createElement('a');
+                        item.href = '#';
+                        item.className = 'dropdown-item';
+                        item.textContent = resultado.texto;
+                        item.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            elegir(resultado);
+                        });
+                        lista.appendChild(item);
+                    });
+                    if (data.hay_mas) {
+                        const mas = document.createElement('a');
+                        mas.href = '#';
+                        mas.className = 'dropdown-item text-muted autocompletar-mas';
+                        mas.textContent = 'Ver más resultados...';
+                        mas.addEventListener('mousedown', function(e) {
+                            e.preventDefault();
+                            buscar(pagina + 1);
+                        });
+                        lista.appendChild(mas);
+                    }
+                    lista.classList.toggle('show', lista.children.length > 0);
+                });
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(pendiente);
+            if (!multiple && !input.value.trim()) {
+                Array.from(select.options).forEach(o => { if (o.value) o.remove(); });
+                select.value = '';
+                select.dispatchEvent(new Event('change'));
+            }
+            pendiente = setTimeout(() => buscar(1), 200);
+        });
+        input.addEventListener('focus', () => buscar(1));
+        input.addEventListener('blur', function() {
+            lista.classList.remove('show');
+            mostrarElegidos();
+        });
+        mostrarElegidos();
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();
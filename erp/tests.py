@@ -1,3 +1,1388 @@
-from django.test import TestCase
+"""
+Pruebas del módulo ERP.
 
-# Create your tests here.
+Cada vista de listado y detalle de erp/urls.py tiene un presupuesto máximo de
+consultas SQL (PRESUPUESTOS). Los datos de prueba tienen varias filas por
+modelo, de modo que una consulta por fila (N+1) supera el presupuesto.
+"""
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.views.generic import ListView
+
+from . import indice_prefijos, pronostico
+from .asignacion import asignar_turnos
+from .busqueda import buscar, fts_disponible
+from .conflictos import (
+    ConflictoTurnosError, detectar_superposiciones, turnos_excedidos, validar_candidatos,
+)
+from .cumplimiento import CICLO_MAXIMO, Regla, limites_rotacion, verificar_jornada
+from .festivos import es_feriado, invalidar_feriados
+from .forms import IncidenciaForm, TurnoForm
+from .importacion import ErrorImportacion, importar_personal, importar_turnos, importar_vehiculos, validar_personal
+from .middleware import MedicionConsultasMiddleware
+from .models import (
+    Cargo, Cliente, ConfiguracionTurno, ContadoresDashboard, Feriado, GestorCliente, Incidencia,
+    Instalacion, Personal, RequerimientosCliente, ResumenHorasMensual, TipoIncidencia, TipoVehiculo,
+    TrabajoImportacion, Turno, Vehiculo,
+)
+from .paginacion import KeysetPaginationMixin, codificar_cursor, decodificar_cursor
+from .planificacion import dias_de_trabajo, dotacion_requerida, fases_rotacion, generar_turnos
+from .reportes import horas_del_mes
+from .rotacion import matriz_trabajo
+from .rut import digito_verificador, normalizar_rut, partes_rut, rut_valido
+from .trabajos import procesar_trabajo, recuperar_interrumpidos
+from .urls import urlpatterns
+from .utils import get_requerimientos_incumplidos, recalcular_contadores, who_is_on_shift
+
+# Filas creadas por modelo en los datos de prueba
+FILAS = 6
+
+# Nombre de la URL -> (objeto de prueba para el pk o None, máximo de consultas)
+PRESUPUESTOS = {
+    'dashboard': (None, 4),
+    'gestion_clientes': (None, 5),
+    'cliente_list': (None, 2),
+    'cliente_detail': ('cliente', 2),
+    'instalacion_list': (None, 1),
+    'instalacion_detail': ('instalacion', 6),
+    'cobertura': (None, 4),
+    'cargo_list': (None, 1),
+    'personal_list': (None, 1),
+    'personal_detail': ('personal', 2),
+    'importacion_detail': ('importacion', 1),
+    'tipo_vehiculo_list': (None, 1),
+    'vehiculo_list': (None, 2),
+    'vehiculo_detail': ('vehiculo', 2),
+    'tipo_incidencia_list': (None, 1),
+    'incidencia_list': (None, 2),
+    'incidencia_detail': ('incidencia', 3),
+    'turno_list': (None, 2),
+    'turno_detail': ('turno', 2),
+    'configuracion_turno_list': (None, 1),
+    'configuracion_turno_detail': ('configuracion_turno', 1),
+}
+
+
+@contextmanager
+def presupuesto_consultas(testcase, maximo):
+    """Falla si el bloque ejecuta más de maximo consultas, listándolas"""
+    with CaptureQueriesContext(connection) as consultas:
+        yield consultas
+    if len(consultas) > maximo:
+        detalle = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(consultas.captured_queries, start=1))
+        testcase.fail(f'Se ejecutaron {len(consultas)} consultas (máximo {maximo}):\n{detalle}')
+
+
+def max_consultas(maximo):
+    """Decorador de métodos de prueba: la prueba completa no puede superar maximo consultas"""
+    def decorador(prueba):
+        @wraps(prueba)
+        def envoltura(self, *args, **kwargs):
+            with presupuesto_consultas(self, maximo):
+                return prueba(self, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# Plantillas que se usan en lugar de las que aún no existen: muestran cada
+# objeto (su __str__ suele leer relaciones, así que un N+1 se sigue notando)
+PLANTILLA_MINIMA_LISTA = '{% for objeto in object_list %}{{ objeto }}{% endfor %}'
+PLANTILLA_MINIMA_DETALLE = '{{ object }}'
+
+
+def plantillas_minimas():
+    """override_settings que agrega una plantilla mínima por cada vista de PRESUPUESTOS sin plantilla"""
+    vistas = {patron.name: patron.callback.view_class for patron in urlpatterns if patron.name in PRESUPUESTOS}
+    faltantes = {}
+    for nombre, (objeto, _) in PRESUPUESTOS.items():
+        plantilla = vistas[nombre].template_name
+        try:
+            get_template(plantilla)
+        except TemplateDoesNotExist:
+            faltantes[plantilla] = PLANTILLA_MINIMA_DETALLE if objeto else PLANTILLA_MINIMA_LISTA
+    motor = {**settings.TEMPLATES[0], 'APP_DIRS': False}
+    motor['OPTIONS'] = {**motor['OPTIONS'], 'loaders': [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+        ('django.template.loaders.locmem.Loader', faltantes),
+    ]}
+    return override_settings(TEMPLATES=[motor])
+
+
+def _rut(numero):
+    return f'{numero}-{digito_verificador(numero)}'
+
+
+class DatosPruebaMixin:
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create(username='supervisor')
+        cls.cargo = Cargo.objects.create(nombre='Guardia')
+        cls.tipo_vehiculo = TipoVehiculo.objects.create(nombre='Camioneta')
+        cls.tipo_incidencia = TipoIncidencia.objects.create(nombre='Robo')
+        inicio = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+        for i in range(FILAS):
+            cls.cliente = Cliente.objects.create(razon_social=f'Cliente {i}', rut=_rut(10000000 + i))
+            gestor = GestorCliente.objects.create(cliente=cls.cliente, nombre=f'Gestor {i}', es_principal=True)
+            cls.instalacion = Instalacion.objects.create(
+                cliente=cls.cliente, gestor=gestor, nombre=f'Instalación {i}', direccion='Av. Siempre Viva 123'
+            )
+            requerimientos = RequerimientosCliente.objects.create(instalacion=cls.instalacion)
+            cls.configuracion_turno = ConfiguracionTurno.objects.create(requerimientos=requerimientos)
+            cls.personal = Personal.objects.create(
+                nombres=f'Nombre {i}', apellidos='Apellido', rut=_rut(20000000 + i), telefono='+56911111111',
+                cargo=cls.cargo, cliente=cls.cliente, instalacion_asignada=cls.instalacion,
+            )
+            cls.vehiculo = Vehiculo.objects.create(
+                tipo=cls.tipo_vehiculo, patente=f'ABCD{i:02d}', marca='Toyota', modelo='Hilux', ano=2022,
+                requerimientos_cliente=requerimientos, instalacion_asignada=cls.instalacion,
+            )
+            fecha_inicio = inicio + timedelta(days=i)
+            cls.turno = Turno.objects.create(
+                personal=cls.personal, instalacion=cls.instalacion, configuracion=cls.configuracion_turno,
+                fecha=fecha_inicio.date(), fecha_inicio=fecha_inicio, fecha_fin=fecha_inicio + timedelta(hours=8),
+                tipo_turno=Turno.TIPO_TURNO_CHOICES[0][0],
+            )
+            cls.incidencia = Incidencia.objects.create(
+                titulo=f'Incidencia {i}', instalacion=cls.instalacion, tipo_incidencia=cls.tipo_incidencia,
+                fecha_hora_suceso=fecha_inicio, descripcion='Descripción', reportado_por=usuario,
+            )
+            cls.incidencia.personal_involucrado.add(cls.personal)
+            cls.importacion = TrabajoImportacion.objects.create(tipo='personal', archivo='importaciones/personal.csv')
+        # Los contadores del dashboard se crean en la primera visita; se mide el caso habitual
+        recalcular_contadores()
+
+
+class ContadoresDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cargo = Cargo.objects.create(nombre='Guardia')
+
+    def setUp(self):
+        recalcular_contadores()
+
+    def contadores(self):
+        return ContadoresDashboard.objects.values(
+            'personal_activo', 'vehiculos_en_servicio', 'incidencias_abiertas'
+        ).get()
+
+    def test_escrituras_ajustan_sin_contar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            personal = Personal.objects.create(
+                nombres='Ana', apellidos='Soto', rut=_rut(20000000), telefono='+56911111111', cargo=self.cargo,
+            )
+            otro = Personal.objects.create(
+                nombres='Luis', apellidos='Soto', rut=_rut(20000001), telefono='+56911111111', cargo=self.cargo,
+            )
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if 'COUNT(' in q['sql']])
+        self.assertEqual(self.contadores()['personal_activo'], 2)
+
+        personal.activo = False
+        personal.save()
+        personal.save()
+        self.assertEqual(self.contadores()['personal_activo'], 1)
+        personal.delete()
+        self.assertEqual(self.contadores()['personal_activo'], 1)
+        otro.delete()
+        self.assertEqual(self.contadores()['personal_activo'], 0)
+
+    def test_incidencias_abiertas(self):
+        instalacion = Instalacion.objects.create(
+            cliente=Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000)),
+            nombre='Planta', direccion='Av. 1',
+        )
+        incidencia = Incidencia.objects.create(
+            titulo='Robo', instalacion=instalacion, tipo_incidencia=TipoIncidencia.objects.create(nombre='Robo'),
+            fecha_hora_suceso=timezone.now(), descripcion='-', reportado_por=User.objects.create(username='u'),
+        )
+        self.assertEqual(self.contadores()['incidencias_abiertas'], 1)
+        incidencia.estado = 'C'
+        incidencia.save()
+        self.assertEqual(self.contadores()['incidencias_abiertas'], 0)
+        # Una fila desfasada no deja el contador negativo
+        incidencia.estado = 'A'
+        incidencia.save()
+        ContadoresDashboard.objects.update(incidencias_abiertas=0)
+        incidencia.delete()
+        self.assertEqual(self.contadores()['incidencias_abiertas'], 0)
+
+
+class TurnosActivosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cls.instalacion = Instalacion.objects.create(cliente=cliente, nombre='Planta', direccion='Av. 1')
+        cls.personal = Personal.objects.create(
+            nombres='Ana', apellidos='Soto', rut=_rut(20000000), telefono='+56911111111',
+            cargo=Cargo.objects.create(nombre='Guardia'), cliente=cliente,
+        )
+        cls.ahora = timezone.make_aware(datetime(2026, 3, 2, 12))
+
+    def turno(self, inicio, horas):
+        return Turno(
+            personal=self.personal, instalacion=self.instalacion, fecha=inicio.date(),
+            fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=horas), tipo_turno='C',
+        )
+
+    def test_turno_largo_dentro_de_la_ventana(self):
+        self.turno(self.ahora - timedelta(hours=23), 24).save()
+        self.turno(self.ahora - timedelta(hours=12), 11).save()
+        self.assertEqual(list(who_is_on_shift(self.ahora)), [self.personal])
+        self.assertFalse(who_is_on_shift(self.ahora + timedelta(hours=2)).exists())
+
+    def test_duracion_maxima_exigida_al_guardar(self):
+        with self.assertRaises(ValidationError):
+            self.turno(self.ahora, 25).save()
+        # Las filas anteriores a la validación se reportan para corregirlas
+        Turno.objects.bulk_create([self.turno(self.ahora, 30), self.turno(self.ahora + timedelta(days=2), 8)])
+        excedidos = list(turnos_excedidos(self.ahora.date(), self.ahora.date()))
+        self.assertEqual([(i[1], i[2]) for i in excedidos], [(self.personal.pk, self.ahora)])
+
+
+class CalendarioEventosTests(TestCase):
+    def test_rango_y_fechas_invalidas(self):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        instalacion = Instalacion.objects.create(cliente=cliente, nombre='Planta', direccion='Av. 1')
+        personal = Personal.objects.create(
+            nombres='Ana', apellidos='Soto', rut=_rut(20000000), telefono='+56911111111',
+            cargo=Cargo.objects.create(nombre='Guardia'), cliente=cliente,
+        )
+        inicio = timezone.make_aware(datetime(2026, 2, 28, 20))
+        turno = Turno.objects.create(
+            personal=personal, instalacion=instalacion, fecha=inicio.date(),
+            fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=12), tipo_turno='T',
+        )
+        url = reverse('erp:calendar_events')
+        # El turno nocturno que empieza antes del rango también se muestra
+        eventos = self.client.get(url, {'start': '2026-03-01', 'end': '2026-03-02'}).json()
+        self.assertEqual([e['id'] for e in eventos], [turno.pk])
+        for start in ('2026-02-30', '2026-02-30T00:00:00', 'x'):
+            with self.subTest(start=start):
+                self.assertEqual(self.client.get(url, {'start': start, 'end': '2026-03-02'}).status_code, 400)
+
+
+class FeriadosTests(TestCase):
+    def setUp(self):
+        invalidar_feriados()
+
+    def importar(self, contenido):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        self.addCleanup(os.remove, archivo.name)
+        call_command('importar_feriados', archivo.name, stdout=io.StringIO())
+
+    def test_cache_por_anio_e_invalidacion(self):
+        self.importar('fecha,nombre,irrenunciable\n2026-09-18,Independencia,si\n\n19-09-2026,Glorias\n')
+        self.assertTrue(es_feriado(datetime(2026, 9, 18).date()))
+        with presupuesto_consultas(self, 0):
+            self.assertTrue(es_feriado(datetime(2026, 9, 19).date()))
+            self.assertFalse(es_feriado(datetime(2026, 9, 20).date()))
+        Feriado.objects.create(fecha=datetime(2026, 9, 20).date(), nombre='Interferiado')
+        self.assertTrue(es_feriado(datetime(2026, 9, 20).date()))
+
+    def test_filas_incompletas(self):
+        with self.assertRaisesMessage(CommandError, 'Falta el nombre del feriado en la línea 3'):
+            self.importar('fecha,nombre\n2026-09-18,Independencia\n2026-09-19\n')
+        with self.assertRaisesMessage(CommandError, 'Fecha inválida en la línea 2'):
+            self.importar('fecha,nombre\n2026-02-30,Inexistente\n')
+        self.assertFalse(Feriado.objects.exists())
+
+
+def _csv(*lineas):
+    return io.BytesIO('\n'.join(lineas).encode('utf-8'))
+
+
+ENCABEZADO_PERSONAL = 'nombres,apellidos,rut,fecha_nacimiento,direccion,telefono,email,cargo,fecha_contratacion,cliente'
+
+
+class ImportacionPersonalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+
+    def fila(self, i, **valores):
+        columnas = {
+            'nombres': f'Guardia {i}', 'apellidos': 'Soto', 'rut': _rut(20000000 + i),
+            'fecha_nacimiento': '01-02-1990', 'direccion': 'Av. 1', 'telefono': '+56911111111', 'email': '',
+            'cargo': 'Guardia', 'fecha_contratacion': '', 'cliente': 'Cliente', **valores,
+        }
+        return ','.join(columnas.values())
+
+    def test_lotes_tolerantes_con_filas_cortas(self):
+        archivo = _csv(ENCABEZADO_PERSONAL, self.fila(1), self.fila(2), 'Corto,Soto', self.fila(3),
+                       self.fila(4, fecha_nacimiento='31-02-1990'))
+        avances = []
+        resultado = importar_personal(archivo, batch_size=2, tolerante=True,
+                                      al_avanzar=lambda r: avances.append(r.procesadas))
+        self.assertEqual(avances, [2, 4, 5])
+        self.assertEqual((resultado.creadas, resultado.fallidas), (3, 2))
+        self.assertEqual([e['fila'] for e in resultado.errores], [4, 6])
+        self.assertEqual(Personal.objects.count(), 3)
+        self.assertEqual(Cargo.objects.count(), 1)
+
+    def test_sin_tolerancia_no_guarda_nada(self):
+        with self.assertRaisesMessage(ErrorImportacion, 'Fila 3'):
+            importar_personal(_csv(ENCABEZADO_PERSONAL, self.fila(1), 'Corto'), batch_size=1)
+        self.assertFalse(Personal.objects.exists())
+
+    def test_modo_de_prueba_reporta_todas_las_filas(self):
+        Personal.objects.create(nombres='Ana', apellidos='Rojas', rut=_rut(20000001), telefono='+56911111111',
+                                cargo=Cargo.objects.create(nombre='Guardia'))
+        rut_con_puntos = f'20.000.001-{digito_verificador(20000001)}'
+        archivo = _csv(
+            ENCABEZADO_PERSONAL, self.fila(1, rut=rut_con_puntos), self.fila(2), self.fila(3, rut='20000003-0'),
+            self.fila(4, fecha_nacimiento='31-02-1990', cliente='Otro'), self.fila(5, rut=_rut(20000002)),
+            self.fila(6, cargo='Supervisor'),
+        )
+        # Clientes, cargos y RUT existentes se precargan: no hay consultas por fila
+        with self.assertNumQueries(3):
+            resultado = validar_personal(archivo)
+        errores = {(e['fila'], e['campo']) for e in resultado.errores}
+        self.assertEqual(errores, {
+            (2, 'rut'), (4, 'rut'), (5, 'cliente'), (5, 'fecha_nacimiento'), (6, 'rut'),
+        })
+        self.assertIn('fila 3', next(e['error'] for e in resultado.errores if e['fila'] == 6))
+        self.assertEqual([a['fila'] for a in resultado.advertencias], [7])
+        self.assertEqual(Personal.objects.count(), 1)
+        self.assertFalse(Cargo.objects.filter(nombre='Supervisor').exists())
+
+
+class ImportacionUpsertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cls.instalacion = Instalacion.objects.create(cliente=cliente, nombre='Bodega', direccion='Av. 1')
+        cls.personal = Personal.objects.create(
+            nombres='Ana', apellidos='Rojas', rut=_rut(20000001), telefono='+56911111111',
+            cargo=Cargo.objects.create(nombre='Guardia'),
+        )
+
+    def test_celdas_vacias_conservan_el_valor(self):
+        Vehiculo.objects.create(
+            tipo=TipoVehiculo.objects.create(nombre='Camioneta'), patente='ABCD10', marca='Toyota',
+            modelo='Hilux', ano=2020, kilometraje=5000, color='Rojo', revision_tecnica=datetime(2026, 5, 1).date(),
+            instalacion_asignada=self.instalacion,
+        )
+        archivo = _csv('patente,tipo,marca,modelo,ano,kilometraje,color,revision_tecnica,instalacion',
+                       'abcd10,Camioneta,Toyota,Hilux,2021,,Azul,,',
+                       'EFGH20,Camioneta,Nissan,Navara,2023,,,,')
+        resultado = importar_vehiculos(archivo)
+        self.assertEqual((resultado.creadas, resultado.actualizadas), (1, 1))
+        vehiculo = Vehiculo.objects.get(patente='ABCD10')
+        self.assertEqual((vehiculo.ano, vehiculo.color, vehiculo.kilometraje), (2021, 'Azul', 5000))
+        self.assertEqual(vehiculo.revision_tecnica, datetime(2026, 5, 1).date())
+        self.assertEqual(vehiculo.instalacion_asignada, self.instalacion)
+        self.assertEqual(Vehiculo.objects.get(patente='EFGH20').kilometraje, 0)
+
+    def test_clave_de_fila_rechazada_no_cuenta_como_repetida(self):
+        inicio = timezone.make_aware(datetime(2026, 3, 2, 8))
+        Turno.objects.create(personal=self.personal, instalacion=self.instalacion, fecha=inicio.date(),
+                             fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=8), tipo_turno='M')
+        rut = self.personal.rut
+        archivo = _csv('rut,instalacion,fecha_inicio,fecha_fin,tipo_turno,estado',
+                       f'{rut},Bodega,02-03-2026 12:00,02-03-2026 20:00,T,Pendiente',
+                       f'{rut},Bodega,02-03-2026 12:00,02-03-2026 20:00,T,Cancelado',
+                       f'{rut},Bodega,02-03-2026 12:00,02-03-2026 20:00,T,Cancelado')
+        resultado = importar_turnos(archivo, batch_size=1, tolerante=True)
+        self.assertEqual(resultado.creadas, 1)
+        self.assertEqual([(e['fila'], e['error'][:17]) for e in resultado.errores],
+                         [(2, 'El turno se super'), (4, 'Registro repetido')])
+        self.assertIn('(fila 3)', resultado.errores[1]['error'])
+
+
+@override_settings(ERP_IMPORTACIONES_INACTIVIDAD=600)
+class TrabajosImportacionTests(TestCase):
+    def trabajo(self, estado, minutos=None):
+        avance = timezone.now() - timedelta(minutes=minutos) if minutos is not None else None
+        return TrabajoImportacion.objects.create(
+            tipo='vehiculos', archivo='importaciones/vehiculos.csv', estado=estado,
+            fecha_inicio=avance, fecha_avance=avance, filas_procesadas=10,
+        )
+
+    def test_interrumpidos_se_marcan_fallidos(self):
+        activo, detenido, pendiente = self.trabajo('E', 2), self.trabajo('E', 30), self.trabajo('P')
+        salida = io.StringIO()
+        with mock.patch('erp.management.commands.procesar_importaciones.procesar_trabajo') as procesar:
+            call_command('procesar_importaciones', stdout=salida)
+        self.assertIn('1 trabajos interrumpidos', salida.getvalue())
+        procesar.assert_called_once_with(pendiente.pk)
+        estados = dict(TrabajoImportacion.objects.values_list('pk', 'estado'))
+        self.assertEqual((estados[activo.pk], estados[detenido.pk]), ('E', 'F'))
+
+    def test_fallo_conserva_el_avance_guardado(self):
+        trabajo = TrabajoImportacion.objects.create(
+            tipo='vehiculos', archivo=ContentFile(b'patente\n', name='vehiculos.csv'),
+        )
+
+        def importar(archivo, tolerante, al_avanzar):
+            # Un lote guardado antes de que falle el siguiente
+            al_avanzar(mock.Mock(procesadas=500, creadas=480, actualizadas=15, fallidas=5))
+            raise ErrorImportacion('columna faltante', fila=501)
+
+        with mock.patch.dict('erp.trabajos.IMPORTADORES', vehiculos=importar):
+            procesar_trabajo(trabajo.pk)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'F')
+        self.assertEqual(trabajo.mensaje, 'Fila 501: columna faltante')
+        self.assertEqual(
+            (trabajo.filas_procesadas, trabajo.filas_creadas, trabajo.filas_actualizadas, trabajo.filas_fallidas),
+            (500, 480, 15, 5),
+        )
+        self.assertGreater(trabajo.fecha_avance, trabajo.fecha_inicio)
+
+    def test_reintentar_interrumpidos(self):
+        detenido = self.trabajo('E', 30)
+        self.assertEqual(recuperar_interrumpidos(reintentar=True), 1)
+        detenido.refresh_from_db()
+        self.assertEqual((detenido.estado, detenido.filas_procesadas, detenido.fecha_inicio), ('P', 0, None))
+
+
+class ExportacionTurnosTests(TestCase):
+    def test_filtro_por_fechas(self):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        instalacion = Instalacion.objects.create(cliente=cliente, nombre='Bodega', direccion='Av. 1')
+        personal = Personal.objects.create(nombres='Ana', apellidos='Rojas', rut=_rut(20000001),
+                                           telefono='+56911111111', cargo=Cargo.objects.create(nombre='Guardia'))
+        for dia in (1, 2, 3):
+            inicio = timezone.make_aware(datetime(2026, 3, dia, 8))
+            Turno.objects.create(personal=personal, instalacion=instalacion, fecha=inicio.date(),
+                                 fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=8), tipo_turno='M')
+        url = reverse('erp:exportar_datos', args=['turnos'])
+
+        response = self.client.get(url, {'desde': '2026-03-02', 'hasta': '2026-03-02'})
+        lineas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lineas), 2)
+
+        for parametros in ({'desde': '2026-02-30'}, {'hasta': 'marzo'}):
+            response = self.client.get(url, parametros)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(next(iter(parametros)), response.json()['error'])
+
+
+class ResumenHorasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cls.instalacion = Instalacion.objects.create(cliente=cliente, nombre='Bodega', direccion='Av. 1')
+        cls.personal = Personal.objects.create(nombres='Ana', apellidos='Rojas', rut=_rut(20000001),
+                                               telefono='+56911111111', cargo=Cargo.objects.create(nombre='Guardia'))
+        inicio = timezone.make_aware(datetime(2024, 1, 31, 8))
+        cls.turno = Turno.objects.create(personal=cls.personal, instalacion=cls.instalacion, fecha=inicio.date(),
+                                         fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=8), tipo_turno='M')
+
+    def meses_guardados(self):
+        # Enero y febrero de 2024 están cerrados: se guardan al consultarlos
+        horas_del_mes(2024, 1)
+        horas_del_mes(2024, 2)
+        return set(ResumenHorasMensual.objects.values_list('mes', flat=True))
+
+    def test_mover_turno_invalida_ambos_meses(self):
+        self.assertEqual(self.meses_guardados(), {1, 2})
+        self.turno.fecha = datetime(2024, 2, 1).date()
+        self.turno.fecha_inicio += timedelta(days=1)
+        self.turno.fecha_fin += timedelta(days=1)
+        self.turno.save()
+        self.assertFalse(ResumenHorasMensual.objects.exists())
+        self.assertEqual(horas_del_mes(2024, 1), [])
+        self.assertEqual(len(horas_del_mes(2024, 2)), 1)
+
+    def test_update_de_queryset(self):
+        self.meses_guardados()
+        Turno.objects.filter(pk=self.turno.pk).update(notas='Sin novedad')
+        self.assertEqual(ResumenHorasMensual.objects.count(), 2)
+        Turno.objects.filter(pk=self.turno.pk).update(fecha=datetime(2024, 2, 1).date())
+        self.assertFalse(ResumenHorasMensual.objects.exists())
+
+    def test_cambios_en_columnas_de_agrupacion(self):
+        self.meses_guardados()
+        self.personal.activo = False
+        self.personal.save()
+        self.assertEqual(ResumenHorasMensual.objects.count(), 2)
+        self.personal.apellidos = 'Rojas Soto'
+        self.personal.save()
+        self.assertEqual(set(ResumenHorasMensual.objects.values_list('mes', flat=True)), {2})
+        self.assertEqual(horas_del_mes(2024, 1)[0]['personal_apellidos'], 'Rojas Soto')
+
+        self.instalacion.nombre = 'Bodega Norte'
+        self.instalacion.save()
+        self.assertEqual(horas_del_mes(2024, 1)[0]['instalacion_nombre'], 'Bodega Norte')
+
+
+class PersonalPorApellidoView(KeysetPaginationMixin, ListView):
+    model = Personal
+    paginate_by = 2
+    orden_keyset = ['apellidos', '-fecha_contratacion']
+
+
+class PaginacionKeysetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cargo = Cargo.objects.create(nombre='Guardia')
+        # Apellidos repetidos y fechas nulas: el desempate lo da la clave primaria
+        apellidos = ['Soto', 'Rojas', 'Soto', 'Rojas', 'Soto']
+        cls.personal = [
+            Personal.objects.create(nombres=f'Guardia {i}', apellidos=apellido, rut=_rut(20000000 + i),
+                                    telefono='+56911111111', cargo=cargo)
+            for i, apellido in enumerate(apellidos)
+        ]
+
+    def pagina(self, **parametros):
+        respuesta = PersonalPorApellidoView.as_view()(RequestFactory().get('/personal/', parametros))
+        return respuesta.context_data['page_obj']
+
+    def test_codificacion_del_cursor(self):
+        valores = [datetime(2026, 3, 2, 8, 30, 0, 123456), Decimal('12.50'), None, 'Ñuñoa']
+        cursor = codificar_cursor(valores)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decodificar_cursor(cursor), ['2026-03-02T08:30:00.123456', '12.50', None, 'Ñuñoa'])
+
+    def test_recorrido_con_empates(self):
+        esperado = [p.pk for p in sorted(self.personal, key=lambda p: (p.apellidos, p.pk))]
+        vistos, pagina = [], self.pagina()
+        while True:
+            vistos += [p.pk for p in pagina]
+            if not pagina.has_next:
+                break
+            pagina = self.pagina(despues=pagina.url_siguiente.split('despues=')[1])
+        self.assertEqual(vistos, esperado)
+
+        # Hacia atrás desde la última página se recorren las mismas filas
+        anterior = self.pagina(antes=pagina.url_anterior.split('antes=')[1])
+        self.assertEqual([p.pk for p in anterior], esperado[2:4])
+        self.assertTrue(anterior.has_previous)
+
+    def test_cursores_invalidos(self):
+        valido = codificar_cursor(['Rojas', None, self.personal[1].pk])
+        self.assertEqual([p.pk for p in self.pagina(despues=valido)], [self.personal[3].pk, self.personal[0].pk])
+        for cursor in ('no es base64!', codificar_cursor(['Rojas', None]), codificar_cursor({'a': 1}),
+                       codificar_cursor(['Rojas', '2026-02-30', 1]), codificar_cursor(['Rojas', None, 'x'])):
+            with self.subTest(cursor=cursor), self.assertRaises(Http404):
+                self.pagina(despues=cursor)
+
+
+class BusquedaTests(TestCase):
+    def test_indice_creado_por_la_migracion(self):
+        # La tabla FTS5 la crea la migración 0014; las señales la mantienen al día
+        self.assertTrue(fts_disponible())
+        cliente = Cliente.objects.create(razon_social='Seguridad Ñuñoa', rut='76.543.210-3')
+        GestorCliente.objects.create(cliente=cliente, nombre='Marta Pérez', es_principal=True)
+        self.assertEqual(buscar('cliente', 'nunoa'), [cliente.pk])
+        self.assertEqual(buscar('cliente', '765432'), [cliente.pk])
+        self.assertEqual(buscar('cliente', 'perez'), [cliente.pk])
+        self.assertEqual(buscar('instalacion', 'nunoa'), [])
+
+
+class RutNormalizadoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cargo = Cargo.objects.create(nombre='Guardia')
+
+    def crear(self, rut):
+        return Personal.objects.create(nombres='Ana', apellidos='Rojas', rut=rut, telefono='+56911111111',
+                                       cargo=self.cargo)
+
+    def test_formatos_equivalentes(self):
+        self.assertEqual(digito_verificador(10000013), 'K')
+        for valor in ('12.345.678-5', '12345678-5', '123456785', ' 12345678 - 5 '):
+            self.assertEqual(normalizar_rut(valor), '12345678-5')
+        self.assertEqual(partes_rut('10.000.013-k'), (10000013, 'K'))
+        self.assertEqual(partes_rut('sin rut'), (None, ''))
+        self.assertFalse(rut_valido('12.345.678-4'))
+
+    def test_guardado_y_duplicado_en_otro_formato(self):
+        persona = self.crear('12.345.678-5')
+        self.assertEqual((persona.rut_numero, persona.rut_dv), (12345678, '5'))
+        otra = Personal(nombres='Eva', apellidos='Soto', rut='123456785', telefono='+56911111111', cargo=self.cargo)
+        with self.assertRaisesMessage(ValidationError, 'Ya existe'):
+            otra.clean()
+
+    def test_comando_completa_los_existentes(self):
+        ana, eva = self.crear(_rut(20000001)), self.crear(_rut(20000002))
+        # Registros anteriores a la migración: sin número normalizado y con un RUT repetido
+        Personal.objects.update(rut_numero=None, rut_dv='')
+        Personal.objects.filter(pk=eva.pk).update(rut=f'20.000.001-{digito_verificador(20000001)}')
+        salida = io.StringIO()
+        call_command('normalizar_ruts', batch_size=1, stdout=salida)
+        ana.refresh_from_db()
+        eva.refresh_from_db()
+        self.assertEqual(ana.rut_numero, 20000001)
+        self.assertIsNone(eva.rut_numero)
+        self.assertIn(f'{eva.pk}: el RUT', salida.getvalue())
+
+
+class IndicePrefijosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cargo = Cargo.objects.create(nombre='Guardia')
+        cls.personal = Personal.objects.create(nombres='José', apellidos='Muñoz Soto', rut='12.345.678-5',
+                                               telefono='+56911111111', cargo=cls.cargo)
+
+    def setUp(self):
+        indice_prefijos.invalidar()
+        self.addCleanup(indice_prefijos.invalidar)
+
+    def ids(self, texto):
+        return [r['id'] for r in indice_prefijos.buscar(texto, tipos=['personal'])]
+
+    def test_busqueda_por_palabra_y_rut(self):
+        for texto in ('jose', 'MUNOZ', 'soto j', '12345678', '12.345.678-5'):
+            self.assertEqual(self.ids(texto), [self.personal.pk], texto)
+        self.assertEqual(self.ids('muñoz x'), [])
+
+    def test_cambios_al_confirmar_la_transaccion(self):
+        self.ids('jose')
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = Personal.objects.create(nombres='Josefa', apellidos='Reyes', rut=_rut(20000001),
+                                           telefono='+56911111111', cargo=self.cargo)
+            self.assertEqual(self.ids('josef'), [])
+        self.assertEqual(self.ids('josef'), [otro.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.delete()
+        self.assertEqual(self.ids('josef'), [])
+
+    def test_transaccion_revertida_no_cambia_el_indice(self):
+        self.ids('jose')
+        with self.captureOnCommitCallbacks() as pendientes:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.personal.apellidos = 'Pérez'
+                self.personal.save()
+                raise RuntimeError
+        self.assertEqual(pendientes, [])
+        self.assertEqual(self.ids('munoz'), [self.personal.pk])
+
+    def test_invalidado_antes_de_confirmar(self):
+        self.ids('jose')
+        with self.captureOnCommitCallbacks() as pendientes:
+            self.personal.save()
+        indice_prefijos.invalidar()
+        for callback in pendientes:
+            callback()
+        self.assertIsNone(indice_prefijos._indice)
+
+    def test_indice_publicado_no_cambia(self):
+        viejo = indice_prefijos.obtener_indice()
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = Personal.objects.create(nombres='Josefa', apellidos='Reyes', rut=_rut(20000001),
+                                           telefono='+56911111111', cargo=self.cargo)
+        # Quien ya leía el índice sigue viendo una versión completa y sin cambios
+        self.assertEqual(viejo.buscar('josef'), [])
+        self.assertIsNot(indice_prefijos.obtener_indice(), viejo)
+        self.assertEqual(self.ids('josef'), [otro.pk])
+
+    def test_indice_vencido_se_reconstruye_en_segundo_plano(self):
+        viejo = indice_prefijos.obtener_indice()
+        viejo.creado -= indice_prefijos.VIGENCIA + 1
+        # Cambio hecho por otro proceso, sin señales
+        Personal.objects.filter(pk=self.personal.pk).update(nombres='Josefina')
+        with mock.patch.object(indice_prefijos, 'Thread') as hilo, CaptureQueriesContext(connection) as consultas:
+            self.assertIs(indice_prefijos.obtener_indice(), viejo)
+            self.assertIs(indice_prefijos.obtener_indice(), viejo)
+        self.assertEqual(len(consultas), 0)
+        hilo.assert_called_once()
+        # Lo que haría el hilo
+        indice_prefijos._reconstruir()
+        self.assertEqual(self.ids('josefina'), [self.personal.pk])
+        self.assertIsNone(indice_prefijos._pendientes)
+
+    def test_cambios_durante_la_reconstruccion(self):
+        inicial = indice_prefijos.obtener_indice().copia()
+        indice_prefijos._pendientes = []
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = Personal.objects.create(nombres='Josefa', apellidos='Reyes', rut=_rut(20000001),
+                                           telefono='+56911111111', cargo=self.cargo)
+        # La construcción leyó los datos antes de confirmarse el cambio
+        with mock.patch.object(indice_prefijos.IndicePrefijos, 'construir', return_value=inicial):
+            indice_prefijos._reconstruir()
+        self.assertIs(indice_prefijos._indice, inicial)
+        self.assertEqual(self.ids('josef'), [otro.pk])
+
+    def test_reconstruccion_descartada_al_invalidar(self):
+        indice_prefijos.obtener_indice()
+        indice_prefijos._pendientes = []
+
+        def construir():
+            # Una importación invalida el índice mientras se construye
+            indice_prefijos.invalidar()
+            return indice_prefijos.IndicePrefijos()
+
+        with mock.patch.object(indice_prefijos.IndicePrefijos, 'construir', side_effect=construir):
+            indice_prefijos._reconstruir()
+        self.assertIsNone(indice_prefijos._indice)
+
+
+class GeneracionTurnosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cls.instalacion = Instalacion.objects.create(cliente=cliente, nombre='Planta', direccion='Av. 1')
+        cls.configuracion = ConfiguracionTurno.objects.create(
+            requerimientos=RequerimientosCliente.objects.create(instalacion=cls.instalacion),
+            personal_requerido_por_turno=2,
+        )
+        cls.configuracion.refresh_from_db()
+        cargo = Cargo.objects.create(nombre='Guardia')
+        cls.personal = [
+            Personal.objects.create(
+                nombres='Guardia', apellidos=f'{i:02d}', rut=_rut(20000000 + i), telefono='+56911111111',
+                cargo=cargo, cliente=cliente, instalacion_asignada=cls.instalacion,
+            )
+            for i in range(9)
+        ]
+        cls.desde = datetime(2026, 3, 2).date()
+
+    def test_dotacion_por_tramo_segun_la_configuracion(self):
+        # 4x4: dos tramos × dos fases, con 2 guardias por turno
+        self.assertEqual(dotacion_requerida(self.configuracion), 8)
+        creados = generar_turnos(self.configuracion, self.desde, self.desde + timedelta(days=15))
+        self.assertEqual(creados, 8 * 8)
+        por_tramo = Turno.objects.values_list('fecha', 'tipo_turno').annotate(total=Count('id')).order_by()
+        self.assertEqual({total for _, _, total in por_tramo}, {2})
+        self.assertEqual(len(por_tramo), 16 * 2)
+        # El guardia sobrante queda sin turnos
+        self.assertFalse(Turno.objects.filter(personal=self.personal[-1]).exists())
+
+    def test_personal_insuficiente(self):
+        with self.assertRaisesMessage(ValueError, 'requiere 8 guardias'):
+            generar_turnos(self.configuracion, self.desde, self.desde, personal=self.personal[:7])
+        self.assertFalse(Turno.objects.exists())
+
+    def test_sin_dias_de_trabajo(self):
+        self.configuracion.dias_trabajo = 0
+        with self.assertRaisesMessage(ValueError, 'al menos un día de trabajo'):
+            generar_turnos(self.configuracion, self.desde, self.desde)
+
+
+class SimulacionRotacionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instalacion = Instalacion.objects.create(
+            cliente=Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000)),
+            nombre='Planta', direccion='Av. 1',
+        )
+        cls.configuracion = ConfiguracionTurno.objects.create(
+            requerimientos=RequerimientosCliente.objects.create(instalacion=instalacion),
+            personal_requerido_por_turno=2,
+        )
+
+    def test_matriz_igual_al_generador(self):
+        for trabajo, descanso in [(4, 4), (5, 2), (6, 1), (4, 3), (7, 7)]:
+            configuracion = ConfiguracionTurno(dias_trabajo=trabajo, dias_descanso=descanso)
+            fases = fases_rotacion(configuracion)
+            matriz = matriz_trabajo(fases, trabajo, descanso, 60)
+            for fila, fase in zip(matriz, fases):
+                with self.subTest(rotacion=f'{trabajo}x{descanso}', fase=fase):
+                    self.assertEqual(
+                        fila.nonzero()[0].tolist(),
+                        list(dias_de_trabajo(fase, trabajo, trabajo + descanso, 60)),
+                    )
+            # Las fases cubren todos los días
+            self.assertTrue(matriz.any(axis=0).all())
+
+    def simular(self, personal):
+        url = reverse('erp:api_simulacion_dotacion')
+        with presupuesto_consultas(self, 1):
+            return self.client.get(url, {'configuracion': self.configuracion.pk, 'personal': personal, 'dias': 16})
+
+    def test_dias_bajo_lo_requerido(self):
+        data = self.simular(8).json()
+        self.assertEqual(data['dotacion_requerida'], 8)
+        self.assertEqual([t['dias_bajo_requerido'] for t in data['tramos']], [0, 0])
+        self.assertEqual(data['tramos'][0]['dotacion'], [2] * 16)
+        # Con 6 guardias, las cuadrillas de la tarde quedan con uno solo
+        data = self.simular(6).json()
+        self.assertEqual([t['dias_bajo_requerido'] for t in data['tramos']], [0, 16])
+
+    def test_configuracion_invalida(self):
+        ConfiguracionTurno.objects.filter(pk=self.configuracion.pk).update(dias_trabajo=0)
+        self.assertEqual(self.simular(8).status_code, 400)
+        self.assertEqual(self.simular(0).status_code, 400)
+
+
+class ConflictosTurnosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        instalacion = Instalacion.objects.create(cliente=cliente, nombre='Planta', direccion='Av. 1')
+        cls.personal = Personal.objects.create(
+            nombres='Ana', apellidos='Soto', rut=_rut(20000000), telefono='+56911111111',
+            cargo=Cargo.objects.create(nombre='Guardia'), cliente=cliente,
+        )
+        cls.inicio = timezone.make_aware(datetime(2026, 3, 2, 8))
+        # Dos turnos guardados que ya se superponen entre sí
+        cls.turnos = [
+            Turno.objects.create(
+                personal=cls.personal, instalacion=instalacion, fecha=cls.inicio.date(),
+                fecha_inicio=cls.inicio + timedelta(hours=h), fecha_fin=cls.inicio + timedelta(hours=h + 8),
+                tipo_turno='M',
+            )
+            for h in (0, 4)
+        ]
+        cls.fecha = cls.inicio.date()
+
+    def candidato(self, horas):
+        inicio = self.inicio + timedelta(hours=horas)
+        return (self.personal.pk, inicio, inicio + timedelta(hours=8), None)
+
+    def test_barrido_reporta_los_pares_guardados(self):
+        conflictos = detectar_superposiciones(self.fecha, self.fecha, personal_ids=[self.personal.pk])
+        self.assertEqual([(c['turno_a'], c['turno_b']) for c in conflictos], [(self.turnos[0].pk, self.turnos[1].pk)])
+
+    def test_solo_fallan_los_candidatos(self):
+        # La superposición antigua no bloquea un candidato que no choca
+        validar_candidatos(self.fecha, self.fecha + timedelta(days=1), [self.candidato(24)])
+        with self.assertRaises(ConflictoTurnosError) as contexto:
+            validar_candidatos(self.fecha, self.fecha, [self.candidato(10)])
+        self.assertEqual(
+            {(c['turno_a'], c['turno_b']) for c in contexto.exception.conflictos},
+            {(self.turnos[1].pk, None)},
+        )
+
+    def test_api_fecha_inexistente(self):
+        url = reverse('erp:api_conflictos_turnos')
+        self.assertEqual(self.client.get(url, {'desde': '2026-02-30', 'hasta': '2026-03-02'}).status_code, 400)
+        data = self.client.get(url, {'desde': '2026-03-02', 'hasta': '2026-03-02'}).json()
+        self.assertEqual(data['total'], 1)
+
+
+class PresupuestoConsultasTests(DatosPruebaMixin, TestCase):
+    def assertMaxConsultas(self, url, maximo):
+        """GET a la URL sin superar maximo consultas; devuelve la respuesta"""
+        with presupuesto_consultas(self, maximo):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_presupuesto_por_vista(self):
+        with plantillas_minimas():
+            for nombre, (objeto, maximo) in PRESUPUESTOS.items():
+                args = [getattr(self, objeto).pk] if objeto else []
+                with self.subTest(url=nombre):
+                    self.assertMaxConsultas(reverse(f'erp:{nombre}', args=args), maximo)
+
+    def test_todas_las_vistas_de_listado_y_detalle_tienen_presupuesto(self):
+        sin_presupuesto = [
+            patron.name for patron in urlpatterns
+            if patron.name.endswith(('_list', '_detail')) and patron.name not in PRESUPUESTOS
+        ]
+        self.assertEqual(sin_presupuesto, [])
+
+    @max_consultas(2)
+    def test_clientes_con_conteos_y_gestor_principal(self):
+        clientes = Cliente.objects.with_counts().with_gestor_principal()
+        for cliente in clientes:
+            self.assertEqual(cliente.num_instalaciones, 1)
+            self.assertEqual(cliente.num_personal_activo, 1)
+            self.assertTrue(cliente.gestor_principal.nombre.startswith('Gestor'))
+
+
+@override_settings(ERP_MEDIR_CONSULTAS=True, ERP_CONSULTAS_ADVERTENCIA=None)
+class MedicionConsultasMiddlewareTests(TestCase):
+    @staticmethod
+    def medir(consultas):
+        """Respuesta del middleware para una vista que ejecuta la cantidad de consultas indicada"""
+        def vista(request):
+            with connection.cursor() as cursor:
+                for i in range(consultas):
+                    # Comillas dobles y saltos de línea que no pueden ir en Server-Timing
+                    cursor.execute(f'SELECT\n  \'"consulta {i}"\'')
+            return HttpResponse()
+        return MedicionConsultasMiddleware(vista)(RequestFactory().get('/reportes/'))
+
+    def test_cabeceras(self):
+        response = self.medir(5)
+        self.assertEqual(response['X-DB-Queries'], '5')
+        metricas = response['Server-Timing'].split(', ')
+        self.assertTrue(metricas[0].startswith('total;dur='))
+        self.assertIn('desc="5 consultas"', metricas[1])
+        # Las ERP_CONSULTAS_LENTAS más lentas, con el SQL en una línea y sin comillas dobles
+        lentas = [m for m in metricas if m.startswith('sql-')]
+        self.assertEqual(len(lentas), 3)
+        self.assertRegex(lentas[0], r'^sql-1;dur=[\d.]+;desc="SELECT \'\'consulta \d\'\'"$')
+        self.assertNotIn('\n', response['Server-Timing'])
+
+    def test_request_completo(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('erp:gestion_clientes'))
+        self.assertEqual(response['X-DB-Queries'], str(len(consultas)))
+
+    @override_settings(ERP_MEDIR_CONSULTAS=False)
+    def test_desactivado(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MedicionConsultasMiddleware(lambda request: HttpResponse())
+        response = self.client.get(reverse('erp:gestion_clientes'))
+        self.assertFalse(response.has_header('X-DB-Queries'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(ERP_CONSULTAS_ADVERTENCIA=4)
+    def test_advertencia_sobre_el_umbral(self):
+        with self.assertNoLogs('erp.middleware', level='WARNING'):
+            self.medir(4)
+        with self.assertLogs('erp.middleware', level='WARNING') as logs:
+            self.medir(5)
+        self.assertIn('GET /reportes/ ejecutó 5 consultas', logs.output[0])
+
+    def test_sin_consultas(self):
+        response = self.medir(0)
+        self.assertEqual(response['X-DB-Queries'], '0')
+        self.assertFalse([m for m in response['Server-Timing'].split(', ') if m.startswith('sql-')])
+
+
+class AutocompletarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clientes = [Cliente.objects.create(razon_social=f'Cliente {i}', rut=_rut(10000000 + i)) for i in range(2)]
+        cls.instalacion = Instalacion.objects.create(cliente=cls.clientes[0], nombre='Bodega', direccion='Av. 1')
+        cargo = Cargo.objects.create(nombre='Guardia')
+        cls.personal = [
+            Personal.objects.create(nombres=f'Guardia {i}', apellidos='Soto', rut=_rut(20000000 + i),
+                                    telefono='+56911111111', cargo=cargo, cliente=cls.clientes[i % 2])
+            for i in range(4)
+        ]
+
+    @max_consultas(1)
+    def test_pagina_filtrada_por_cliente(self):
+        url = reverse('erp:api_autocompletar', args=['personal'])
+        data = self.client.get(url, {'q': 'soto', 'cliente': self.clientes[1].pk}).json()
+        self.assertEqual([r['id'] for r in data['resultados']], [self.personal[1].pk, self.personal[3].pk])
+        self.assertFalse(data['hay_mas'])
+
+    def test_rut_en_cualquier_formato(self):
+        url = reverse('erp:api_autocompletar', args=['personal'])
+        rut = f'20.000.002-{digito_verificador(20000002)}'
+        data = self.client.get(url, {'q': rut}).json()
+        self.assertEqual([r['id'] for r in data['resultados']], [self.personal[2].pk])
+
+    def test_personal_del_cliente_de_la_instalacion(self):
+        # Ningún guardia está asignado a la instalación: se ofrecen todos los de su cliente
+        url = reverse('erp:api_autocompletar', args=['personal'])
+        data = self.client.get(url, {'instalacion': self.instalacion.pk}).json()
+        self.assertEqual([r['id'] for r in data['resultados']], [self.personal[0].pk, self.personal[2].pk])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(reverse('erp:api_autocompletar', args=['vehiculo'])).status_code, 404)
+        url = reverse('erp:api_autocompletar', args=['personal'])
+        self.assertEqual(self.client.get(url, {'pagina': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cliente': 'x'}).status_code, 400)
+
+    def test_formulario_muestra_solo_la_opcion_elegida(self):
+        form = TurnoForm(initial={'personal': self.personal[2].pk, 'instalacion': self.instalacion.pk})
+        # Una consulta por campo con autocompletado, sin importar cuántas opciones haya
+        with self.assertNumQueries(2):
+            html = str(form['personal'])
+            str(form['instalacion'])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'value="{self.personal[2].pk}" selected', html)
+        self.assertIn('data-depende-de="instalacion:id_instalacion"', html)
+
+    def test_valores_enviados_invalidos(self):
+        form = IncidenciaForm(data={'instalacion': 'abc', 'personal_involucrado': ['x', self.personal[0].pk]})
+        self.assertFalse(form.is_valid())
+        html = str(form['personal_involucrado'])
+        self.assertEqual(html.count('<option'), 1)
+        self.assertEqual(str(form['instalacion']).count('<option'), 1)
+
+    def test_formularios_de_turno_e_incidencia(self):
+        for nombre in ('turno_create', 'incidencia_create'):
+            with self.subTest(url=nombre):
+                self.assertContains(self.client.get(reverse(f'erp:{nombre}')), 'data-autocompletar')
+
+
+class CoberturaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clientes = [Cliente.objects.create(razon_social=f'Cliente {i}', rut=_rut(10000000 + i)) for i in range(2)]
+        cargo = Cargo.objects.create(nombre='Guardia')
+        tipo = TipoVehiculo.objects.create(nombre='Camioneta')
+        cls.instalaciones = {}
+        for nombre, cliente, guardias, vehiculos, requerimientos in (
+            ('Puerto', 0, 1, 1, {'personal_requerido': 3, 'requiere_vehiculos': True, 'cantidad_vehiculos': 2}),
+            ('Bodega', 0, 0, 0, None),
+            ('Oficina', 1, 2, 0, {'personal_requerido': 1}),
+            ('Faena', 1, 0, 0, {'requiere_personal': False, 'requiere_vehiculos': True, 'cantidad_vehiculos': 1}),
+        ):
+            instalacion = Instalacion.objects.create(cliente=cls.clientes[cliente], nombre=nombre, direccion='Av. 1')
+            cls.instalaciones[nombre] = instalacion
+            if requerimientos:
+                RequerimientosCliente.objects.create(instalacion=instalacion, **requerimientos)
+            for _ in range(guardias):
+                n = Personal.objects.count()
+                Personal.objects.create(nombres='Guardia', apellidos=f'{n}', rut=_rut(20000000 + n),
+                                        telefono='+56911111111', cargo=cargo, instalacion_asignada=instalacion)
+            for _ in range(vehiculos):
+                Vehiculo.objects.create(tipo=tipo, patente=f'ABCD{Vehiculo.objects.count():02d}', marca='Toyota',
+                                        modelo='Hilux', ano=2022, instalacion_asignada=instalacion)
+        # Una instalación inactiva solo aparece con inactivas=1
+        Instalacion.objects.create(cliente=cls.clientes[0], nombre='Antigua', direccion='Av. 2', activa=False)
+
+    def nombres(self, **parametros):
+        data = self.client.get(reverse('erp:api_cobertura'), parametros).json()
+        return [fila['nombre'] for fila in data['instalaciones']]
+
+    @max_consultas(2)
+    def test_deficit_de_todas_las_instalaciones(self):
+        data = self.client.get(reverse('erp:api_cobertura'), {'solo_deficit': '1'}).json()
+        self.assertEqual(data['resumen'], {
+            'instalaciones': 3, 'con_deficit': 3, 'deficit_personal': 3, 'deficit_vehiculos': 2,
+        })
+        puerto, bodega, faena = data['instalaciones']
+        self.assertEqual((puerto['nombre'], puerto['deficit_personal'], puerto['deficit_vehiculos']), ('Puerto', 2, 1))
+        self.assertEqual(puerto['cobertura_vehiculos'], 50)
+        self.assertEqual((bodega['nombre'], bodega['personal_requerido']), ('Bodega', 1))
+        self.assertEqual((faena['nombre'], faena['personal_requerido'], faena['cobertura_personal']), ('Faena', 0, None))
+
+    def test_orden_y_filtros(self):
+        self.assertEqual(self.nombres(orden='nombre'), ['Bodega', 'Faena', 'Oficina', 'Puerto'])
+        self.assertEqual(self.nombres(orden='deficit_vehiculos')[:2], ['Puerto', 'Faena'])
+        self.assertEqual(self.nombres(orden='nombre', cliente=self.clientes[1].pk), ['Faena', 'Oficina'])
+        self.assertIn('Antigua', self.nombres(inactivas='1'))
+        self.assertEqual(self.nombres(orden='nombre', limite='1'), ['Bodega'])
+
+    def test_parametros_invalidos(self):
+        for parametros in ({'orden': 'x'}, {'limite': 'x'}, {'cliente': 'x'}):
+            self.assertEqual(self.client.get(reverse('erp:api_cobertura'), parametros).status_code, 400)
+        # La vista HTML avisa y vuelve al orden por defecto
+        response = self.client.get(reverse('erp:cobertura'), {'orden': 'x'})
+        self.assertEqual([i.nombre for i in response.context['instalaciones']][0], 'Puerto')
+
+
+class CumplimientoRequerimientosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cargo = Cargo.objects.create(nombre='Guardia')
+        tipo = TipoVehiculo.objects.create(nombre='Camioneta')
+
+        def instalacion(nombre, activa=True, **requerimientos):
+            instalacion = Instalacion.objects.create(cliente=cliente, nombre=nombre, direccion='Av. 1', activa=activa)
+            if requerimientos:
+                RequerimientosCliente.objects.create(instalacion=instalacion, **requerimientos)
+            return instalacion
+
+        def guardia(i, instalacion, activo=True):
+            Personal.objects.create(nombres='Guardia', apellidos=f'{i}', rut=_rut(20000000 + i), activo=activo,
+                                    telefono='+56911111111', cargo=cargo, instalacion_asignada=instalacion)
+
+        # Requiere 2 guardias y 1 vehículo: un guardia inactivo y un vehículo fuera de servicio no cuentan
+        cls.faltante = instalacion('Puerto', personal_requerido=2, requiere_vehiculos=True, cantidad_vehiculos=1)
+        guardia(1, cls.faltante)
+        guardia(2, cls.faltante, activo=False)
+        Vehiculo.objects.create(tipo=tipo, patente='ABCD10', marca='Toyota', modelo='Hilux', ano=2022,
+                                en_servicio=False, instalacion_asignada=cls.faltante)
+        cls.completa = instalacion('Bodega', personal_requerido=1)
+        guardia(3, cls.completa)
+        # Sin requerimientos: se evalúa con los valores por defecto (un guardia)
+        cls.sin_requerimientos = instalacion('Oficina')
+        instalacion('Cerrada', activa=False, personal_requerido=4)
+
+    def test_cumplimiento_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            anotados = {r.instalacion_id: r for r in RequerimientosCliente.objects.with_compliance()}
+        faltante, completa = anotados[self.faltante.pk], anotados[self.completa.pk]
+        self.assertEqual((faltante.personal_asignado, faltante.vehiculos_asignados, faltante.cumple), (1, 0, False))
+        self.assertTrue(completa.cumple)
+        # La propiedad sin anotaciones aplica el mismo criterio
+        for requerimientos in RequerimientosCliente.objects.all():
+            self.assertEqual(requerimientos.cumple_requerimientos, anotados[requerimientos.instalacion_id].cumple)
+
+    def test_dashboard_y_cobertura_coinciden(self):
+        cantidad, instalaciones = get_requerimientos_incumplidos()
+        cobertura = self.client.get(reverse('erp:api_cobertura'), {'solo_deficit': '1'}).json()
+        self.assertEqual(cantidad, cobertura['resumen']['con_deficit'])
+        self.assertEqual({i.pk for i in instalaciones}, {i['id'] for i in cobertura['instalaciones']})
+        self.assertEqual({i.pk for i in instalaciones}, {self.faltante.pk, self.sin_requerimientos.pk})
+        self.assertContains(self.client.get(reverse('erp:dashboard')), 'Puerto')
+
+
+class PronosticoBrechasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cargo = Cargo.objects.create(nombre='Guardia')
+        cls.norte, cls.sur, cerrada = [
+            Instalacion.objects.create(cliente=cliente, nombre=nombre, direccion='Av. 1', activa=activa)
+            for nombre, activa in [('Norte', True), ('Sur', True), ('Cerrada', False)]
+        ]
+        for instalacion, requerido, festivos in [(cls.norte, 2, True), (cls.sur, 1, False), (cerrada, 1, True)]:
+            ConfiguracionTurno.objects.create(
+                requerimientos=RequerimientosCliente.objects.create(instalacion=instalacion),
+                personal_requerido_por_turno=requerido, incluir_festivos=festivos,
+            )
+        cls.guardias = [
+            Personal.objects.create(
+                nombres=f'Guardia {i}', apellidos='Pérez', rut=_rut(20000000 + i), telefono='+56911111111',
+                cargo=cargo, cliente=cliente,
+            )
+            for i in range(4)
+        ]
+        cls.desde = datetime(2026, 3, 2).date()
+        # Norte el primer día: un turno completo y uno de mañana cubren la mañana; la tarde
+        # solo tiene el completo porque el turno de tarde está cancelado
+        for guardia, tipo, estado in [(0, 'C', 'P'), (1, 'M', 'P'), (2, 'T', 'X')]:
+            cls.turno(cls.guardias[guardia], cls.norte, cls.desde, tipo, estado)
+        # Sur el segundo día es feriado y no incluye festivos
+        Feriado.objects.create(fecha=cls.desde + timedelta(days=1), nombre='Feriado')
+
+    @staticmethod
+    def turno(personal, instalacion, fecha, tipo, estado='P'):
+        inicio = timezone.make_aware(datetime.combine(fecha, datetime.min.time())) + timedelta(hours=8)
+        return Turno.objects.create(
+            personal=personal, instalacion=instalacion, fecha=fecha, fecha_inicio=inicio,
+            fecha_fin=inicio + timedelta(hours=12), tipo_turno=tipo, estado=estado,
+        )
+
+    def setUp(self):
+        invalidar_feriados()
+        pronostico.invalidar()
+
+    def faltantes(self, resultado, instalacion):
+        return {f['tramo']: f['faltantes'] for f in resultado.mapa_calor(instalacion.pk)}
+
+    def test_turno_completo_cubre_ambos_tramos_y_cancelados_no_cuentan(self):
+        with presupuesto_consultas(self, 3):
+            resultado = pronostico.calcular_pronostico(self.desde, 2)
+        self.assertEqual(self.faltantes(resultado, self.norte), {'M': [0, 2], 'T': [1, 2]})
+        self.assertEqual(resultado.brechas(self.norte.pk)[0], {
+            'instalacion_id': self.norte.pk, 'instalacion': 'Norte', 'fecha': self.desde,
+            'tramo': 'T', 'requerido': 2, 'planificado': 1, 'faltantes': 1,
+        })
+
+    def test_feriados_sin_dotacion_e_instalaciones_inactivas_omitidas(self):
+        resultado = pronostico.calcular_pronostico(self.desde, 2)
+        self.assertEqual([nombre for _, nombre in resultado.instalaciones], ['Norte', 'Sur'])
+        self.assertEqual(self.faltantes(resultado, self.sur), {'M': [1, 0], 'T': [1, 0]})
+        solo_sur = pronostico.calcular_pronostico(self.desde, 2, instalacion_id=self.sur.pk)
+        self.assertEqual(solo_sur.brechas(), resultado.brechas(self.sur.pk))
+
+    def test_sobredotacion_no_compensa_otros_tramos(self):
+        for guardia in self.guardias[2:]:
+            self.turno(guardia, self.norte, self.desde, 'M')
+        resultado = pronostico.calcular_pronostico(self.desde, 1)
+        self.assertEqual(self.faltantes(resultado, self.norte), {'M': [0], 'T': [1]})
+
+    def test_cache_invalidado_al_escribir_turnos(self):
+        hoy = timezone.localdate()
+        pronostico.obtener_pronostico(1)
+        with presupuesto_consultas(self, 0):
+            pronostico.obtener_pronostico(1)
+        self.turno(self.guardias[3], self.sur, hoy, 'T')
+        filas = self.client.get(
+            reverse('erp:api_brechas_turnos'), {'instalacion': self.sur.pk, 'dias': 1}
+        ).json()['filas']
+        esperado_manana = [0] if es_feriado(hoy) else [1]
+        self.assertEqual([(f['tramo'], f['faltantes']) for f in filas], [('M', esperado_manana), ('T', [0])])
+
+    def test_parametros_invalidos(self):
+        url = reverse('erp:api_brechas_turnos')
+        self.assertEqual(self.client.get(url, {'dias': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'dias': pronostico.HORIZONTE_MAXIMO + 1}).status_code, 400)
+
+
+@override_settings(ERP_MAX_HORAS_SEMANALES=42, ERP_DESCANSO_MINIMO_HORAS=12, ERP_MAX_DIAS_CONSECUTIVOS=6)
+class AsignacionTurnosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        otro_cliente = Cliente.objects.create(razon_social='Otro', rut=_rut(10000001))
+        cls.instalacion = Instalacion.objects.create(cliente=cliente, nombre='Planta', direccion='Av. 1')
+        cls.configuracion = ConfiguracionTurno.objects.create(
+            requerimientos=RequerimientosCliente.objects.create(instalacion=cls.instalacion),
+            personal_requerido_por_turno=2,
+        )
+        # Las horas por defecto son cadenas hasta leerlas de la base
+        cls.configuracion.refresh_from_db()
+        cargo = Cargo.objects.create(nombre='Guardia')
+        cls.guardias = [
+            Personal.objects.create(
+                nombres=f'Guardia {i}', apellidos='Pérez', rut=_rut(20000000 + i), telefono='+56911111111',
+                cargo=cargo, cliente=otro_cliente if i == 0 else cliente, activo=i != 1,
+            )
+            for i in range(12)
+        ]
+        cls.desde = datetime(2026, 3, 2).date()
+        cls.hasta = cls.desde + timedelta(days=6)
+        # Un guardia ya trabaja la primera noche en otra instalación
+        inicio = timezone.make_aware(datetime(2026, 3, 2, 20))
+        Turno.objects.create(
+            personal=cls.guardias[2], instalacion=Instalacion.objects.create(
+                cliente=cliente, nombre='Bodega', direccion='Av. 2'),
+            fecha=inicio.date(), fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=12), tipo_turno='T',
+        )
+
+    def test_propuesta_sin_guardar(self):
+        resultado = asignar_turnos(self.configuracion, self.desde, self.hasta)
+        self.assertEqual(resultado.requeridos, 7 * 2 * 2)
+        self.assertEqual(len(resultado.asignaciones) + sum(f['faltantes'] for f in resultado.sin_cubrir),
+                         resultado.requeridos)
+        # Solo personal activo del cliente de la instalación
+        elegibles = {g.pk for g in self.guardias[2:]}
+        self.assertLessEqual(set(resultado.horas_por_personal), elegibles)
+        self.assertNotIn(self.guardias[2].pk, resultado.huecos[1].asignados)
+        self.assertEqual(resultado.creados, 0)
+        self.assertEqual(Turno.objects.filter(instalacion=self.instalacion).count(), 0)
+
+    def test_guardar_respeta_jornada_y_reparte_horas(self):
+        with presupuesto_consultas(self, 12):
+            resultado = asignar_turnos(self.configuracion, self.desde, self.hasta, guardar=True)
+        self.assertFalse(resultado.sin_cubrir)
+        self.assertEqual(resultado.creados, Turno.objects.filter(instalacion=self.instalacion).count())
+        self.assertEqual(verificar_jornada(self.desde, self.hasta, personal_ids=[g.pk for g in self.guardias]), [])
+        horas = resultado.horas_por_personal.values()
+        self.assertLessEqual(max(horas) - min(horas), 12)
+        self.assertFalse(pronostico.calcular_pronostico(self.desde, 7, self.instalacion.pk).brecha.any())
+
+    def test_rotacion_4x4_cubierta_con_su_dotacion(self):
+        # Un cupo por tramo durante un ciclo: 16 turnos de 12 horas para 4 guardias, 48 horas cada uno,
+        # sobre las 42 semanales pero dentro del promedio del ciclo 4x4
+        instalacion = Instalacion.objects.create(cliente=self.instalacion.cliente, nombre='Faena', direccion='Ruta 5')
+        configuracion = ConfiguracionTurno.objects.create(
+            requerimientos=RequerimientosCliente.objects.create(instalacion=instalacion),
+        )
+        configuracion.refresh_from_db()
+        guardias = self.guardias[3:7]
+        Personal.objects.exclude(pk__in=[g.pk for g in guardias]).update(activo=False)
+        hasta = self.desde + timedelta(days=7)
+        resultado = asignar_turnos(configuracion, self.desde, hasta, guardar=True)
+        self.assertEqual(resultado.sin_cubrir, [])
+        self.assertEqual(resultado.horas_por_personal, {g.pk: 48.0 for g in guardias})
+        self.assertEqual(verificar_jornada(self.desde, hasta, instalacion=instalacion), [])
+
+    def test_comando_muestra_la_propuesta(self):
+        salida = io.StringIO()
+        call_command('asignar_turnos', self.instalacion.pk, '--desde=2026-03-02', '--hasta=2026-03-08', stdout=salida)
+        self.assertIn('28 de 28 cupos asignados', salida.getvalue())
+        self.assertFalse(Turno.objects.filter(instalacion=self.instalacion).exists())
+        with self.assertRaisesMessage(CommandError, 'no tiene configuración de turnos'):
+            call_command('asignar_turnos', Instalacion.objects.get(nombre='Bodega').pk,
+                         '--desde=2026-03-02', '--hasta=2026-03-08')
+
+
+@override_settings(ERP_MAX_HORAS_SEMANALES=42, ERP_DESCANSO_MINIMO_HORAS=12, ERP_MAX_DIAS_CONSECUTIVOS=6)
+class CumplimientoJornadaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(razon_social='Cliente', rut=_rut(10000000))
+        cls.instalacion = Instalacion.objects.create(cliente=cls.cliente, nombre='Planta', direccion='Av. 1')
+        cls.personal = Personal.objects.create(
+            nombres='Juan', apellidos='Pérez', rut=_rut(20000000), telefono='+56911111111',
+            cargo=Cargo.objects.create(nombre='Guardia'), cliente=cls.cliente,
+        )
+        cls.inicio = timezone.make_aware(datetime(2026, 3, 2, 8))
+        # 8 días seguidos de 12 horas; el quinto día empieza 4 horas después del término del cuarto
+        for dia in range(8):
+            inicio = cls.inicio + timedelta(days=dia)
+            if dia == 4:
+                inicio -= timedelta(hours=8)
+            Turno.objects.create(
+                personal=cls.personal, instalacion=cls.instalacion, fecha=inicio.date(),
+                fecha_inicio=inicio, fecha_fin=inicio + timedelta(hours=12), tipo_turno='M',
+            )
+
+    def infracciones(self, **params):
+        url = reverse('erp:api_cumplimiento_jornada')
+        params = {'desde': '2026-03-01', 'hasta': '2026-03-31', **params}
+        with presupuesto_consultas(self, 2):
+            return self.client.get(url, params).json()['infracciones']
+
+    def test_una_pasada_con_todas_las_reglas(self):
+        infracciones = {i['regla']: i for i in self.infracciones()}
+        self.assertEqual(set(infracciones), {'horas_semanales', 'descanso', 'dias_consecutivos'})
+        # 48 horas al cuarto turno; la ventana sigue excedida hasta el último (84 horas en 7 días)
+        self.assertEqual(infracciones['horas_semanales']['fecha'], '2026-03-05')
+        self.assertEqual(infracciones['horas_semanales']['valor'], 84)
+        self.assertEqual(infracciones['descanso']['valor'], 4)
+        self.assertEqual((infracciones['dias_consecutivos']['fecha'], infracciones['dias_consecutivos']['valor']),
+                         ('2026-03-08', 8))
+
+    def test_turnos_previos_al_rango_solo_son_contexto(self):
+        reglas = {i['regla']: i for i in self.infracciones(desde='2026-03-08')}
+        self.assertEqual(set(reglas), {'horas_semanales', 'dias_consecutivos'})
+        self.assertEqual(reglas['dias_consecutivos']['desde'], '2026-03-02')
+
+    def rotacion(self, tipo, dias_trabajo, dias_descanso, dias):
+        """Turnos de una rotación generada para una instalación nueva; devuelve la instalación"""
+        instalacion = Instalacion.objects.create(cliente=self.cliente, nombre=tipo, direccion='Av. 2')
+        configuracion = ConfiguracionTurno.objects.create(
+            requerimientos=RequerimientosCliente.objects.create(instalacion=instalacion),
+            tipo_turno=tipo, dias_trabajo=dias_trabajo, dias_descanso=dias_descanso,
+        )
+        configuracion.refresh_from_db()
+        personal = [
+            Personal.objects.create(
+                nombres='Guardia', apellidos=f'{tipo} {i}', rut=_rut(21000000 + 100 * dias_trabajo + i),
+                telefono='+56911111111', cargo=self.personal.cargo, cliente=self.cliente,
+                instalacion_asignada=instalacion,
+            )
+            for i in range(dotacion_requerida(configuracion))
+        ]
+        generar_turnos(configuracion, self.inicio.date(), self.inicio.date() + timedelta(days=dias - 1),
+                       personal=personal)
+        return instalacion
+
+    def test_rotaciones_de_12_horas_promedian_en_el_ciclo(self):
+        desde, hasta = self.inicio.date(), self.inicio.date() + timedelta(days=27)
+        for tipo, dias_trabajo in [('4x4', 4), ('7x7', 7)]:
+            instalacion = self.rotacion(tipo, dias_trabajo, dias_trabajo, 28)
+            with self.subTest(tipo):
+                self.assertEqual(verificar_jornada(desde, hasta, instalacion=instalacion), [])
+                # Las mismas horas sin rotación superan los límites semanales
+                Turno.objects.filter(instalacion=instalacion).update(configuracion=None)
+                instalacion.requerimientos.configuracion_turnos.delete()
+                reglas = {i['regla'] for i in verificar_jornada(desde, hasta, instalacion=instalacion)}
+                self.assertIn('horas_semanales', reglas)
+                self.assertEqual('dias_consecutivos' in reglas, dias_trabajo > 6)
+
+    def test_rotacion_excedida_informa_el_limite_del_ciclo(self):
+        instalacion = self.rotacion('4x4', 4, 4, 8)
+        guardia = Turno.objects.filter(instalacion=instalacion, fecha=self.inicio.date()).first().personal
+        # Un quinto día seguido: 60 horas en 8 días y 5 días seguidos (bajo los 6 de settings)
+        ultimo = Turno.objects.filter(personal=guardia).latest('fecha_inicio')
+        Turno.objects.create(
+            personal=guardia, instalacion=instalacion, configuracion=ultimo.configuracion,
+            fecha=ultimo.fecha + timedelta(days=1), fecha_inicio=ultimo.fecha_inicio + timedelta(days=1),
+            fecha_fin=ultimo.fecha_fin + timedelta(days=1), tipo_turno=ultimo.tipo_turno,
+        )
+        infracciones = verificar_jornada(self.inicio.date(), self.inicio.date() + timedelta(days=7),
+                                         personal_ids=[guardia.pk])
+        self.assertEqual([(i['regla'], i['valor'], i['limite']) for i in infracciones],
+                         [('horas_semanales', 60, 48)])
+
+    def test_limites_por_rotacion(self):
+        self.assertEqual(limites_rotacion(None),
+                         {'horas_semanales': 42, 'descanso': 12, 'dias_consecutivos': 6})
+        self.assertEqual(limites_rotacion((4, 4)),
+                         {'horas_semanales': 48, 'descanso': 12, 'dias_consecutivos': 6})
+        self.assertEqual(limites_rotacion((7, 7)),
+                         {'horas_semanales': 84, 'descanso': 12, 'dias_consecutivos': 7})
+        # Los ciclos largos se promedian en CICLO_MAXIMO días
+        self.assertEqual(limites_rotacion((20, 20))['horas_semanales'], 42 * CICLO_MAXIMO / 7)
+        with self.assertRaises(TypeError):
+            Regla(1)
+
+    def test_parametros_invalidos(self):
+        url = reverse('erp:api_cumplimiento_jornada')
+        self.assertEqual(self.client.get(url, {'desde': '2026-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'desde': '2026-01-01', 'hasta': '2026-06-30'}).status_code, 400)
+        respuesta = self.client.get(url, {'desde': '2026-02-30', 'hasta': '2026-03-31'})
+        self.assertEqual(respuesta.status_code, 400)
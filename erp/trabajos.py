@@ -0,0 +1,151 @@
+"""
+Ejecución en segundo plano de los trabajos de importación.
+
+Los trabajos se encolan en un pool de hilos local al proceso una vez
+confirmada la transacción que los crea. Si el pool está deshabilitado
+(ERP_IMPORTACIONES_WORKERS = 0) o el proceso se reinicia, los trabajos
+pendientes se procesan con el comando `procesar_importaciones`, que también
+recupera los trabajos en proceso que dejaron de avanzar
+(ERP_IMPORTACIONES_INACTIVIDAD segundos sin completar un lote).
+"""
+from datetime import timedelta
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .importacion import ErrorImportacion, importar_personal, importar_turnos, importar_vehiculos
+from .models import TrabajoImportacion
+
+logger = logging.getLogger(__name__)
+
+# Función de importación por tipo de trabajo
+IMPORTADORES = {
+    'personal': importar_personal,
+    'vehiculos': importar_vehiculos,
+    'turnos': importar_turnos,
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    global _executor
+    workers = getattr(settings, 'ERP_IMPORTACIONES_WORKERS', 1)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='erp-importacion')
+    return _executor
+
+
+def encolar_trabajo(trabajo):
+    """Programa el trabajo para después de confirmar la transacción actual"""
+    executor = _get_executor()
+    if executor is None:
+        return
+    transaction.on_commit(lambda: executor.submit(_ejecutar_en_hilo, trabajo.pk))
+
+
+def _ejecutar_en_hilo(trabajo_id):
+    close_old_connections()
+    try:
+        procesar_trabajo(trabajo_id)
+    except Exception:
+        logger.exception('Error procesando el trabajo de importación %s', trabajo_id)
+    finally:
+        close_old_connections()
+
+
+def procesar_trabajo(trabajo_id):
+    """
+    Ejecuta un trabajo pendiente. El avance se guarda después de cada lote
+    para que el endpoint de progreso lo informe mientras se procesa.
+    """
+    # Tomar el trabajo solo si sigue pendiente evita que dos workers lo procesen
+    ahora = timezone.now()
+    tomado = TrabajoImportacion.objects.filter(pk=trabajo_id, estado='P').update(
+        estado='E', fecha_inicio=ahora, fecha_avance=ahora
+    )
+    if not tomado:
+        return None
+    trabajo = TrabajoImportacion.objects.get(pk=trabajo_id)
+
+    def al_avanzar(resultado):
+        TrabajoImportacion.objects.filter(pk=trabajo_id).update(
+            filas_procesadas=resultado.procesadas,
+            filas_creadas=resultado.creadas,
+            filas_actualizadas=resultado.actualizadas,
+            filas_fallidas=resultado.fallidas,
+            fecha_avance=timezone.now()
+        )
+
+    importar = IMPORTADORES[trabajo.tipo]
+    campos = ['estado', 'mensaje', 'fecha_fin']
+    try:
+        with trabajo.archivo.open('rb') as archivo:
+            resultado = importar(archivo, tolerante=True, al_avanzar=al_avanzar)
+    except (ErrorImportacion, UnicodeDecodeError, OSError) as e:
+        trabajo.estado = 'F'
+        trabajo.mensaje = str(e)
+    except Exception as e:
+        logger.exception('Error inesperado en el trabajo de importación %s', trabajo_id)
+        trabajo.estado = 'F'
+        trabajo.mensaje = f'Error inesperado: {e}'
+    else:
+        trabajo.estado = 'C'
+        trabajo.filas_procesadas = resultado.procesadas
+        trabajo.filas_creadas = resultado.creadas
+        trabajo.filas_actualizadas = resultado.actualizadas
+        trabajo.filas_fallidas = resultado.fallidas
+        trabajo.errores = resultado.errores
+        trabajo.mensaje = f'{resultado.creadas} filas importadas'
+        if resultado.actualizadas or resultado.sin_cambios:
+            trabajo.mensaje += (
+                f', {resultado.actualizadas} actualizadas, {resultado.sin_cambios} sin cambios'
+            )
+        trabajo.mensaje += f', {resultado.fallidas} con errores'
+        campos += ['filas_procesadas', 'filas_creadas', 'filas_actualizadas', 'filas_fallidas', 'errores']
+    trabajo.fecha_fin = timezone.now()
+    # Solo los campos fijados aquí: si falló, se conserva el avance de los lotes ya guardados
+    trabajo.save(update_fields=campos)
+    return trabajo
+
+
+def trabajos_interrumpidos():
+    """Trabajos en proceso sin avance en ERP_IMPORTACIONES_INACTIVIDAD segundos"""
+    inactividad = timedelta(seconds=getattr(settings, 'ERP_IMPORTACIONES_INACTIVIDAD', 600))
+    limite = timezone.now() - inactividad
+    # Los trabajos tomados antes de registrar el avance se miden por su inicio
+    return TrabajoImportacion.objects.filter(estado='E').filter(
+        Q(fecha_avance__lt=limite)
+        | Q(fecha_avance__isnull=True, fecha_inicio__lt=limite)
+        | Q(fecha_avance__isnull=True, fecha_inicio__isnull=True)
+    )
+
+
+def recuperar_interrumpidos(reintentar=False):
+    """
+    Marca como fallidos los trabajos interrumpidos o, con reintentar, los
+    devuelve a pendientes desde cero. Las importaciones de vehículos y
+    turnos sincronizan por clave natural, por lo que reintentarlas no
+    duplica filas; las de personal informarán como error las filas que ya
+    alcanzaron a guardarse. Devuelve la cantidad de trabajos recuperados.
+    """
+    interrumpidos = trabajos_interrumpidos()
+    if reintentar:
+        return interrumpidos.update(
+            estado='P', fecha_inicio=None, fecha_avance=None, filas_procesadas=0,
+            filas_creadas=0, filas_actualizadas=0, filas_fallidas=0
+        )
+    return interrumpidos.update(
+        estado='F',
+        fecha_fin=timezone.now(),
+        mensaje='El proceso se interrumpió sin terminar; vuelva a subir el archivo para completar la importación'
+    )
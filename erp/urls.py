@@ -8,6 +8,7 @@ urlpatterns = [
     # Dashboard
     path('', views.DashboardView.as_view(), name='dashboard'),
     path('calendario/', views.CalendarView.as_view(), name='calendar'),
+    path('api/calendario/eventos/', views.calendar_events, name='calendar_events'),
 
     # Gestión Unificada de Clientes e Instalaciones
     path('gestion-clientes/', views.GestionClientesView.as_view(), name='gestion_clientes'),
@@ -25,6 +26,7 @@ urlpatterns = [
     path('instalaciones/<int:pk>/', views.InstalacionDetailView.as_view(), name='instalacion_detail'),
     path('instalaciones/<int:pk>/editar/', views.InstalacionUpdateView.as_view(), name='instalacion_update'),
     path('instalaciones/<int:pk>/eliminar/', views.InstalacionDeleteView.as_view(), name='instalacion_delete'),
+    path('instalaciones/cobertura/', views.CoberturaView.as_view(), name='cobertura'),
 
     # Cargos
     path('cargos/', views.CargoListView.as_view(), name='cargo_list'),
@@ -36,6 +38,10 @@ urlpatterns = [
     path('personal/', views.PersonalListView.as_view(), name='personal_list'),
     path('personal/nuevo/', views.PersonalCreateView.as_view(), name='personal_create'),
     path('personal/carga-masiva/', views.PersonalBulkUploadView.as_view(), name='personal_bulk_upload'),
+    path('importaciones/<int:pk>/', views.TrabajoImportacionDetailView.as_view(), name='importacion_detail'),
+    path('importaciones/<int:pk>/errores.csv', views.importacion_errores_csv, name='importacion_errores'),
+    path('api/importaciones/<int:pk>/', views.api_progreso_importacion, name='api_progreso_importacion'),
+    path('exportar/<slug:entidad>/', views.exportar_datos, name='exportar_datos'),
     path('personal/<int:pk>/', views.PersonalDetailView.as_view(), name='personal_detail'),
     path('personal/<int:pk>/editar/', views.PersonalUpdateView.as_view(), name='personal_update'),
     path('personal/<int:pk>/eliminar/', views.PersonalDeleteView.as_view(), name='personal_delete'),
@@ -54,6 +60,7 @@ urlpatterns = [
     path('api/gestores/cliente/', views_gestores.get_gestores_cliente, name='get_gestores_cliente'),
     path('api/gestores/crear/', views_gestores.gestor_create_ajax, name='gestor_create_ajax'),
     path('vehiculos/nuevo/', views.VehiculoCreateView.as_view(), name='vehiculo_create'),
+    path('vehiculos/carga-masiva/', views.VehiculoBulkUploadView.as_view(), name='vehiculo_bulk_upload'),
     path('vehiculos/<int:pk>/', views.VehiculoDetailView.as_view(), name='vehiculo_detail'),
     path('vehiculos/<int:pk>/editar/', views.VehiculoUpdateView.as_view(), name='vehiculo_update'),
     path('vehiculos/<int:pk>/eliminar/', views.VehiculoDeleteView.as_view(), name='vehiculo_delete'),
@@ -74,9 +81,18 @@ urlpatterns = [
     # Turnos
     path('turnos/', views.TurnoListView.as_view(), name='turno_list'),
     path('turnos/nuevo/', views.TurnoCreateView.as_view(), name='turno_create'),
+    path('turnos/carga-masiva/', views.TurnoBulkUploadView.as_view(), name='turno_bulk_upload'),
     path('turnos/<int:pk>/', views.TurnoDetailView.as_view(), name='turno_detail'),
     path('turnos/<int:pk>/editar/', views.TurnoUpdateView.as_view(), name='turno_update'),
     path('turnos/<int:pk>/eliminar/', views.TurnoDeleteView.as_view(), name='turno_delete'),
+    path('api/turnos/conflictos/', views.api_conflictos_turnos, name='api_conflictos_turnos'),
+    path('api/turnos/brechas/', views.api_brechas_turnos, name='api_brechas_turnos'),
+    path('api/turnos/jornada/', views.api_cumplimiento_jornada, name='api_cumplimiento_jornada'),
+    path('api/turnos/simulacion/', views.api_simulacion_dotacion, name='api_simulacion_dotacion'),
+    path('api/reportes/horas/', views.api_reporte_horas, name='api_reporte_horas'),
+    path('api/buscar/', views.api_buscar, name='api_buscar'),
+    path('api/cobertura/', views.api_cobertura, name='api_cobertura'),
+    path('api/autocompletar/<slug:tipo>/', views.api_autocompletar, name='api_autocompletar'),
     
     # Configuración de Turnos
     path('configuracion-turnos/', views.ConfiguracionTurnoListView.as_view(), name='configuracion_turno_list'),
@@ -1,21 +1,57 @@
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Q
-from .models import Turno, Personal, Incidencia, Vehiculo
+from django.db.models import F, Q, Max, Count
+from django.db.models.functions import Greatest
+from .cobertura import instalaciones_cobertura
+from .models import Turno, Personal, Incidencia, Vehiculo, ContadoresDashboard
+
+# Segundos que se considera vigente el conteo de personal en turno
+VIGENCIA_PERSONAL_EN_TURNO = 60
+
+def rango_datetime(fecha_desde, fecha_hasta):
+    """
+    Convierte un rango de fechas inclusivo en el intervalo [inicio, fin) de
+    datetimes con zona horaria que lo cubre.
+    """
+    inicio = timezone.make_aware(datetime.combine(fecha_desde, datetime.min.time()))
+    fin = timezone.make_aware(datetime.combine(fecha_hasta + timedelta(days=1), datetime.min.time()))
+    return inicio, fin
+
+def get_turns_at(at=None, instalacion=None):
+    """
+    Obtiene los turnos activos en un instante dado.
+
+    Como ningún turno dura más de Turno.DURACION_MAXIMA (se valida en
+    Turno.save() y en las cargas masivas), basta recorrer los turnos iniciados
+    dentro de esa ventana, lo que convierte la consulta en un rango acotado
+    sobre el índice (fecha_inicio, fecha_fin).
+    """
+    at = at or timezone.now()
+    turnos = Turno.objects.filter(
+        fecha_inicio__gt=at - Turno.DURACION_MAXIMA,
+        fecha_inicio__lte=at,
+        fecha_fin__gte=at
+    )
+    if instalacion is not None:
+        turnos = turnos.filter(instalacion=instalacion)
+    return turnos
 
 def get_current_turns():
     """Obtiene los turnos actuales"""
-    now = timezone.now()
-    return Turno.objects.filter(
-        fecha_inicio__lte=now,
-        fecha_fin__gte=now
+    return get_turns_at()
+
+def who_is_on_shift(at=None, instalacion=None):
+    """
+    Obtiene el personal en turno en un instante dado, opcionalmente
+    filtrado por instalación (instancia o ID).
+    """
+    return Personal.objects.filter(
+        pk__in=get_turns_at(at, instalacion).values('personal_id')
     )
 
 def get_personal_in_turn():
     """Obtiene el personal que está en turno"""
-    return Personal.objects.filter(
-        turnos__in=get_current_turns()
-    ).distinct()
+    return who_is_on_shift()
 
 def get_turns_by_date(date):
     """Obtiene los turnos de una fecha específica"""
@@ -28,32 +64,124 @@ def get_incidencias_abiertas():
     """Obtiene las incidencias abiertas"""
     return Incidencia.objects.filter(
         estado='A'
-    ).order_by('-fecha_hora_reporte')[:10]
+    ).select_related('instalacion', 'tipo_incidencia').order_by('-fecha_hora_reporte')[:10]
+
+def get_requerimientos_incumplidos(limite=10):
+    """
+    (cantidad, primeras limite) instalaciones activas que no cumplen sus
+    requerimientos: las mismas que lista la vista de cobertura con solo_deficit.
+    """
+    incumplidas = instalaciones_cobertura(orden='cliente', solo_deficit=True)
+    cantidad = incumplidas.count()
+    if not cantidad:
+        return 0, []
+    return cantidad, list(incumplidas[:limite])
+
+# Contador materializado en ContadoresDashboard -> (modelo, campo, valor que se cuenta)
+CONTADORES = {
+    'personal_activo': (Personal, 'activo', True),
+    'vehiculos_en_servicio': (Vehiculo, 'en_servicio', True),
+    'incidencias_abiertas': (Incidencia, 'estado', 'A'),
+}
+
+def contar(contador):
+    """COUNT(*) de las filas que suma un contador"""
+    modelo, campo, valor = CONTADORES[contador]
+    return modelo.objects.filter(**{campo: valor}).count()
+
+def cuenta_en(contador, instance):
+    """Si la instancia suma en el contador"""
+    _, campo, valor = CONTADORES[contador]
+    return getattr(instance, campo) == valor
+
+def ajustar_contador(contador, delta):
+    """Suma delta al contador en la base (atómico frente a otros procesos)"""
+    if delta:
+        ContadoresDashboard.objects.filter(pk=ContadoresDashboard.PK_UNICA).update(
+            **{contador: Greatest(F(contador) + delta, 0)}
+        )
+
+def actualizar_contador(contador):
+    """Recalcula un único contador del dashboard (después de inserciones masivas)"""
+    ContadoresDashboard.objects.filter(pk=ContadoresDashboard.PK_UNICA).update(
+        **{contador: contar(contador)}
+    )
+
+def recalcular_contadores():
+    """Reconstruye la fila de contadores del dashboard desde cero"""
+    valores = {contador: contar(contador) for contador in CONTADORES}
+    valores['personal_en_turno'] = get_personal_in_turn().count()
+    valores['personal_en_turno_calculado'] = timezone.now()
+    contadores, _ = ContadoresDashboard.objects.update_or_create(
+        pk=ContadoresDashboard.PK_UNICA,
+        defaults=valores
+    )
+    return contadores
 
 def get_stats():
-    """Obtiene estadísticas generales"""
+    """Obtiene estadísticas generales desde la fila de contadores"""
+    contadores = ContadoresDashboard.objects.filter(pk=ContadoresDashboard.PK_UNICA).first()
+    if contadores is None:
+        contadores = recalcular_contadores()
+
+    # El personal en turno depende de la hora, por lo que se refresca cada cierto tiempo
+    now = timezone.now()
+    calculado = contadores.personal_en_turno_calculado
+    if calculado is None or now - calculado > timedelta(seconds=VIGENCIA_PERSONAL_EN_TURNO):
+        contadores.personal_en_turno = get_personal_in_turn().count()
+        contadores.personal_en_turno_calculado = now
+        ContadoresDashboard.objects.filter(pk=contadores.pk).update(
+            personal_en_turno=contadores.personal_en_turno,
+            personal_en_turno_calculado=now
+        )
+
     return {
-        'personal_activo': Personal.objects.filter(activo=True).count(),
-        'vehiculos_en_servicio': Vehiculo.objects.filter(en_servicio=True).count(),
-        'incidencias_abiertas': Incidencia.objects.filter(estado='A').count(),
-        'personal_en_turno': get_personal_in_turn().count()
+        'personal_activo': contadores.personal_activo,
+        'vehiculos_en_servicio': contadores.vehiculos_en_servicio,
+        'incidencias_abiertas': contadores.incidencias_abiertas,
+        'personal_en_turno': contadores.personal_en_turno
     }
 
-def get_turns_calendar_data(start_date, end_date):
+def get_turns_in_range(start_date, end_date, instalacion=None):
+    """
+    Obtiene los turnos que se superponen con el rango [start_date, end_date),
+    incluidos los que empiezan antes o terminan después del rango.
+    """
+    turnos = Turno.objects.filter(
+        fecha_inicio__lt=end_date,
+        fecha_fin__gt=start_date
+    )
+    if instalacion:
+        turnos = turnos.filter(instalacion=instalacion)
+    return turnos
+
+def get_turns_calendar_version(start_date, end_date, instalacion=None):
+    """
+    Devuelve (última actualización, cantidad) de los turnos del rango, usado
+    para construir ETag/Last-Modified del feed del calendario.
+    """
+    datos = get_turns_in_range(start_date, end_date, instalacion).aggregate(
+        ultima=Max('fecha_actualizacion'),
+        total=Count('id')
+    )
+    return datos['ultima'], datos['total']
+
+def get_turns_calendar_data(start_date, end_date, instalacion=None):
     """Obtiene datos para el calendario de turnos"""
-    turns = Turno.objects.filter(
-        Q(fecha_inicio__range=[start_date, end_date]) |
-        Q(fecha_fin__range=[start_date, end_date])
-    ).select_related('personal', 'instalacion')
+    turns = get_turns_in_range(start_date, end_date, instalacion).values(
+        'id', 'fecha_inicio', 'fecha_fin', 'tipo_turno',
+        'personal__nombres', 'personal__apellidos',
+        'instalacion__nombre', 'instalacion__cliente__razon_social'
+    ).order_by()
     
     return [
         {
-            'id': t.id,
-            'title': f"{t.personal.nombres} {t.personal.apellidos}",
-            'start': t.fecha_inicio.isoformat(),
-            'end': t.fecha_fin.isoformat(),
-            'color': '#007bff' if t.tipo_turno == 'D' else '#dc3545',
-            'instalacion': str(t.instalacion)
+            'id': t['id'],
+            'title': f"{t['personal__nombres']} {t['personal__apellidos']}",
+            'start': t['fecha_inicio'].isoformat(),
+            'end': t['fecha_fin'].isoformat(),
+            'color': '#007bff' if t['tipo_turno'] == 'M' else '#dc3545',
+            'instalacion': f"{t['instalacion__nombre']} - {t['instalacion__cliente__razon_social']}"
         }
         for t in turns
     ]
@@ -6,16 +6,35 @@ from django import forms
 from django.db.models import Count, Q
 from itertools import chain
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import condition, require_GET
 from .models import (
     Cliente, Instalacion, Cargo, Personal, TipoVehiculo, Vehiculo, 
-    TipoIncidencia, Incidencia, Turno, ConfiguracionTurno, RequerimientosCliente
+    TipoIncidencia, Incidencia, Turno, ConfiguracionTurno, RequerimientosCliente,
+    TrabajoImportacion
 )
-from .forms import PersonalForm, InstalacionForm, RequerimientosInstalacionForm
+from .forms import PersonalForm, InstalacionForm, RequerimientosInstalacionForm, TurnoForm, IncidenciaForm
 from django.db.models import Count, Sum
 from datetime import datetime, timedelta
 import csv
-from .utils import get_incidencias_abiertas, get_stats, get_turns_calendar_data
+import hashlib
+from . import busqueda, cobertura, indice_prefijos, pronostico
+from .autocompletar import AUTOCOMPLETAR
+from .conflictos import detectar_superposiciones
+from .cumplimiento import reporte_jornada
+from .exportacion import EXPORTACIONES, generar_csv, generar_xlsx
+from .importacion import COLUMNAS_TURNO, COLUMNAS_VEHICULO, ErrorImportacion, validar_personal
+from .paginacion import KeysetPaginationMixin
+from .planificacion import TRAMOS, dotacion_requerida
+from .reportes import AGRUPACIONES, mes_anterior, reporte_horas
+from .rotacion import simular_configuracion
+from .trabajos import encolar_trabajo
+from .utils import (
+    get_incidencias_abiertas, get_requerimientos_incumplidos, get_stats, get_turns_calendar_data,
+    get_turns_calendar_version
+)
 
 # Mixin vacío para reemplazar LoginRequiredMixin
 class NoAuthMixin:
@@ -27,35 +46,108 @@ class DashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtener estadísticas
+        # Obtener estadísticas (una sola lectura de la fila de contadores)
         stats = get_stats()
         context.update(stats)
+        context['dashboard_data'] = stats
         
         # Obtener incidencias recientes
         context['incidencias_recentes'] = get_incidencias_abiertas()
         
+        # Instalaciones que no cumplen sus requerimientos de personal o vehículos
+        context['total_incumplidos'], context['requerimientos_incumplidos'] = get_requerimientos_incumplidos()
+        
         return context
 
 class CalendarView(TemplateView):
     template_name = 'erp/calendar.html'
-    context_object_name = 'calendar_data'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Obtener fechas del mes actual
-        today = datetime.now()
-        start_date = today.replace(day=1)
-        if today.month == 12:
-            end_date = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            end_date = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
-        
-        # Obtener datos para el calendario
-        context['calendar_data'] = get_turns_calendar_data(start_date, end_date)
+        # Los turnos se cargan desde el feed JSON según el rango visible
+        context['instalaciones'] = Instalacion.objects.filter(activa=True).values('id', 'nombre').order_by('nombre')
+        context['instalacion_id'] = self.request.GET.get('instalacion', '')
         
         return context
 
+
+def _parse_fecha(valor):
+    """Fecha AAAA-MM-DD o None si falta o no existe (parse_date lanza ValueError con 2026-02-30)"""
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
+
+
+def _parse_fecha_calendario(valor):
+    """Convierte los parámetros start/end de FullCalendar en datetimes con zona horaria"""
+    if not valor:
+        return None
+    try:
+        fecha = parse_datetime(valor)
+    except ValueError:
+        return None
+    if fecha is None:
+        solo_fecha = _parse_fecha(valor)
+        if solo_fecha is None:
+            return None
+        fecha = datetime.combine(solo_fecha, datetime.min.time())
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _calendar_events_version(request):
+    """Calcula (una vez por request) la versión de los turnos del rango solicitado"""
+    if not hasattr(request, '_calendar_events_version'):
+        start = _parse_fecha_calendario(request.GET.get('start'))
+        end = _parse_fecha_calendario(request.GET.get('end'))
+        instalacion_id = request.GET.get('instalacion') or None
+        if start is None or end is None or (instalacion_id and not instalacion_id.isdigit()):
+            # Parámetros inválidos: la vista responde 400 sin validadores HTTP
+            request._calendar_events_version = None
+        else:
+            request._calendar_events_version = get_turns_calendar_version(start, end, instalacion_id)
+    return request._calendar_events_version
+
+
+def _calendar_events_etag(request):
+    version = _calendar_events_version(request)
+    if version is None:
+        return None
+    ultima, total = version
+    clave = '|'.join([
+        request.GET.get('start', ''), request.GET.get('end', ''),
+        request.GET.get('instalacion', ''),
+        ultima.isoformat() if ultima else '', str(total)
+    ])
+    return hashlib.md5(clave.encode('utf-8')).hexdigest()
+
+
+def _calendar_events_last_modified(request):
+    version = _calendar_events_version(request)
+    return version[0] if version else None
+
+
+@require_GET
+@condition(etag_func=_calendar_events_etag, last_modified_func=_calendar_events_last_modified)
+def calendar_events(request):
+    """Feed JSON de eventos para FullCalendar (parámetros start, end e instalacion)"""
+    start = _parse_fecha_calendario(request.GET.get('start'))
+    end = _parse_fecha_calendario(request.GET.get('end'))
+    if start is None or end is None:
+        return JsonResponse({'error': 'Los parámetros start y end son obligatorios (formato ISO 8601)'}, status=400)
+    if end <= start:
+        return JsonResponse({'error': 'El parámetro end debe ser posterior a start'}, status=400)
+    
+    instalacion_id = request.GET.get('instalacion') or None
+    if instalacion_id and not instalacion_id.isdigit():
+        return JsonResponse({'error': 'El parámetro instalacion debe ser un ID numérico'}, status=400)
+    
+    eventos = get_turns_calendar_data(start, end, instalacion_id)
+    return JsonResponse(eventos, safe=False)
+
 # Vistas para Gestión Unificada de Clientes e Instalaciones
 class GestionClientesView(NoAuthMixin, View):
     template_name = 'erp/gestion_clientes.html'
@@ -65,24 +157,15 @@ class GestionClientesView(NoAuthMixin, View):
         query_cliente = request.GET.get('q_cliente', '')
         query_instalacion = request.GET.get('q_instalacion', '')
         
-        # Filtrar clientes
-        clientes = Cliente.objects.all().order_by('razon_social')
+        # Con texto de búsqueda se usa el índice de texto completo (ordenado por relevancia)
         if query_cliente:
-            clientes = clientes.filter(
-                Q(razon_social__icontains=query_cliente) |
-                Q(rut__icontains=query_cliente) |
-                Q(gestor_nombre__icontains=query_cliente)
-            )
-        
-        # Filtrar instalaciones
-        instalaciones = Instalacion.objects.select_related('cliente').order_by('nombre')
+            clientes = busqueda.buscar('cliente', query_cliente)
+        else:
+            clientes = Cliente.objects.with_counts().with_gestor_principal().order_by('razon_social')
         if query_instalacion:
-            instalaciones = instalaciones.filter(
-                Q(nombre__icontains=query_instalacion) |
-                Q(direccion__icontains=query_instalacion) |
-                Q(contacto_nombre__icontains=query_instalacion) |
-                Q(cliente__razon_social__icontains=query_instalacion)
-            )
+            instalaciones = busqueda.buscar('instalacion', query_instalacion)
+        else:
+            instalaciones = Instalacion.objects.select_related('cliente').order_by('nombre')
         
         # Paginación de clientes
         page_cliente = request.GET.get('page_cliente', 1)
@@ -91,6 +174,10 @@ class GestionClientesView(NoAuthMixin, View):
             clientes_paginated = paginator_cliente.page(page_cliente)
         except (PageNotAnInteger, EmptyPage):
             clientes_paginated = paginator_cliente.page(1)
+        if query_cliente:
+            clientes_paginated.object_list = busqueda.objetos_en_orden(
+                Cliente.objects.with_counts().with_gestor_principal(), clientes_paginated.object_list
+            )
         
         # Paginación de instalaciones
         page_instalacion = request.GET.get('page_instalacion', 1)
@@ -99,6 +186,10 @@ class GestionClientesView(NoAuthMixin, View):
             instalaciones_paginated = paginator_instalacion.page(page_instalacion)
         except (PageNotAnInteger, EmptyPage):
             instalaciones_paginated = paginator_instalacion.page(1)
+        if query_instalacion:
+            instalaciones_paginated.object_list = busqueda.objetos_en_orden(
+                Instalacion.objects.select_related('cliente'), instalaciones_paginated.object_list
+            )
         
         context = {
             'clientes': clientes_paginated,
@@ -114,13 +205,15 @@ class ClienteListView(NoAuthMixin, ListView):
     model = Cliente
     template_name = 'erp/cliente_list.html'
     context_object_name = 'clientes'
+    
+    def get_queryset(self):
+        return super().get_queryset().with_gestor_principal()
 
 class ClienteCreateView(NoAuthMixin, CreateView):
     model = Cliente
     template_name = 'erp/cliente_form.html'
     fields = [
         'razon_social', 'rut', 'direccion', 
-        'gestor_nombre', 'gestor_telefono', 'gestor_email',
         'email_contacto', 'telefono_contacto'
     ]
     success_url = reverse_lazy('erp:cliente_list')
@@ -139,11 +232,6 @@ class ClienteCreateView(NoAuthMixin, CreateView):
                 form.add_error('rut', 'El RUT es obligatorio')
                 return self.form_invalid(form)
             
-            # Verificar si ya existe un cliente con el mismo RUT
-            if Cliente.objects.filter(rut=form.cleaned_data['rut']).exists():
-                form.add_error('rut', 'Ya existe un cliente con este RUT')
-                return self.form_invalid(form)
-            
             # Guardar el formulario
             self.object = form.save(commit=False)
             print("Objeto antes de guardar:", self.object.__dict__)
@@ -185,7 +273,6 @@ class ClienteUpdateView(NoAuthMixin, UpdateView):
     template_name = 'erp/cliente_form.html'
     fields = [
         'razon_social', 'rut', 'direccion', 
-        'gestor_nombre', 'gestor_telefono', 'gestor_email',
         'email_contacto', 'telefono_contacto'
     ]
     success_url = reverse_lazy('erp:cliente_list')
@@ -196,11 +283,12 @@ class ClienteDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:cliente_list')
 
 # Vistas para Instalacion
-class InstalacionListView(NoAuthMixin, ListView):
+class InstalacionListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = Instalacion
     template_name = 'erp/instalacion_list.html'
     context_object_name = 'instalaciones'
     paginate_by = 10  # Mostrar 10 instalaciones por página
+    orden_keyset = ['nombre']
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('cliente', 'gestor')
@@ -305,65 +393,8 @@ class InstalacionDetailView(NoAuthMixin, DetailView):
     template_name = 'erp/instalacion_detail.html'
     context_object_name = 'instalacion'
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Obtener o crear los requerimientos para esta instalación
-        requerimientos, created = RequerimientosCliente.objects.get_or_create(
-            instalacion=self.object,
-            defaults={
-                'sistema_turnos_4x4': True,
-                'requiere_personal': True,
-                'personal_requerido': 1,
-                'personal_por_turno': 1,
-                'requiere_vehiculos': False,
-                'cantidad_vehiculos': 0
-            }
-        )
-        
-        # Inicializar el formulario de requerimientos
-        if self.request.method == 'POST' and 'requerimientos_form' in self.request.POST:
-            requerimientos_form = RequerimientosInstalacionForm(
-                self.request.POST, 
-                instance=requerimientos,
-                prefix='requerimientos'
-            )
-            if requerimientos_form.is_valid():
-                requerimientos_form.save()
-                messages.success(self.request, 'Los requerimientos se han actualizado correctamente.')
-                return redirect('erp:instalacion_detail', pk=self.object.pk)
-        else:
-            requerimientos_form = RequerimientosInstalacionForm(
-                instance=requerimientos,
-                prefix='requerimientos'
-            )
-        
-        # Agregar formulario al contexto
-        context['requerimientos_form'] = requerimientos_form
-        
-        # Obtener estadísticas de personal y vehículos asignados
-        context['personal_asignado_count'] = self.object.personal_asignado.count()
-        context['vehiculos_asignados_count'] = self.object.vehiculos_asignados.count()
-        
-        # Calcular cobertura de personal
-        if requerimientos.requiere_personal and requerimientos.personal_requerido > 0:
-            context['cobertura_personal'] = min(
-                (context['personal_asignado_count'] / requerimientos.personal_requerido) * 100,
-                100  # Máximo 100%
-            )
-        else:
-            context['cobertura_personal'] = 0
-            
-        # Calcular cobertura de vehículos
-        if requerimientos.requiere_vehiculos and requerimientos.cantidad_vehiculos > 0:
-            context['cobertura_vehiculos'] = min(
-                (context['vehiculos_asignados_count'] / requerimientos.cantidad_vehiculos) * 100,
-                100  # Máximo 100%
-            )
-        else:
-            context['cobertura_vehiculos'] = 0
-            
-        return context
+    def get_queryset(self):
+        return Instalacion.objects.select_related('cliente', 'gestor').with_counts().with_cobertura()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -401,28 +432,16 @@ class InstalacionDetailView(NoAuthMixin, DetailView):
         # Agregar formulario al contexto
         context['requerimientos_form'] = requerimientos_form
         
-        # Obtener estadísticas de personal y vehículos asignados
-        context['personal_asignado_count'] = self.object.personal_asignado.count()
-        context['vehiculos_asignados_count'] = self.object.vehiculos_asignados.count()
-        
-        # Calcular cobertura de personal
-        if requerimientos.requiere_personal and requerimientos.personal_requerido > 0:
-            context['cobertura_personal'] = min(
-                (context['personal_asignado_count'] / requerimientos.personal_requerido) * 100,
-                100  # Máximo 100%
-            )
-        else:
-            context['cobertura_personal'] = 0
-            
-        # Calcular cobertura de vehículos
-        if requerimientos.requiere_vehiculos and requerimientos.cantidad_vehiculos > 0:
-            context['cobertura_vehiculos'] = min(
-                (context['vehiculos_asignados_count'] / requerimientos.cantidad_vehiculos) * 100,
-                100  # Máximo 100%
-            )
-        else:
-            context['cobertura_vehiculos'] = 0
-            
+        # Cobertura de personal y vehículos (anotada en get_queryset)
+        instalacion = self.object
+        context['personal_asignado_count'] = instalacion.cobertura_personal_asignado
+        context['vehiculos_asignados_count'] = instalacion.cobertura_vehiculos_asignados
+        context['cobertura_personal'] = cobertura.porcentaje(
+            instalacion.cobertura_personal_asignado, instalacion.cobertura_personal_requerido
+        ) or 0
+        context['cobertura_vehiculos'] = cobertura.porcentaje(
+            instalacion.cobertura_vehiculos_asignados, instalacion.cobertura_vehiculos_requeridos
+        ) or 0
         return context
 
 class InstalacionUpdateView(NoAuthMixin, UpdateView):
@@ -450,6 +469,80 @@ class InstalacionDeleteView(NoAuthMixin, DeleteView):
     template_name = 'erp/instalacion_confirm_delete.html'
     success_url = reverse_lazy('erp:instalacion_list')
 
+def _filtros_cobertura(request):
+    """Argumentos de cobertura.instalaciones_cobertura a partir de la URL; ValueError si no son válidos"""
+    orden = request.GET.get('orden') or 'deficit'
+    if orden not in cobertura.ORDENES:
+        raise ValueError(f"orden debe ser uno de: {', '.join(cobertura.ORDENES)}")
+    cliente_id = request.GET.get('cliente')
+    if cliente_id and not cliente_id.isdigit():
+        raise ValueError('El parámetro cliente debe ser numérico')
+    return {
+        'orden': orden,
+        'cliente_id': cliente_id or None,
+        'solo_deficit': request.GET.get('solo_deficit') == '1',
+        'incluir_inactivas': request.GET.get('inactivas') == '1',
+    }
+
+
+class CoberturaView(NoAuthMixin, ListView):
+    """Cobertura de todas las instalaciones, por defecto las de mayor déficit primero"""
+    template_name = 'erp/cobertura.html'
+    context_object_name = 'instalaciones'
+    paginate_by = 50
+
+    def get_queryset(self):
+        try:
+            self.filtros = _filtros_cobertura(self.request)
+        except ValueError as e:
+            messages.warning(self.request, str(e))
+            self.filtros = {'orden': 'deficit'}
+        return cobertura.instalaciones_cobertura(**self.filtros)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for instalacion in context['instalaciones']:
+            instalacion.porcentaje_personal = cobertura.porcentaje(
+                instalacion.cobertura_personal_asignado, instalacion.cobertura_personal_requerido
+            )
+            instalacion.porcentaje_vehiculos = cobertura.porcentaje(
+                instalacion.cobertura_vehiculos_asignados, instalacion.cobertura_vehiculos_requeridos
+            )
+        parametros = self.request.GET.copy()
+        parametros.pop('page', None)
+        context.update({
+            'resumen': cobertura.resumen(self.object_list),
+            'filtros': self.filtros,
+            'ordenes': cobertura.ORDENES,
+            'clientes': Cliente.objects.order_by('razon_social').only('pk', 'razon_social'),
+            'parametros': parametros.urlencode(),
+        })
+        return context
+
+
+@require_GET
+def api_cobertura(request):
+    """
+    Cobertura en JSON de todas las instalaciones activas: orden (deficit por
+    defecto), cliente, solo_deficit=1, inactivas=1 y limite (cantidad máxima
+    de instalaciones, todas si se omite).
+    """
+    try:
+        filtros = _filtros_cobertura(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    try:
+        limite = int(request.GET['limite']) if request.GET.get('limite') else None
+    except ValueError:
+        return JsonResponse({'error': 'El parámetro limite debe ser numérico'}, status=400)
+
+    instalaciones = cobertura.instalaciones_cobertura(**filtros)
+    filas = instalaciones[:max(limite, 0)] if limite is not None else instalaciones
+    return JsonResponse({
+        'resumen': cobertura.resumen(instalaciones),
+        'instalaciones': [cobertura.como_dict(instalacion) for instalacion in filas],
+    })
+
 # Vistas para Cargo
 class CargoListView(NoAuthMixin, ListView):
     model = Cargo
@@ -474,82 +567,208 @@ class CargoDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:cargo_list')
 
 # Vistas para Personal
-class PersonalListView(NoAuthMixin, ListView):
+class PersonalListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = Personal
     template_name = 'erp/personal_list.html'
     context_object_name = 'personal'
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('cliente', 'cargo')
 
-class PersonalBulkUploadView(NoAuthMixin, FormView):
-    template_name = 'erp/personal_bulk_upload.html'
+class CargaMasivaView(NoAuthMixin, FormView):
+    """Sube un CSV y lo procesa como un trabajo de importación en segundo plano"""
     form_class = forms.Form
-    success_url = reverse_lazy('erp:personal_list')
+    tipo_importacion = None
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['clientes'] = Cliente.objects.all()
-        return context
-
-    def form_valid(self, form):
-        # Obtener el archivo CSV
+    def archivo_csv(self, form):
+        """Devuelve el archivo CSV subido o None (agregando el error al formulario)"""
         csv_file = self.request.FILES.get('csv_file')
         if not csv_file:
             form.add_error(None, "Debe seleccionar un archivo CSV")
-            return self.form_invalid(form)
+            return None
 
         # Validar que el archivo sea CSV
         if not csv_file.name.endswith('.csv'):
             form.add_error(None, "El archivo debe ser un archivo CSV")
+            return None
+        return csv_file
+
+    def form_valid(self, form):
+        csv_file = self.archivo_csv(form)
+        if csv_file is None:
             return self.form_invalid(form)
+        return self.encolar(csv_file)
 
-        # Leer el archivo CSV
-        try:
-            decoded_file = csv_file.read().decode('utf-8').splitlines()
-            reader = csv.DictReader(decoded_file)
-            
-            # Validar encabezados
-            required_headers = ['nombres', 'apellidos', 'rut', 'fecha_nacimiento', 'direccion', 'telefono', 'email', 'cargo', 'fecha_contratacion', 'cliente']
-            missing_headers = [h for h in required_headers if h not in reader.fieldnames]
-            if missing_headers:
-                form.add_error(None, f"Faltan los siguientes campos en el CSV: {', '.join(missing_headers)}")
-                return self.form_invalid(form)
+    def encolar(self, csv_file):
+        # Guardar el archivo y procesarlo en segundo plano
+        trabajo = TrabajoImportacion.objects.create(
+            tipo=self.tipo_importacion,
+            archivo=csv_file,
+            nombre_archivo=csv_file.name
+        )
+        encolar_trabajo(trabajo)
 
-            # Procesar cada fila
-            for row in reader:
-                try:
-                    # Buscar cliente
-                    cliente = Cliente.objects.get(razon_social=row['cliente'])
-                    
-                    # Buscar cargo
-                    cargo, _ = Cargo.objects.get_or_create(nombre=row['cargo'])
-                    
-                    # Convertir fechas de DD-MM-YYYY a YYYY-MM-DD
-                    fecha_nacimiento = datetime.strptime(row['fecha_nacimiento'], '%d-%m-%Y')
-                    fecha_contratacion = datetime.strptime(row['fecha_contratacion'], '%d-%m-%Y')
-                    
-                    # Crear personal
-                    personal = Personal.objects.create(
-                        cliente=cliente,
-                        nombres=row['nombres'],
-                        apellidos=row['apellidos'],
-                        rut=row['rut'],
-                        fecha_nacimiento=fecha_nacimiento,
-                        direccion=row['direccion'],
-                        telefono=row['telefono'],
-                        email=row['email'],
-                        cargo=cargo,
-                        fecha_contratacion=fecha_contratacion,
-                        activo=True
-                    )
-                except Exception as e:
-                    form.add_error(None, f"Error procesando la fila: {str(e)}")
-                    return self.form_invalid(form)
-
-            messages.success(self.request, "Personal cargado exitosamente")
-            return super().form_valid(form)
-        except Exception as e:
-            form.add_error(None, f"Error leyendo el archivo: {str(e)}")
+        messages.info(self.request, f'El archivo "{csv_file.name}" se está procesando.')
+        return redirect('erp:importacion_detail', pk=trabajo.pk)
+
+
+class PersonalBulkUploadView(CargaMasivaView):
+    template_name = 'erp/personal_bulk_upload.html'
+    tipo_importacion = 'personal'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['clientes'] = Cliente.objects.all()
+        return context
+
+    def form_valid(self, form):
+        csv_file = self.archivo_csv(form)
+        if csv_file is None:
             return self.form_invalid(form)
 
+        # Modo de prueba: validar todas las filas sin guardar nada
+        if self.request.POST.get('solo_validar'):
+            try:
+                resultado = validar_personal(csv_file)
+            except ErrorImportacion as e:
+                form.add_error(None, str(e))
+                return self.form_invalid(form)
+            except UnicodeDecodeError:
+                form.add_error(None, "El archivo debe estar codificado en UTF-8")
+                return self.form_invalid(form)
+            if not resultado.errores:
+                messages.success(
+                    self.request,
+                    f'Validación exitosa: las {resultado.procesadas} filas de "{csv_file.name}" se pueden importar.'
+                )
+            return self.render_to_response(self.get_context_data(form=form, validacion=resultado))
+
+        return self.encolar(csv_file)
+
+
+class VehiculoBulkUploadView(CargaMasivaView):
+    template_name = 'erp/vehiculo_bulk_upload.html'
+    tipo_importacion = 'vehiculos'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['columnas_opcionales'] = list(COLUMNAS_VEHICULO) + ['instalacion']
+        return context
+
+
+class TurnoBulkUploadView(CargaMasivaView):
+    template_name = 'erp/turno_bulk_upload.html'
+    tipo_importacion = 'turnos'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['columnas_opcionales'] = list(COLUMNAS_TURNO)
+        return context
+
+# Vistas para Trabajos de Importación
+class TrabajoImportacionDetailView(NoAuthMixin, DetailView):
+    model = TrabajoImportacion
+    template_name = 'erp/importacion_detail.html'
+    context_object_name = 'trabajo'
+
+    # Listado al que vuelve cada tipo de importación
+    LISTADOS = {
+        'personal': 'erp:personal_list',
+        'vehiculos': 'erp:vehiculo_list',
+        'turnos': 'erp:turno_list',
+    }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['volver_url'] = reverse(self.LISTADOS.get(self.object.tipo, 'erp:personal_list'))
+        return context
+
+
+def _progreso_trabajo(trabajo):
+    return {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'archivo': trabajo.nombre_archivo,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'terminado': trabajo.terminado,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'filas_creadas': trabajo.filas_creadas,
+        'filas_actualizadas': trabajo.filas_actualizadas,
+        'filas_fallidas': trabajo.filas_fallidas,
+        'filas_por_segundo': trabajo.filas_por_segundo,
+        'mensaje': trabajo.mensaje,
+        'errores_url': reverse('erp:importacion_errores', args=[trabajo.pk]) if trabajo.filas_fallidas else None,
+    }
+
+
+@require_GET
+def api_progreso_importacion(request, pk):
+    """Avance de un trabajo de importación en JSON"""
+    trabajo = get_object_or_404(TrabajoImportacion.objects.defer('errores'), pk=pk)
+    return JsonResponse(_progreso_trabajo(trabajo))
+
+
+@require_GET
+def importacion_errores_csv(request, pk):
+    """Descarga el detalle de las filas rechazadas de un trabajo de importación"""
+    trabajo = get_object_or_404(TrabajoImportacion, pk=pk)
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="errores_importacion_{trabajo.pk}.csv"'
+    writer = csv.writer(response)
+    writer.writerow(['fila', 'campo', 'error'])
+    for error in trabajo.errores:
+        writer.writerow([error['fila'], error.get('campo', ''), error['error']])
+    return response
+
+
+# Exportación de datos
+FORMATOS_EXPORTACION = {
+    'csv': ('text/csv; charset=utf-8', generar_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', generar_xlsx),
+}
+
+
+@require_GET
+def exportar_datos(request, entidad):
+    """
+    Descarga personal, vehículos, turnos o incidencias en CSV o XLSX
+    (?formato=csv|xlsx) en streaming. Los turnos aceptan además los filtros
+    desde, hasta (AAAA-MM-DD) e instalacion.
+    """
+    exportacion = EXPORTACIONES.get(entidad)
+    if exportacion is None:
+        return JsonResponse({'error': f"No se puede exportar '{entidad}'"}, status=404)
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        return JsonResponse({'error': 'El formato debe ser csv o xlsx'}, status=400)
+
+    queryset = exportacion.queryset()
+    if entidad == 'turnos':
+        for parametro, filtro in (('desde', 'fecha__gte'), ('hasta', 'fecha__lte')):
+            if not request.GET.get(parametro):
+                continue
+            fecha = _parse_fecha(request.GET[parametro])
+            if fecha is None:
+                return JsonResponse(
+                    {'error': f'El parámetro {parametro} debe ser una fecha válida (AAAA-MM-DD)'}, status=400
+                )
+            queryset = queryset.filter(**{filtro: fecha})
+        if request.GET.get('instalacion'):
+            if not request.GET['instalacion'].isdigit():
+                return JsonResponse({'error': 'El parámetro instalacion debe ser un ID numérico'}, status=400)
+            queryset = queryset.filter(instalacion_id=request.GET['instalacion'])
+
+    content_type, generar = FORMATOS_EXPORTACION[formato]
+    if formato == 'xlsx':
+        contenido = generar(exportacion.encabezados, exportacion.filas(queryset), hoja=exportacion.nombre)
+    else:
+        contenido = generar(exportacion.encabezados, exportacion.filas(queryset))
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    nombre_archivo = f'{entidad}_{timezone.localdate():%Y%m%d}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
 class PersonalCreateView(NoAuthMixin, CreateView):
     model = Personal
     form_class = PersonalForm
@@ -606,11 +825,14 @@ class TipoVehiculoDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:tipo_vehiculo_list')
 
 # Vistas para Vehiculo
-class VehiculoListView(NoAuthMixin, ListView):
+class VehiculoListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = Vehiculo
     template_name = 'erp/vehiculo_list.html'
     context_object_name = 'vehiculos'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('tipo', 'instalacion_asignada')
+
 class VehiculoCreateView(NoAuthMixin, CreateView):
     model = Vehiculo
     template_name = 'erp/vehiculo_form.html'
@@ -657,15 +879,20 @@ class TipoIncidenciaDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:tipo_incidencia_list')
 
 # Vistas para Incidencia
-class IncidenciaListView(NoAuthMixin, ListView):
+class IncidenciaListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = Incidencia
     template_name = 'erp/incidencia_list.html'
     context_object_name = 'incidencias'
+    # Incidencia no define Meta.ordering: las más recientes primero
+    orden_keyset = ['-fecha_hora_suceso']
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('instalacion', 'tipo_incidencia')
 
 class IncidenciaCreateView(NoAuthMixin, CreateView):
     model = Incidencia
     template_name = 'erp/incidencia_form.html'
-    fields = ['titulo', 'instalacion', 'tipo_incidencia', 'fecha_hora_suceso', 'descripcion', 'personal_involucrado']
+    form_class = IncidenciaForm
     success_url = reverse_lazy('erp:incidencia_list')
 
 class IncidenciaDetailView(NoAuthMixin, DetailView):
@@ -676,7 +903,7 @@ class IncidenciaDetailView(NoAuthMixin, DetailView):
 class IncidenciaUpdateView(NoAuthMixin, UpdateView):
     model = Incidencia
     template_name = 'erp/incidencia_form.html'
-    fields = ['titulo', 'instalacion', 'tipo_incidencia', 'fecha_hora_suceso', 'descripcion', 'personal_involucrado']
+    form_class = IncidenciaForm
     success_url = reverse_lazy('erp:incidencia_list')
 
 class IncidenciaDeleteView(NoAuthMixin, DeleteView):
@@ -685,10 +912,13 @@ class IncidenciaDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:incidencia_list')
 
 # Vistas para Configuración de Turnos
-class ConfiguracionTurnoListView(NoAuthMixin, ListView):
+class ConfiguracionTurnoListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = ConfiguracionTurno
     template_name = 'erp/configuracion_turno_list.html'
     context_object_name = 'configuraciones'
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('requerimientos__instalacion')
 
 class ConfiguracionTurnoCreateView(NoAuthMixin, CreateView):
     model = ConfiguracionTurno
@@ -700,6 +930,9 @@ class ConfiguracionTurnoDetailView(NoAuthMixin, DetailView):
     model = ConfiguracionTurno
     template_name = 'erp/configuracion_turno_detail.html'
     context_object_name = 'configuracion'
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('requerimientos__instalacion__cliente')
 
 class ConfiguracionTurnoUpdateView(NoAuthMixin, UpdateView):
     model = ConfiguracionTurno
@@ -713,15 +946,18 @@ class ConfiguracionTurnoDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:configuracion_turno_list')
 
 # Vistas para Turno
-class TurnoListView(NoAuthMixin, ListView):
+class TurnoListView(NoAuthMixin, KeysetPaginationMixin, ListView):
     model = Turno
     template_name = 'erp/turno_list.html'
     context_object_name = 'turnos'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('personal', 'instalacion')
+
 class TurnoCreateView(NoAuthMixin, CreateView):
     model = Turno
     template_name = 'erp/turno_form.html'
-    fields = ['personal', 'instalacion', 'fecha_inicio', 'fecha_fin', 'tipo_turno']
+    form_class = TurnoForm
     success_url = reverse_lazy('erp:turno_list')
 
 class TurnoDetailView(NoAuthMixin, DetailView):
@@ -732,7 +968,7 @@ class TurnoDetailView(NoAuthMixin, DetailView):
 class TurnoUpdateView(NoAuthMixin, UpdateView):
     model = Turno
     template_name = 'erp/turno_form.html'
-    fields = ['personal', 'instalacion', 'fecha_inicio', 'fecha_fin', 'tipo_turno']
+    form_class = TurnoForm
     success_url = reverse_lazy('erp:turno_list')
 
 class TurnoDeleteView(NoAuthMixin, DeleteView):
@@ -741,6 +977,234 @@ class TurnoDeleteView(NoAuthMixin, DeleteView):
     success_url = reverse_lazy('erp:turno_list')
 
 
+@require_GET
+def api_conflictos_turnos(request):
+    """
+    Reporta en JSON los turnos superpuestos entre desde y hasta (AAAA-MM-DD),
+    opcionalmente filtrando por instalacion o por una lista de personal (IDs separados por coma).
+    """
+    fecha_desde = _parse_fecha(request.GET.get('desde'))
+    fecha_hasta = _parse_fecha(request.GET.get('hasta'))
+    if fecha_desde is None or fecha_hasta is None:
+        return JsonResponse({'error': 'Los parámetros desde y hasta son obligatorios (AAAA-MM-DD)'}, status=400)
+    if fecha_hasta < fecha_desde:
+        return JsonResponse({'error': 'El parámetro hasta debe ser igual o posterior a desde'}, status=400)
+    
+    try:
+        instalacion_id = int(request.GET['instalacion']) if request.GET.get('instalacion') else None
+        personal_ids = [int(p) for p in request.GET['personal'].split(',')] if request.GET.get('personal') else None
+    except ValueError:
+        return JsonResponse({'error': 'Los parámetros instalacion y personal deben ser IDs numéricos'}, status=400)
+    
+    conflictos = detectar_superposiciones(
+        fecha_desde, fecha_hasta,
+        personal_ids=personal_ids,
+        instalacion=instalacion_id
+    )
+    return JsonResponse({'total': len(conflictos), 'conflictos': conflictos})
+
+
+@require_GET
+def api_cumplimiento_jornada(request):
+    """
+    Infracciones a la jornada laboral (horas en 7 días, descanso entre
+    turnos y días seguidos) de los turnos entre desde y hasta (AAAA-MM-DD, a
+    lo más 92 días), opcionalmente por instalacion o lista de personal.
+    Con formato=csv se descarga como archivo.
+    """
+    fecha_desde = _parse_fecha(request.GET.get('desde'))
+    fecha_hasta = _parse_fecha(request.GET.get('hasta'))
+    if fecha_desde is None or fecha_hasta is None:
+        return JsonResponse({'error': 'Los parámetros desde y hasta son obligatorios (AAAA-MM-DD)'}, status=400)
+    if fecha_hasta < fecha_desde:
+        return JsonResponse({'error': 'El parámetro hasta debe ser igual o posterior a desde'}, status=400)
+    if (fecha_hasta - fecha_desde).days >= 92:
+        return JsonResponse({'error': 'El rango no puede superar 92 días'}, status=400)
+
+    try:
+        instalacion_id = int(request.GET['instalacion']) if request.GET.get('instalacion') else None
+        personal_ids = [int(p) for p in request.GET['personal'].split(',')] if request.GET.get('personal') else None
+    except ValueError:
+        return JsonResponse({'error': 'Los parámetros instalacion y personal deben ser IDs numéricos'}, status=400)
+
+    reporte = reporte_jornada(fecha_desde, fecha_hasta, personal_ids=personal_ids, instalacion=instalacion_id)
+    if request.GET.get('formato') != 'csv':
+        return JsonResponse(reporte)
+
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="jornada_{fecha_desde}_{fecha_hasta}.csv"'
+    columnas = ['fecha', 'regla', 'personal_id', 'rut', 'nombre', 'turno_id', 'valor', 'limite']
+    writer = csv.writer(response)
+    writer.writerow(columnas)
+    for infraccion in reporte['infracciones']:
+        writer.writerow([infraccion[columna] for columna in columnas])
+    return response
+
+
+@require_GET
+def api_brechas_turnos(request):
+    """
+    Mapa de calor de los tramos sin cubrir desde hoy: una fila por
+    instalación y tramo (M/T) con los faltantes de cada día, más el listado
+    de brechas. dias es el horizonte (30 por defecto), instalacion limita a
+    una instalación y solo_brechas=1 omite las filas sin faltantes.
+    """
+    try:
+        dias = int(request.GET.get('dias', pronostico.HORIZONTE))
+        instalacion_id = int(request.GET['instalacion']) if request.GET.get('instalacion') else None
+    except ValueError:
+        return JsonResponse({'error': 'Los parámetros dias e instalacion deben ser numéricos'}, status=400)
+    if not 1 <= dias <= pronostico.HORIZONTE_MAXIMO:
+        return JsonResponse(
+            {'error': f'El parámetro dias debe estar entre 1 y {pronostico.HORIZONTE_MAXIMO}'}, status=400
+        )
+
+    resultado = pronostico.obtener_pronostico(dias)
+    return JsonResponse({
+        'desde': resultado.fecha_desde,
+        'fechas': resultado.fechas,
+        'tramos': pronostico.TRAMOS,
+        'filas': resultado.mapa_calor(instalacion_id, request.GET.get('solo_brechas') == '1'),
+        'brechas': resultado.brechas(instalacion_id),
+    })
+
+
+# Máximo de guardias de una simulación de dotación
+SIMULACION_MAXIMO_PERSONAL = 10000
+
+
+@require_GET
+def api_simulacion_dotacion(request):
+    """
+    Simulación ("¿qué pasa si...?") de la dotación diaria de una configuración
+    de turnos con cierta cantidad de guardias, sin consultar los turnos. Por
+    tramo se entregan los guardias de cada día y los días bajo
+    personal_requerido_por_turno. Parámetros: configuracion, personal y dias.
+    """
+    try:
+        configuracion_id = int(request.GET['configuracion'])
+        cantidad = int(request.GET['personal'])
+        dias = int(request.GET.get('dias', pronostico.HORIZONTE))
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'Los parámetros configuracion y personal son obligatorios; todos deben ser numéricos'},
+            status=400
+        )
+    if not 1 <= dias <= pronostico.HORIZONTE_MAXIMO:
+        return JsonResponse(
+            {'error': f'El parámetro dias debe estar entre 1 y {pronostico.HORIZONTE_MAXIMO}'}, status=400
+        )
+    if not 1 <= cantidad <= SIMULACION_MAXIMO_PERSONAL:
+        return JsonResponse(
+            {'error': f'El parámetro personal debe estar entre 1 y {SIMULACION_MAXIMO_PERSONAL}'}, status=400
+        )
+
+    configuracion = get_object_or_404(ConfiguracionTurno.objects.select_related('requerimientos'), pk=configuracion_id)
+    try:
+        _, dotacion = simular_configuracion(configuracion, cantidad, dias)
+        requerida = dotacion_requerida(configuracion)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    por_tipo = {tipo: fila for (_, tipo), fila in dotacion.items()}
+    requerido = configuracion.personal_requerido_por_turno
+    tramos = []
+    for tipo, _, _ in TRAMOS:
+        fila = por_tipo.get(tipo)
+        fila = fila.tolist() if fila is not None else [0] * dias
+        tramos.append({
+            'tramo': tipo,
+            'dotacion': fila,
+            'dias_bajo_requerido': sum(1 for total in fila if total < requerido),
+        })
+    return JsonResponse({
+        'configuracion': configuracion.pk,
+        'personal': cantidad,
+        'personal_requerido_por_turno': requerido,
+        'dotacion_requerida': requerida,
+        'dias': dias,
+        'tramos': tramos,
+    })
+
+
+@require_GET
+def api_reporte_horas(request):
+    """
+    Horas planificadas y reales de un mes (anio, mes; por defecto el mes
+    anterior) agrupadas por personal, instalacion, centro_costo o cliente.
+    Con formato=csv se descarga como archivo.
+    """
+    anio_defecto, mes_defecto = mes_anterior()
+    try:
+        anio = int(request.GET.get('anio', anio_defecto))
+        mes = int(request.GET.get('mes', mes_defecto))
+    except ValueError:
+        return JsonResponse({'error': 'Los parámetros anio y mes deben ser numéricos'}, status=400)
+    if not 1 <= mes <= 12 or not 2000 <= anio <= 2100:
+        return JsonResponse({'error': 'Mes o año fuera de rango'}, status=400)
+    agrupar = request.GET.get('agrupar', 'personal')
+    if agrupar not in AGRUPACIONES:
+        return JsonResponse({'error': f"agrupar debe ser uno de: {', '.join(AGRUPACIONES)}"}, status=400)
+
+    reporte = reporte_horas(anio, mes, agrupar)
+    if request.GET.get('formato') != 'csv':
+        return JsonResponse(reporte)
+
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="horas_{agrupar}_{anio}_{mes:02d}.csv"'
+    columnas = ['id', 'nombre'] + (['rut'] if agrupar == 'personal' else []) + [
+        'horas_planificadas', 'horas_reales', 'diferencia', 'turnos', 'ausencias'
+    ]
+    writer = csv.writer(response)
+    writer.writerow(columnas)
+    for fila in reporte['filas']:
+        writer.writerow([fila[columna] for columna in columnas])
+    return response
+
+
+@require_GET
+def api_buscar(request):
+    """
+    Búsqueda rápida por prefijo (q) de personal, vehículos, instalaciones y
+    clientes para el typeahead. tipo limita a uno o más tipos separados por
+    coma; limite es la cantidad máxima de resultados (hasta 50).
+    """
+    tipos = [t for t in request.GET.get('tipo', '').split(',') if t]
+    desconocidos = [t for t in tipos if t not in indice_prefijos.TIPOS]
+    if desconocidos:
+        return JsonResponse(
+            {'error': f"tipo debe ser uno de: {', '.join(indice_prefijos.TIPOS)}"}, status=400
+        )
+    try:
+        limite = min(int(request.GET.get('limite', 10)), 50)
+    except ValueError:
+        return JsonResponse({'error': 'El parámetro limite debe ser numérico'}, status=400)
+
+    texto = request.GET.get('q', '')
+    resultados = indice_prefijos.buscar(texto, tipos or None, max(limite, 1))
+    return JsonResponse({'q': texto, 'resultados': resultados})
+
+@require_GET
+def api_autocompletar(request, tipo):
+    """
+    Opciones paginadas para los campos con autocompletado: q es el texto
+    escrito, pagina el número de página y los filtros admitidos por cada tipo
+    (p. ej. cliente) acotan los resultados.
+    """
+    definicion = AUTOCOMPLETAR.get(tipo)
+    if definicion is None:
+        return JsonResponse({'error': f"tipo debe ser uno de: {', '.join(AUTOCOMPLETAR)}"}, status=404)
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        return JsonResponse({'error': 'El parámetro pagina debe ser numérico'}, status=400)
+
+    try:
+        resultados, hay_mas = definicion.pagina(request.GET.get('q', ''), pagina, request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Los filtros deben ser IDs numéricos'}, status=400)
+    return JsonResponse({'resultados': resultados, 'pagina': pagina, 'hay_mas': hay_mas})
+
 def ajax_cargar_instalaciones(request):
     """Vista para cargar dinámicamente las instalaciones de un cliente"""
     cliente_id = request.GET.get('cliente_id')
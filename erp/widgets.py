@@ -0,0 +1,77 @@
+"""
+Widgets de selección con autocompletado.
+
+Renderizan un <select> que contiene solo las opciones elegidas (una consulta
+por los valores seleccionados, en lugar de iterar todo el queryset del
+campo). autocompletar.js agrega la caja de búsqueda que consulta
+/api/autocompletar/<tipo>/ y completa el <select>.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+from .autocompletar import AUTOCOMPLETAR
+
+
+class AutocompletarMixin:
+    def __init__(self, tipo, attrs=None, depende_de=None):
+        """
+        tipo es una de las búsquedas de erp.autocompletar.AUTOCOMPLETAR;
+        depende_de = {'cliente': 'id_cliente'} filtra las opciones por el
+        valor de otro campo del formulario.
+        """
+        super().__init__(attrs)
+        self.tipo = tipo
+        self.depende_de = depende_de or {}
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocompletar'] = reverse('erp:api_autocompletar', args=[self.tipo])
+        if self.depende_de:
+            attrs['data-depende-de'] = ','.join(f'{p}:{c}' for p, c in self.depende_de.items())
+        return attrs
+
+    def valores_seleccionados(self, value):
+        """
+        Valores elegidos convertidos con el campo del modelo; los enviados
+        que no son válidos ('abc' para un id) se descartan en lugar de llegar
+        al filtro y lanzar ValueError.
+        """
+        meta = self.choices.queryset.model._meta
+        clave = self.choices.field.to_field_name
+        campo_modelo = meta.get_field(clave) if clave else meta.pk
+        validos = set()
+        for valor in value:
+            if valor in (None, ''):
+                continue
+            try:
+                validos.add(campo_modelo.to_python(valor))
+            except ValidationError:
+                continue
+        return validos
+
+    def optgroups(self, name, value, attrs=None):
+        seleccionados = self.valores_seleccionados(value)
+        opciones = []
+        if not self.allow_multiple_selected:
+            opciones.append(self.create_option(name, '', '---------', False, 0))
+        if seleccionados:
+            clave = self.choices.field.to_field_name or 'pk'
+            # Las mismas relaciones que precarga la búsqueda para el texto de cada opción
+            queryset = self.choices.queryset.filter(**{f'{clave}__in': seleccionados}).select_related(
+                *AUTOCOMPLETAR[self.tipo].relacionados
+            )
+            for indice, objeto in enumerate(queryset, start=len(opciones)):
+                opciones.append(self.create_option(
+                    name, self.choices.field.prepare_value(objeto),
+                    self.choices.field.label_from_instance(objeto), True, indice,
+                ))
+        return [(None, opciones, 0)]
+
+
+class AutocompletarSelect(AutocompletarMixin, forms.Select):
+    pass
+
+
+class AutocompletarSelectMultiple(AutocompletarMixin, forms.SelectMultiple):
+    pass